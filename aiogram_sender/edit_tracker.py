@@ -0,0 +1,137 @@
+import asyncio
+from hashlib import blake2b
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+
+from utils.cache import TTLCache
+
+MessageKey = Tuple[int, int]  # (chat_id, message_id)
+
+
+class _Slot:
+    """
+    Отправляемое сейчас изменение сообщения и самое свежее, ожидающее своей очереди.
+    """
+    __slots__ = ("pending",)
+
+    def __init__(self):
+        # (хэш, отправка, future вызывающего)
+        self.pending: Optional[Tuple[Optional[bytes], Callable[[], Awaitable[Any]], asyncio.Future]] = None
+
+
+class EditTracker:
+    """
+    Хэши последнего отрисованного этим процессом содержимого сообщений.
+    Повторное изменение тем же содержимым не отправляется, а серия изменений одного сообщения
+    сворачивается: пока одно изменение в пути, ждёт только последнее из пришедших.
+    Хэш - только подсказка: сообщение могли изменить в обход Sender или в другом процессе
+    (webhook с несколькими воркерами), поэтому он живёт ttl секунд - столько, сколько длится
+    серия повторных нажатий, а не всё время, пока сообщение можно изменить.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 100_000,
+            ttl: float = 30.0
+    ):
+        self._digests: TTLCache[MessageKey, bytes] = TTLCache(max_size=max_size, ttl=ttl)
+        self._slots: Dict[MessageKey, _Slot] = {}
+        self.sent = 0
+        self.skipped = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def digest(message_data: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Компактный (8 байт) хэш текста, подписи, картинки и клавиатуры.
+        None - содержимое нельзя сравнить (загружаемый файл), изменение отправляется всегда.
+        """
+        photo = message_data.get("photo")
+        if photo is not None and not isinstance(photo, str):
+            return None
+        digest = blake2b(digest_size=8)
+        for field in ("text", "caption", "photo"):
+            digest.update((message_data.get(field) or "").encode())
+            digest.update(b"\0")
+        markup = message_data.get("reply_markup")
+        if markup is not None:
+            digest.update(markup.model_dump_json(exclude_none=True).encode())
+        return digest.digest()
+
+    def remember(self, key: MessageKey, digest: Optional[bytes]) -> None:
+        if digest is None:
+            self._digests.pop(key)
+        else:
+            self._digests.set(key, digest)
+
+    def forget(self, key: MessageKey) -> None:
+        self._digests.pop(key)
+
+    def _is_current(self, key: MessageKey, digest: Optional[bytes]) -> bool:
+        return digest is not None and self._digests.get(key) == digest
+
+    async def _send(self, key: MessageKey, digest: Optional[bytes], send: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await send()
+            self.sent += 1
+        except TelegramBadRequest as e:
+            if "message is not modified" not in e.message:
+                self._digests.pop(key)
+                raise
+        self.remember(key, digest)
+
+    async def edit(self, key: MessageKey, digest: Optional[bytes], send: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Отправить изменение сообщения, если оно что-то меняет.
+        Ошибка отправки достаётся тому вызывающему, чьё изменение отправлялось.
+        :param key: (chat_id, message_id)
+        :param digest: хэш нового содержимого (EditTracker.digest)
+        :param send: корутина-функция, выполняющая изменение
+        :return: bool - False, если изменение пропущено или поглощено более новым
+        """
+        if self._is_current(key, digest):
+            self.skipped += 1
+            return False
+        slot = self._slots.get(key)
+        if slot is not None:
+            if slot.pending is not None:
+                self.coalesced += 1
+                slot.pending[2].set_result(False)
+            future = asyncio.get_running_loop().create_future()
+            slot.pending = (digest, send, future)
+            return await future
+
+        slot = self._slots[key] = _Slot()
+        try:
+            try:
+                await self._send(key, digest, send)
+            finally:
+                # Изменения, пришедшие за время отправки, отправляются и при ошибке своего
+                await self._drain(key, slot)
+        finally:
+            del self._slots[key]
+        return True
+
+    async def _drain(self, key: MessageKey, slot: _Slot) -> None:
+        while slot.pending is not None:
+            (digest, send, future), slot.pending = slot.pending, None
+            if self._is_current(key, digest):
+                self.skipped += 1
+                future.set_result(False)
+                continue
+            try:
+                await self._send(key, digest, send)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._digests),
+            "in_flight": len(self._slots),
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,58 @@
+from typing import Dict, NamedTuple, Optional
+
+
+class StoredFile(NamedTuple):
+    mtime_ns: int
+    size: int
+    file_id: str
+    content_hash: Optional[str] = None
+
+
+class FileIdStore:
+    """
+    Соответствие путь к файлу -> Telegram file_id.
+    Запись действительна, пока у файла не изменились mtime и размер.
+    Базовый класс хранит данные только в памяти, наследники сохраняют их в постоянное хранилище.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, StoredFile] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def load(self) -> None:
+        """
+        Загрузка сохранённых file_id при старте.
+        """
+        pass
+
+    def get(self, path: str, mtime_ns: int, size: int) -> Optional[str]:
+        item = self._items.get(path)
+        if item is None or item.mtime_ns != mtime_ns or item.size != size:
+            return None
+        return item.file_id
+
+    def get_by_hash(self, path: str, content_hash: str) -> Optional[str]:
+        """
+        file_id по содержимому: файл могли перезаписать тем же содержимым (например, при деплое).
+        """
+        item = self._items.get(path)
+        if item is None or item.content_hash != content_hash:
+            return None
+        return item.file_id
+
+    async def set(
+            self,
+            path: str,
+            mtime_ns: int,
+            size: int,
+            file_id: str,
+            content_hash: Optional[str] = None
+    ) -> None:
+        item = StoredFile(mtime_ns, size, file_id, content_hash)
+        self._items[path] = item
+        await self._persist(path, item)
+
+    async def _persist(self, path: str, item: StoredFile) -> None:
+        pass
@@ -1,14 +1,20 @@
-from typing import Optional, List, Union, Iterable
+from typing import Optional, List, Union, Iterable, Dict
 
 from aiogram.types import InlineKeyboardButton, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from pydantic import BaseModel
 
+_buttons_cache: Dict[type, List[Union[InlineKeyboardButton, KeyboardButton]]] = {}
+
 
 class Keyboard(BaseModel):
     @classmethod
     def create_list(cls) -> Optional[List[Union[InlineKeyboardButton, KeyboardButton]]]:
-        return [v.default for v in cls.model_fields.values() if v.default is not None]
+        buttons = _buttons_cache.get(cls)
+        if buttons is None:
+            buttons = _buttons_cache[cls] = [v.default for v in cls.model_fields.values() if v.default is not None]
+        # Копия: вызывающий может дополнять список, кэш остаётся неизменным
+        return list(buttons)
 
     @classmethod
     def create_reply_markup(
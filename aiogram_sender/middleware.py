@@ -4,17 +4,44 @@ from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
 from aiogram_sender import Sender
+from aiogram_sender.edit_tracker import EditTracker
+from aiogram_sender.file_id_store import FileIdStore
+from aiogram_sender.profile_photos import ProfilePhotoCache
 
 
 class WindowMiddleware(BaseMiddleware):
     def __init__(
             self,
             private: bool = False,
-            admins: Optional[List[int]] = None
+            admins: Optional[List[int]] = None,
+            file_id_store: Optional[FileIdStore] = None,
+            profile_photo_ttl: Optional[float] = 300.0,
+            profile_photo_negative_ttl: float = 60.0,
+            profile_photo_cache_size: int = 10_000,
+            edit_tracker_size: Optional[int] = 100_000,
+            edit_tracker_ttl: float = 30.0
     ):
+        """
+        :param file_id_store: FileIdStore - хранилище file_id загруженных картинок
+        :param profile_photo_ttl: Optional[float] - время жизни фото профиля в кэше, None - без кэша
+        :param profile_photo_negative_ttl: float - время жизни отметки "нет фото"
+        :param profile_photo_cache_size: int - максимум пользователей в кэше
+        :param edit_tracker_size: Optional[int] - максимум сообщений, для которых помнится содержимое, None - без подавления повторных изменений
+        :param edit_tracker_ttl: float - сколько секунд помнится содержимое сообщения (только в этом процессе)
+        """
         super().__init__()
         self._private: bool = private
         self._admins: Optional[List[int]] = admins
+        self._file_id_store: Optional[FileIdStore] = file_id_store
+        self.profile_photos: Optional[ProfilePhotoCache] = ProfilePhotoCache(
+            max_size=profile_photo_cache_size,
+            ttl=profile_photo_ttl,
+            negative_ttl=profile_photo_negative_ttl
+        ) if profile_photo_ttl else None
+        self.edit_tracker: Optional[EditTracker] = EditTracker(
+            max_size=edit_tracker_size,
+            ttl=edit_tracker_ttl
+        ) if edit_tracker_size else None
 
     async def __call__(self,
                        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -23,7 +50,7 @@ class WindowMiddleware(BaseMiddleware):
                        ) -> Any:
 
 
-        sender = Sender(event)
+        sender = Sender(event, self._file_id_store, self.profile_photos, self.edit_tracker)
 
         data["sender"] = sender
 
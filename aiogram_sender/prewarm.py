@@ -0,0 +1,110 @@
+"""
+Предварительная загрузка картинок окон в Telegram при старте бота.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Iterable, List, Optional, Set, Type
+
+import aiofiles
+import aiofiles.os
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from loguru import logger
+
+from aiogram_sender.file_id_store import FileIdStore
+from aiogram_sender.window_builder import WindowBuilder
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def _window_classes(cls: Type[WindowBuilder]) -> Iterable[Type[WindowBuilder]]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _window_classes(subclass)
+
+
+def _sha256(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def collect_window_photos(media_dir: Optional[str] = None) -> List[str]:
+    """
+    Пути ко всем картинкам: из поля photo объявленных окон и из каталога media_dir.
+    :param media_dir: Optional[str] - каталог с картинками
+    :return: List[str]
+    """
+    paths: Set[str] = set()
+    for window in _window_classes(WindowBuilder):
+        photo = window.model_fields["photo"].default
+        if photo:
+            paths.add(photo)
+    if media_dir:
+        for root, _, files in os.walk(media_dir):
+            for name in files:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.add(os.path.join(root, name))
+    return sorted(paths)
+
+
+async def prewarm_media(
+        bot: Bot,
+        store: FileIdStore,
+        chat_id: int,
+        paths: Iterable[str],
+        concurrency: int = 4
+) -> dict:
+    """
+    Загрузка картинок в служебный чат и заполнение хранилища file_id.
+    Файлы с неизменившимися mtime/размером или хэшем содержимого не загружаются.
+    :param bot: Bot
+    :param store: FileIdStore - хранилище file_id
+    :param chat_id: int - служебный чат для загрузки
+    :param paths: Iterable[str] - пути к картинкам
+    :param concurrency: int - максимум одновременных загрузок
+    :return: dict - статистика
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"uploaded": 0, "skipped": 0, "failed": 0, "upload_time": 0.0}
+
+    async def warm(path: str) -> None:
+        try:
+            stat = await aiofiles.os.stat(path)
+            if store.get(path, stat.st_mtime_ns, stat.st_size):
+                stats["skipped"] += 1
+                return
+            # Чтение и хэширование под семафором: в памяти не больше concurrency файлов
+            async with semaphore:
+                async with aiofiles.open(file=path, mode="rb") as file:
+                    content = await file.read()
+                content_hash = await asyncio.to_thread(_sha256, content)
+                file_id = store.get_by_hash(path, content_hash)
+                if file_id:
+                    await store.set(path, stat.st_mtime_ns, stat.st_size, file_id, content_hash)
+                    stats["skipped"] += 1
+                    return
+                started = time.perf_counter()
+                message = await bot.send_photo(
+                    chat_id=chat_id,
+                    photo=BufferedInputFile(file=content, filename=os.path.basename(path)),
+                    disable_notification=True
+                )
+                elapsed = time.perf_counter() - started
+            await store.set(path, stat.st_mtime_ns, stat.st_size, message.photo[-1].file_id, content_hash)
+            stats["uploaded"] += 1
+            stats["upload_time"] += elapsed
+            logger.debug(f"Картинка {path} загружена за {elapsed:.2f} с")
+        except Exception as e:
+            stats["failed"] += 1
+            logger.error(f"Не удалось загрузить картинку {path}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(warm(path) for path in paths))
+    stats["elapsed"] = time.perf_counter() - started
+    logger.info(
+        f"Прогрев картинок: загружено {stats['uploaded']}, пропущено {stats['skipped']}, "
+        f"ошибок {stats['failed']} за {stats['elapsed']:.2f} с"
+    )
+    return stats
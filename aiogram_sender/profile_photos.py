@@ -0,0 +1,59 @@
+import asyncio
+from typing import Dict, Optional
+
+from aiogram import Bot
+
+from utils.cache import TTLCache
+
+_NO_PHOTO = ""  # отметка в кэше: у пользователя нет фото профиля
+
+
+class ProfilePhotoCache:
+    """
+    Кэш user_id -> file_id фото профиля.
+    Отсутствие фото тоже кэшируется (на negative_ttl секунд),
+    одновременные запросы для одного пользователя разделяют один вызов get_user_profile_photos.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 10_000,
+            ttl: float = 300.0,
+            negative_ttl: float = 60.0
+    ):
+        self._cache: TTLCache[int, str] = TTLCache(max_size=max_size, ttl=ttl)
+        self._in_flight: Dict[int, asyncio.Task] = {}
+        self.negative_ttl = negative_ttl
+        self.fetches = 0
+        self.shared_fetches = 0
+
+    async def get(self, bot: Bot, user_id: int) -> Optional[str]:
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            return cached or None
+        task = self._in_flight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(bot, user_id))
+            self._in_flight[user_id] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(user_id, None))
+        else:
+            self.shared_fetches += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, bot: Bot, user_id: int) -> Optional[str]:
+        self.fetches += 1
+        photos = await bot.get_user_profile_photos(user_id, limit=1)
+        if photos.total_count > 0:
+            file_id = photos.photos[0][0].file_id
+            self._cache.set(user_id, file_id)
+            return file_id
+        self._cache.set(user_id, _NO_PHOTO, ttl=self.negative_ttl)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "fetches": self.fetches,
+            "shared_fetches": self.shared_fetches,
+            "in_flight": len(self._in_flight),
+        }
@@ -1,24 +1,41 @@
+import asyncio
+import hashlib
+import time
+
 import aiofiles
-from typing import Union, Optional, Iterable, Any, Type, List
+import aiofiles.os
+from typing import Union, Optional, Iterable, Any, Type, List, Tuple
 
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, KeyboardButton, BufferedInputFile
-from pydantic_core import ValidationError
+from loguru import logger
 
+from aiogram_sender.edit_tracker import EditTracker
+from aiogram_sender.file_id_store import FileIdStore
+from aiogram_sender.profile_photos import ProfilePhotoCache
 from aiogram_sender.window_builder import WindowBuilder
+from utils.metrics import sender_seconds
+from utils.tracing import span
 
 
 class Sender:
     window: WindowBuilder
     def __init__(
             self,
-            event: Union[Message, CallbackQuery]
+            event: Union[Message, CallbackQuery],
+            file_id_store: Optional[FileIdStore] = None,
+            profile_photos: Optional[ProfilePhotoCache] = None,
+            edit_tracker: Optional[EditTracker] = None
     ):
         self.event = event
         self.photo: Optional[Union[str, bytes]] = None
         self.user_photo: bool = False
         self.sizes: Iterable[int] = (1, )
         self._message_data: Optional[dict[str, Any]] = None
+        self._file_id_store = file_id_store
+        self._profile_photos = profile_photos
+        self._edit_tracker = edit_tracker
+        self._uploaded: Optional[Tuple[str, int, int, str]] = None  # (path, mtime_ns, size, sha256) загружаемого файла
 
     def add_window(
             self,
@@ -26,78 +43,163 @@ class Sender:
             new_buttons: Optional[List[Union[InlineKeyboardButton, KeyboardButton]]] = None
     ) -> None:
 
-        self.window = window()
-
-        self._message_data = self.window.render(self.sizes, new_buttons)
+        if new_buttons:
+            self.window = window()
+            self._message_data = self.window.render(self.sizes, new_buttons)
+        else:
+            self.window, self._message_data = window.compile(self.sizes)
 
     async def _get_user_photo(self):
+        if self._profile_photos is not None:
+            file_id = await self._profile_photos.get(self.event.bot, self.event.from_user.id)
+            if file_id:
+                self.photo = file_id
+            return
         photos = await self.event.bot.get_user_profile_photos(self.event.from_user.id)
         if photos.total_count > 0:
             self.photo = photos.photos[0][0].file_id
 
     async def _reformat_photo(self):
         try:
+            stat = await aiofiles.os.stat(self.photo)
+            if self._file_id_store is not None:
+                file_id = self._file_id_store.get(self.photo, stat.st_mtime_ns, stat.st_size)
+                if file_id is not None:
+                    self.photo = file_id
+                    return
             async with aiofiles.open(file=self.photo, mode="rb") as file:
                 photo = await file.read()
+                self._uploaded = (self.photo, stat.st_mtime_ns, stat.st_size, hashlib.sha256(photo).hexdigest())
                 self.photo = BufferedInputFile(file=photo, filename="photo")
         except FileNotFoundError:
             return
         except IOError:
             self.photo = None
 
+    async def _remember_file_id(self, message: Message):
+        if self._uploaded is None or self._file_id_store is None or not message.photo:
+            return
+        path, mtime_ns, size, content_hash = self._uploaded
+        self._uploaded = None
+        try:
+            await self._file_id_store.set(path, mtime_ns, size, message.photo[-1].file_id, content_hash)
+        except Exception as e:
+            # Сообщение уже доставлено: без сохранённого file_id файл просто загрузится ещё раз
+            logger.error(f"Не удалось сохранить file_id для {path}: {e}")
+
     async def _check_photo(self):
         if not self._message_data:
             raise ValueError("Window not added")
+        if self.photo is None:
+            self.photo = self.window.photo
         if self.user_photo:
             await self._get_user_photo()
         if self.photo:
             await self._reformat_photo()
         self._message_data["photo"] = self.photo
 
+    def _has_photo(self) -> bool:
+        return bool(self._message_data.get("photo"))
+
+    def _remember_content(self, message: Message):
+        if self._edit_tracker is not None:
+            self._edit_tracker.remember(
+                (message.chat.id, message.message_id),
+                self._edit_tracker.digest(self._message_data)
+            )
+
     async def _answer_message(self):
-        await self.event.answer(**self._message_data)
+        message = await self.event.answer(
+            text=self._message_data["text"],
+            reply_markup=self._message_data["reply_markup"]
+        )
+        self._remember_content(message)
 
     async def _answer_photo(self):
-        await self.event.answer_photo(**self._message_data)
+        message = await self.event.answer_photo(
+            photo=self._message_data["photo"],
+            caption=self._message_data["caption"],
+            reply_markup=self._message_data["reply_markup"]
+        )
+        self._remember_content(message)
+        await self._remember_file_id(message)
 
     async def _answer(self):
-        try:
+        if self._has_photo():
             await self._answer_photo()
-        except ValidationError:
+        else:
             await self._answer_message()
 
     async def _edit_text(self):
-        await self.event.message.edit_text(**self._message_data)
+        await self.event.message.edit_text(
+            text=self._message_data["text"],
+            reply_markup=self._message_data["reply_markup"]
+        )
 
     async def _edit_caption(self):
-        await self.event.message.edit_caption(**self._message_data)
-
-    async def _answer_callback(self, show_alert: bool = False):
+        await self.event.message.edit_caption(
+            caption=self._message_data["caption"],
+            reply_markup=self._message_data["reply_markup"]
+        )
+
+    async def _resend(self):
+        message = self.event.message
+        self.event = message
+        if self._edit_tracker is not None:
+            self._edit_tracker.forget((message.chat.id, message.message_id))
+        await message.delete()
+        await self._answer()
+
+    async def _answer_callback(self, callback: CallbackQuery, show_alert: bool = False):
         if show_alert:
-            await self.event.answer(
+            await callback.answer(
                 self._message_data.get("text", "Произошла непредвиденная ошибка"),
                 show_alert=show_alert)
             return
-        await self.event.answer()
+        await callback.answer()
+
+    def _choose_edit(self):
+        """
+        Способ обновления выбирается заранее по окну и текущему сообщению:
+        подпись к фото, текст, или удаление и новое сообщение, если тип не совпадает.
+        """
+        message = self.event.message
+        message_has_photo = bool(getattr(message, "photo", None)) or getattr(message, "caption", None) is not None
+        if self._has_photo() and message_has_photo:
+            return self._edit_caption
+        if not self._has_photo() and getattr(message, "text", None) is not None:
+            return self._edit_text
+        return self._resend
 
     async def _edit(self, show_alert: bool = False):
-        await self._answer_callback(show_alert)
-        try:
-            await self._edit_caption()
-        except ValidationError:
-            try:
-                await self._edit_text()
-            except ValidationError:
-                self.event = self.event.message
-                await self.event.delete()
-                await self._answer()
+        callback = self.event
+        edit = self._choose_edit()
+        if edit == self._resend or self._edit_tracker is None:
+            editing = edit()
+        else:
+            # Одинаковые изменения не отправляются, серия нажатий сворачивается в последнее
+            message = callback.message
+            editing = self._edit_tracker.edit(
+                (message.chat.id, message.message_id),
+                self._edit_tracker.digest(self._message_data),
+                edit
+            )
+        # Ответ на callback и изменение сообщения независимы - отправляем параллельно
+        await asyncio.gather(self._answer_callback(callback, show_alert), editing)
 
     async def send(self):
-        await self._check_photo()
-        if isinstance(self.event, Message):
-            await self._answer()
-        else:
-            try:
-                await self._edit()
-            except TelegramBadRequest:
-                pass
\ No newline at end of file
+        started = time.perf_counter()
+        action = "answer" if isinstance(self.event, Message) else "edit"
+        try:
+            with span("sender.send", action=action):
+                await self._check_photo()
+                if action == "answer":
+                    await self._answer()
+                else:
+                    try:
+                        await self._edit()
+                    except TelegramBadRequest:
+                        pass
+        finally:
+            # Неудачные отправки тоже учитываются: иначе задержка ошибок не видна
+            sender_seconds.observe(time.perf_counter() - started, action)
\ No newline at end of file
@@ -1,16 +1,54 @@
-from typing import Optional, Iterable, Union, List
+from typing import Optional, Iterable, Union, List, ClassVar, Dict, Tuple, Any
 
-from aiogram.types import InlineKeyboardButton, KeyboardButton
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
 from pydantic import BaseModel, Field
 
 
 from aiogram_sender.keyboard import Keyboard
 
+# (класс окна, sizes) -> (экземпляр окна, результат render)
+_compiled_windows: Dict[Tuple[type, Tuple[int, ...]], Tuple["WindowBuilder", Dict[str, Any]]] = {}
+
+
+def _copy_reply_markup(markup: Any) -> Any:
+    """
+    Копия клавиатуры до уровня кнопок: изменения в одном ответе не попадают в общий кэш.
+    """
+    if isinstance(markup, InlineKeyboardMarkup):
+        field = "inline_keyboard"
+    elif isinstance(markup, ReplyKeyboardMarkup):
+        field = "keyboard"
+    else:
+        return markup
+    rows = getattr(markup, field)
+    return markup.model_copy(update={field: [[button.model_copy() for button in row] for row in rows]})
+
 
 class WindowBuilder(BaseModel):
+    static: ClassVar[bool] = True  # False - окно рендерится заново при каждом показе
     text: Optional[str] = None
+    photo: Optional[str] = None  # путь к картинке окна
     keyboard: Optional[Keyboard] = Field(default=None)
 
+    @classmethod
+    def compile(cls, sizes: Iterable[int]) -> Tuple["WindowBuilder", Dict[str, Any]]:
+        """
+        Окно без динамических кнопок рендерится один раз на (класс окна, sizes),
+        дальше переиспользуется готовый reply_markup.
+        :param sizes: Iterable[int] - раскладка кнопок
+        :return: копии экземпляра окна и данных сообщения - их можно менять, не затрагивая других пользователей
+        """
+        if not cls.static:
+            window = cls()
+            return window, window.render(sizes)
+        key = (cls, tuple(sizes))
+        compiled = _compiled_windows.get(key)
+        if compiled is None:
+            window = cls()
+            compiled = _compiled_windows[key] = (window, window.render(key[1]))
+        window, data = compiled
+        return window.model_copy(), {**data, "reply_markup": _copy_reply_markup(data["reply_markup"])}
+
     def render(
             self,
             sizes: Iterable[int],
@@ -0,0 +1,66 @@
+"""
+Пакетные записи SQLAlchemyRepository против построчных на SQLite:
+add_one + flush / add_many, edit_one / edit_many и upsert.
+
+python benchmarks/bench_bulk_writes.py [--rows 5000]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.databases import AioSQLiteDatabase  # noqa: E402
+from database.models import UserModel  # noqa: E402
+from database.uow.uow import UnitOfWork  # noqa: E402
+
+
+async def run(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        database = AioSQLiteDatabase(str(Path(directory) / "bench.db"))
+        await database.build_db()
+        session_maker = database.async_session_maker
+
+        async def measure(name: str, work) -> None:
+            started = time.perf_counter()
+            async with UnitOfWork(session_maker) as uow:
+                await work(uow)
+            elapsed = time.perf_counter() - started
+            print(f"{name:<16} {elapsed:7.3f} с  {rows / elapsed:10.0f} строк/с")
+
+        async def add_one(uow):
+            for user_id in range(rows):
+                await uow.users.add_one(UserModel(user_id))
+                await uow.session.flush()
+
+        async def add_many(uow):
+            await uow.users.add_many([dict(user_id=rows + user_id, username="bulk") for user_id in range(rows)])
+
+        async def edit_one(uow):
+            for id in range(1, rows + 1):
+                await uow.users.edit_one(id, dict(balance=1.0))
+
+        async def edit_many(uow):
+            await uow.users.edit_many([dict(id=id, balance=2.0) for id in range(1, rows + 1)])
+
+        async def upsert(uow):
+            # Половина строк уже есть (обновление), половина новые (вставка)
+            await uow.users.upsert([dict(user_id=user_id, username="upsert") for user_id in range(rows, 3 * rows)],
+                                   ["user_id"])
+
+        await measure("add_one + flush", add_one)
+        await measure("add_many", add_many)
+        await measure("edit_one", edit_one)
+        await measure("edit_many", edit_many)
+        await measure("upsert", upsert)
+        await database.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    asyncio.run(run(parser.parse_args().rows))
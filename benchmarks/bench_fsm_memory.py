@@ -0,0 +1,67 @@
+"""
+Память FSM: MemoryStorage aiogram против BoundedMemoryStorage при большом числе пользователей.
+Каждое хранилище измеряется в отдельном процессе, RSS берётся из /proc/self/status (Linux).
+Половина пользователей получает состояние и данные, вторая половина только читает состояние
+(в MemoryStorage чтение тоже создаёт запись).
+
+python benchmarks/bench_fsm_memory.py [--users 1000000] [--max-size 100000]
+"""
+
+import argparse
+import asyncio
+import gc
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+
+from utils.memory_storage import BoundedMemoryStorage  # noqa: E402
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS не найден")
+
+
+async def measure(kind: str, users: int, max_size: int) -> None:
+    storage = MemoryStorage() if kind == "memory" else BoundedMemoryStorage(max_size=max_size, ttl=3600)
+    gc.collect()
+    before = rss_mib()
+    started = time.perf_counter()
+    for user_id in range(users):
+        key = StorageKey(bot_id=1, chat_id=10 ** 9 + user_id, user_id=10 ** 9 + user_id)
+        if user_id % 2:
+            await storage.set_state(key, "Form:name")
+            await storage.set_data(key, {"page": user_id % 10})
+        else:
+            await storage.get_state(key)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    entries = len(storage.storage) if kind == "memory" else storage.stats()["size"]
+    label = kind if kind == "memory" else f"{kind} (max_size={max_size})"
+    print(f"{label:<28} +{rss_mib() - before:8.1f} MiB RSS  записей {entries:>8}  {elapsed:5.1f} с", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--max-size", type=int, default=100_000, help="лимит BoundedMemoryStorage")
+    parser.add_argument("--kind", choices=["memory", "bounded"], help="измерить одно хранилище в этом процессе")
+    args = parser.parse_args()
+    if args.kind:
+        asyncio.run(measure(args.kind, args.users, args.max_size))
+    else:
+        # bounded без вытеснения (max_size = users) показывает компактность записей, с лимитом - потолок памяти
+        for kind, max_size in (("memory", args.users), ("bounded", args.users), ("bounded", args.max_size)):
+            subprocess.run(
+                [sys.executable, __file__, "--kind", kind, "--users", str(args.users), "--max-size", str(max_size)],
+                check=True
+            )
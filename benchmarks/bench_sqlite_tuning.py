@@ -0,0 +1,74 @@
+"""
+AioSQLiteDatabase по умолчанию против производственного режима SQLiteTuning
+(WAL, PRAGMA, одно соединение для записи, пул read-only соединений для чтения)
+при конкурентных чтениях и записях.
+
+python benchmarks/bench_sqlite_tuning.py [--users 10000] [--tasks 50] [--operations 200] [--writes 0.2]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from database.config import SQLiteTuning  # noqa: E402
+from database.databases import AioSQLiteDatabase  # noqa: E402
+from database.uow.uow import UnitOfWork  # noqa: E402
+
+
+async def measure(name: str, tuning: Optional[SQLiteTuning], args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        database = AioSQLiteDatabase(str(Path(directory) / "bench.db"), tuning=tuning)
+        await database.build_db()
+        async with UnitOfWork(database.async_session_maker) as uow:
+            await uow.users.add_many([dict(user_id=user_id) for user_id in range(args.users)])
+
+        reads = writes = errors = 0
+
+        async def worker(seed: int) -> None:
+            nonlocal reads, writes, errors
+            rng = random.Random(seed)
+            for _ in range(args.operations):
+                user_id = rng.randrange(args.users)
+                try:
+                    if rng.random() < args.writes:
+                        async with UnitOfWork(database.async_session_maker) as uow:
+                            await uow.users.add_balance(user_id, 1.0)
+                        writes += 1
+                    else:
+                        async with UnitOfWork(database.async_session_maker) as uow:
+                            await uow.users.get_by_filter(dict(user_id=user_id))
+                        reads += 1
+                except OperationalError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(seed) for seed in range(args.tasks)))
+        elapsed = time.perf_counter() - started
+        await database.shutdown()
+    print(
+        f"{name:<8} {elapsed:7.2f} с  {(reads + writes) / elapsed:8.0f} оп/с  "
+        f"чтений {reads:>6}  записей {writes:>6}  ошибок {errors}"
+    )
+
+
+async def run(args) -> None:
+    await measure("stock", None, args)
+    await measure("tuned", SQLiteTuning(), args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--writes", type=float, default=0.2, help="доля операций записи")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,108 @@
+"""
+Пропускная способность webhook в одном и нескольких процессах (SO_REUSEPORT).
+Хэндлер нагружает процессор примерно на 5 мс, в Telegram ничего не отправляется.
+Прирост виден только на машине с несколькими ядрами.
+
+python benchmarks/bench_webhook_processes.py [--processes 1 2 4] [--updates 400] [--port 3111]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.types import Message  # noqa: E402
+
+from bot_setting import BotDefault  # noqa: E402
+from webhook_settings import Webhook  # noqa: E402
+
+
+def _update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id, "type": "private"},
+            "text": "bench",
+        },
+    }
+
+
+async def _serve(processes: int, port: int, done_path: str) -> None:
+    bot = BotDefault("42:BENCH", logging=False)
+
+    async def skip(*args, **kwargs):
+        return None
+
+    # Без обращений к Telegram: webhook не устанавливается и не удаляется
+    bot._set_webhook = skip
+    bot._shutdown_webhook = skip
+
+    @bot.dispatcher.message()
+    async def handler(message: Message):
+        total = 0
+        for i in range(100_000):
+            total += i
+        # Воркеры - отдельные процессы: обработанные updates считаются по размеру общего файла
+        fd = os.open(done_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        os.write(fd, b"x")
+        os.close(fd)
+
+    webhook = Webhook(url="https://example.com/webhook", port=port, processes=processes, workers=8, queue_size=10_000)
+    await bot._webhook(webhook)
+
+
+async def measure(processes: int, updates: int, port: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        done_path = str(Path(directory) / "done")
+        server = asyncio.create_task(_serve(processes, port, done_path))
+        await asyncio.sleep(1.5)  # запуск воркеров
+        semaphore = asyncio.Semaphore(50)
+        async with ClientSession() as session:
+
+            async def post(update_id: int) -> int:
+                async with semaphore:
+                    async with session.post(f"http://127.0.0.1:{port}/webhook", json=_update(update_id)) as response:
+                        return response.status
+
+            started = time.perf_counter()
+            statuses = await asyncio.gather(*(post(update_id) for update_id in range(1, updates + 1)))
+            while not os.path.exists(done_path) or os.path.getsize(done_path) < updates:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - started
+
+        server.cancel()
+        try:
+            await server
+        except asyncio.CancelledError:
+            pass
+    if set(statuses) != {200}:
+        print(f"  ответы: {sorted(set(statuses))}")
+    return elapsed
+
+
+async def run(processes_list, updates: int, port: int) -> None:
+    print(f"ядер: {os.cpu_count()}, updates: {updates}")
+    baseline = None
+    for processes in processes_list:
+        elapsed = await measure(processes, updates, port)
+        throughput = updates / elapsed
+        baseline = baseline or throughput
+        print(f"processes={processes:<3} {elapsed:7.2f} с  {throughput:8.0f} upd/с  x{throughput / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--updates", type=int, default=400)
+    parser.add_argument("--port", type=int, default=3111)
+    args = parser.parse_args()
+    asyncio.run(run(args.processes, args.updates, args.port))
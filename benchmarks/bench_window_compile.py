@@ -0,0 +1,40 @@
+"""
+Сравнение WindowBuilder.render (новое окно при каждом показе) и WindowBuilder.compile
+(готовое окно из кэша с копией клавиатуры).
+
+python benchmarks/bench_window_compile.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.types import InlineKeyboardButton  # noqa: E402
+
+from aiogram_sender import Keyboard, WindowBuilder  # noqa: E402
+
+
+class BenchKeyboard(Keyboard):
+    a: InlineKeyboardButton = InlineKeyboardButton(text="a", callback_data="a")
+    b: InlineKeyboardButton = InlineKeyboardButton(text="b", callback_data="b")
+    c: InlineKeyboardButton = InlineKeyboardButton(text="c", callback_data="c")
+    d: InlineKeyboardButton = InlineKeyboardButton(text="d", callback_data="d")
+
+
+class BenchWindow(WindowBuilder):
+    text: str = "hello"
+    keyboard: BenchKeyboard = BenchKeyboard()
+
+
+def main(number: int = 20_000) -> None:
+    assert BenchWindow().render((2,)) == BenchWindow.compile((2,))[1]
+    render = timeit.timeit(lambda: BenchWindow().render((2,)), number=number) / number * 1e6
+    compiled = timeit.timeit(lambda: BenchWindow.compile((2,)), number=number) / number * 1e6
+    print(f"render:  {render:.1f} мкс")
+    print(f"compile: {compiled:.1f} мкс ({render / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
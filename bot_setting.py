@@ -1,16 +1,28 @@
 import asyncio
-from typing import Literal
+import contextlib
+import os
+import signal
+import time
+from typing import Literal, Callable, Awaitable, Any, Dict, List, Optional, Tuple
 
 from aiohttp import web
 from loguru import logger
 
 from aiogram import Bot, Dispatcher, Router, BaseMiddleware
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.webhook.aiohttp_server import setup_application
 
+from aiogram_sender.middleware import WindowMiddleware
+from database.fsm_storage import DatabaseStorage
 from exceptions import WebhookError
 from log_settings import set_log
+from middlewares.request_scheduler import RequestScheduler
+from polling_handler import ShardedPolling
+from utils.metrics import MetricsRegistry
+from polling_settings import Polling
+from webhook_handler import QueuedRequestHandler
 from webhook_settings import Webhook
 
 
@@ -24,6 +36,11 @@ class BotDefault:
 
         self.bot = Bot(token=token, default=DefaultBotProperties(parse_mode="HTML"))
         self.dispatcher = Dispatcher(storage=storage or MemoryStorage())
+        self._startup_stages: List[Callable[[Bot], Awaitable[Any]]] = []
+        self._worker_start_hooks: List[Callable[[], Awaitable[Any]]] = []
+        self.webhook_handler: Optional[QueuedRequestHandler] = None
+        self.polling: Optional[ShardedPolling] = None
+        self._metrics: Optional[Tuple[MetricsRegistry, int, str, str]] = None
 
         if logging:
             set_log()
@@ -36,6 +53,20 @@ class BotDefault:
         """
         self.dispatcher.include_routers(*routers)
 
+    def add_startup_stage(self, stage: Callable[[Bot], Awaitable[Any]]) -> None:
+        """
+        Добавление этапа, который выполнится при запуске до приёма updates.
+        :param stage: Callable[[Bot], Awaitable] - корутина, получающая Bot
+        :return: None
+        """
+        self._startup_stages.append(stage)
+
+    async def _run_startup_stages(self) -> None:
+        for stage in self._startup_stages:
+            started = time.perf_counter()
+            await stage(self.bot)
+            logger.info(f"Этап запуска {getattr(stage, '__name__', stage)} выполнен за {time.perf_counter() - started:.2f} с")
+
     async def delete_webhook(self) -> None:
         """
         Удаление старых updates
@@ -47,68 +78,287 @@ class BotDefault:
             self,
             middleware: BaseMiddleware,
             message: bool = True,
-            callback_query: bool = True
+            callback_query: bool = True,
+            outer: bool = False
     ) -> None:
         """
         Добавление middlewares.
         :param middleware: BaseMiddleware
         :param message: bool - middleware будет работать на сообщениях
         :param callback_query: bool - middleware будет работать на callback
+        :param outer: bool - outer middleware: вызывается до фильтров, в том числе для необработанных событий
         :return: None
         """
         if message:
-            self.dispatcher.message.middleware(middleware)
+            observer = self.dispatcher.message
+            (observer.outer_middleware if outer else observer.middleware)(middleware)
         if callback_query:
-            self.dispatcher.callback_query.middleware(middleware)
+            observer = self.dispatcher.callback_query
+            (observer.outer_middleware if outer else observer.middleware)(middleware)
+
+    def enable_metrics(
+            self,
+            registry: MetricsRegistry,
+            port: int = 9100,
+            path: str = "/metrics",
+            host: str = "127.0.0.1"
+    ) -> None:
+        """
+        Отдача метрик в формате Prometheus: в режиме webhook - маршрутом приложения webhook,
+        в режиме long polling - отдельным HTTP-сервером на port.
+        Webhook в нескольких процессах: метрики у каждого воркера свои, а порт webhook общий,
+        поэтому каждый воркер отдаёт их отдельным сервером на port + номер воркера.
+        Метрики registry начинают считаться только после этого вызова.
+        :param registry: MetricsRegistry
+        :param port: int - порт отдельного сервера (первого воркера)
+        :param path: str - путь метрик
+        :param host: str - адрес отдельного сервера, "0.0.0.0" - доступен извне
+        :return: None
+        """
+        registry.enable()
+        self._metrics = (registry, port, path, host)
+
+    def _add_metrics_route(self, app: web.Application) -> None:
+        registry, _, path, _ = self._metrics
+
+        async def metrics(request: web.Request) -> web.Response:
+            return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+        app.router.add_get(path, metrics)
+
+    async def _start_metrics_server(self, index: int = 0) -> Optional[web.AppRunner]:
+        """
+        Отдельный HTTP-сервер метрик.
+        :param index: int - номер воркера webhook, сервер слушает port + index
+        """
+        if self._metrics is None:
+            return None
+        _, port, path, host = self._metrics
+        app = web.Application()
+        self._add_metrics_route(app)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host=host, port=port + index).start()
+        logger.info(f"Метрики доступны на {host}:{port + index}{path}")
+        return runner
 
-    async def _long_polling(self, delete_webhook: bool = True):
+    def add_request_middleware(self, middleware: BaseRequestMiddleware) -> None:
+        """
+        Добавление middleware исходящих запросов к Bot API.
+        :param middleware: BaseRequestMiddleware
+        :return: None
+        """
+        self.bot.session.middleware(middleware)
+
+    async def _long_polling(self, delete_webhook: bool = True, polling: Optional[Polling] = None):
         """
         Запуск бота в режиме long polling
         :param delete_webhook:
+        :param polling: Polling - параллельная обработка по чатам, None - стандартный start_polling
         :return:
         """
+        metrics_runner = await self._start_metrics_server()
         try:
             if delete_webhook:
                 await self.delete_webhook()
-            logger.info("Бот запущен в режиме long polling")
-            await self.dispatcher.start_polling(self.bot)
+            if polling is None:
+                logger.info("Бот запущен в режиме long polling")
+                await self.dispatcher.start_polling(self.bot)
+            else:
+                logger.info(f"Бот запущен в режиме long polling: {polling.workers} шардов")
+                self.polling = ShardedPolling(self.dispatcher, self.bot, polling)
+                await self.polling.run()
         finally:
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
             await self.bot.session.close()
 
-    async def _webhook(self, webhook: Webhook):
-        """
-        Запуск бота в режиме webhook.
-        :return:
-        """
+    async def _set_webhook(self, webhook: Webhook) -> None:
         webhook_info = await self.bot.get_webhook_info()
 
-        if webhook_info.url != webhook.url:
-            await self.bot.set_webhook(url=webhook.url)
+        if webhook_info.url != str(webhook.url):
+            await self.bot.set_webhook(url=str(webhook.url))
             logger.info(f"Webhook установлен на {webhook.url}")
         else:
             logger.info("Webhook уже установлен")
 
+    async def _serve_webhook(self, webhook: Webhook, stop: asyncio.Event, reuse_port: bool = False) -> None:
+        """
+        HTTP-сервер webhook до установки stop.
+        :param reuse_port: bool - SO_REUSEPORT, чтобы порт слушали несколько процессов
+        """
         app = web.Application()
 
-        webhook_handler = SimpleRequestHandler(
+        self.webhook_handler = QueuedRequestHandler(
             dispatcher=self.dispatcher,
-            bot=self.bot
+            bot=self.bot,
+            workers=webhook.workers,
+            queue_size=webhook.queue_size,
+            drain_timeout=webhook.drain_timeout
         )
-        webhook_handler.register(app, path=webhook.path)
+        self.webhook_handler.register(app, path=webhook.path)
         setup_application(app, self.dispatcher, bot=self.bot)
+        if self._metrics is not None and not reuse_port:
+            self._add_metrics_route(app)  # с несколькими процессами ответил бы случайный воркер
 
         runner = web.AppRunner(app)
         await runner.setup()
 
         try:
-            site = web.TCPSite(runner, host="0.0.0.0", port=webhook.port)
-            logger.info("Бот запущен в режиме webhook.")
+            site = web.TCPSite(runner, host="0.0.0.0", port=webhook.port, reuse_port=reuse_port or None)
             await site.start()
-            await asyncio.Event().wait()  # Ожидаем завершения
+            await stop.wait()  # Ожидаем завершения
+        finally:
+            await runner.cleanup()  # Доработка очереди updates и закрытие сессии бота
+
+    async def _webhook(self, webhook: Webhook):
+        """
+        Запуск бота в режиме webhook.
+        :return:
+        """
+        if webhook.processes > 1:
+            return await self._webhook_processes(webhook)
+
+        await self._set_webhook(webhook)
+        try:
+            logger.info("Бот запущен в режиме webhook.")
+            await self._serve_webhook(webhook, asyncio.Event())
         except Exception as e:
             logger.error(f"{e}")
         finally:
             await self._shutdown_webhook()
+            await self.bot.session.close()
+
+    def add_worker_start_hook(self, hook: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Добавление корутины, которая выполнится в каждом процессе-воркере webhook сразу после fork,
+        например пересоздание пула соединений с БД.
+        :param hook: Callable[[], Awaitable]
+        :return: None
+        """
+        self._worker_start_hooks.append(hook)
+
+    async def _webhook_processes(self, webhook: Webhook):
+        """
+        Webhook в нескольких процессах, слушающих один порт (SO_REUSEPORT).
+        Главный процесс устанавливает и удаляет webhook и перезапускает упавших воркеров,
+        updates обрабатывают только воркеры.
+        """
+        if not hasattr(os, "fork"):
+            raise WebhookError("Несколько процессов webhook требуют os.fork (Linux/macOS)")
+        self._split_process_state(webhook.processes)
+        await self._set_webhook(webhook)
+        # Соединения сессии бота не должны достаться воркерам: каждый откроет свои
+        await self.bot.session.close()
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        workers: Dict[int, Tuple[int, float]] = {}  # pid -> (номер воркера, время запуска)
+        fast_failures = 0
+        try:
+            for index in range(webhook.processes):
+                pid = self._fork_webhook_worker(webhook, index)
+                workers[pid] = (index, time.monotonic())
+            logger.info(f"Бот запущен в режиме webhook: {webhook.processes} процессов.")
+
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                for pid, status in self._reap_workers(workers):
+                    index, started = workers.pop(pid)
+                    logger.error(f"Воркер webhook {index} (pid {pid}) завершился с кодом {status}, перезапуск")
+                    fast_failures = fast_failures + 1 if time.monotonic() - started < webhook.worker_min_uptime else 0
+                    if fast_failures > webhook.processes * 3:
+                        raise WebhookError("Воркеры webhook падают сразу после запуска")
+                    new_pid = self._fork_webhook_worker(webhook, index)
+                    workers[new_pid] = (index, time.monotonic())
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+            await self._stop_webhook_workers(workers, webhook.drain_timeout + 5)
+            await self._shutdown_webhook()
+            await self.bot.session.close()
+
+    def _split_process_state(self, processes: int) -> None:
+        """
+        Подготовка состояния, которое каждый воркер держит в своей памяти.
+        Общий лимит RequestScheduler делится между воркерами, иначе бот отправлял бы processes * global_rate
+        сообщений в секунду. EditTracker не видит изменений сообщения из других воркеров и пропустил бы
+        нужное изменение как повтор, поэтому с ним несколько процессов не запускаются.
+        Кэш DatabaseStorage тоже у каждого воркера свой: записи в нём начинают устаревать через cache_ttl,
+        чтобы чужие изменения становились видны.
+        """
+        for middleware in self.bot.session.middleware:
+            if isinstance(middleware, RequestScheduler):
+                middleware.processes = processes
+        if isinstance(self.dispatcher.storage, DatabaseStorage):
+            self.dispatcher.storage.processes = processes
+        for observer in (self.dispatcher.message, self.dispatcher.callback_query):
+            for middleware in (*observer.outer_middleware, *observer.middleware):
+                if isinstance(middleware, WindowMiddleware) and middleware.edit_tracker is not None:
+                    raise WebhookError(
+                        "EditTracker хранит содержимое сообщений в памяти процесса: "
+                        "для нескольких процессов webhook создайте WindowMiddleware(edit_tracker_size=None)"
+                    )
+
+    def _fork_webhook_worker(self, webhook: Webhook, index: int) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+        # Процесс-воркер: asyncio сбрасывает запущенный цикл после fork, запускаем свой
+        code = 0
+        try:
+            asyncio.run(self._webhook_worker(webhook, index))
+        except BaseException as e:
+            logger.exception(f"Воркер webhook {index} упал: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    async def _webhook_worker(self, webhook: Webhook, index: int) -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        for hook in self._worker_start_hooks:
+            await hook()
+        logger.info(f"Воркер webhook {index} (pid {os.getpid()}) запущен")
+        metrics_runner = await self._start_metrics_server(index)
+        try:
+            await self._serve_webhook(webhook, stop, reuse_port=True)
+        finally:
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+
+    @staticmethod
+    def _reap_workers(workers: Dict[int, Tuple[int, float]]) -> List[Tuple[int, int]]:
+        exited = []
+        for pid in list(workers):
+            try:
+                finished, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished, status = pid, -1
+            if finished:
+                exited.append((pid, os.waitstatus_to_exitcode(status) if status >= 0 else status))
+        return exited
+
+    async def _stop_webhook_workers(self, workers: Dict[int, Tuple[int, float]], timeout: float) -> None:
+        for pid in workers:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while workers and time.monotonic() < deadline:
+            for pid, _ in self._reap_workers(workers):
+                workers.pop(pid)
+            await asyncio.sleep(0.1)
+        for pid in workers:
+            logger.warning(f"Воркер webhook pid {pid} не завершился за {timeout} с, SIGKILL")
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+        workers.clear()
 
     async def _shutdown_webhook(self):
         try:
@@ -123,17 +373,20 @@ class BotDefault:
             self,
             regime: Literal["long_polling", "webhook"] = "long_polling",
             delete_webhook: bool = True,
-            webhook: Webhook = None
+            webhook: Webhook = None,
+            polling: Optional[Polling] = None
     ) -> None:
         """
         Запуск бота!
         :param regime: Literal - выбор режима для запуска бота. По умолчанию long polling
         :param delete_webhook: bool - вызывает метод удаления старых updates
         :param webhook: Webhook - параметры настройки webhook
+        :param polling: Polling - параметры long polling с обработкой по шардам чатов
         :return: None
         """
+        await self._run_startup_stages()
         if regime == "long_polling":
-            await self._long_polling(delete_webhook)
+            await self._long_polling(delete_webhook, polling)
         else:
             if not webhook:
                 raise WebhookError("Не передан параметр webhook -> Webhook()")
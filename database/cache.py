@@ -0,0 +1,96 @@
+"""
+Кэш сущностей для репозиториев.
+"""
+
+import copy
+from itertools import chain
+from typing import Any, Dict, Hashable, Iterable, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from utils.cache import TTLCache
+
+EntityKey = Tuple[str, Tuple[Any, ...]]
+CachedRow = Tuple[Tuple[Any, ...], Dict[str, Any]]  # (первичный ключ, значения колонок)
+
+CHANGES = "cache_changes"  # ключ в Session.info: сущности, изменённые в текущей транзакции
+
+_IMMUTABLE = (int, float, str, bytes, bool, type(None))
+
+
+def copy_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Копия значений колонок: изменяемые значения (JSON) не должны быть общими между сессиями.
+    """
+    return {key: value if isinstance(value, _IMMUTABLE) else copy.deepcopy(value) for key, value in values.items()}
+
+
+def _track_flush(session: Session, flush_context) -> None:
+    changes = session.info.setdefault(CHANGES, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        mapper = type(obj).__mapper__
+        changes.add((type(obj).__name__, tuple(mapper.primary_key_from_instance(obj))))
+
+
+def _track_orm_writes(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info.setdefault(CHANGES, set())
+
+
+class RepositoryCache(TTLCache[Hashable, CachedRow]):
+    """
+    Кэш результатов get_by_id/get_by_filter.
+    Хранятся не ORM-объекты, а копии закоммиченных значений колонок: каждая сессия получает
+    свой экземпляр. Ключи строятся из имени модели и фильтра, а индекс по первичному ключу позволяет
+    сбросить все ключи, указывающие на изменённую строку. Каждый сброс увеличивает поколение модели:
+    результат чтения, начатого до сброса, в кэш не попадает.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 30.0):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self._keys_by_entity: Dict[EntityKey, Set[Hashable]] = {}
+        self._generations: Dict[str, int] = {}
+        if not event.contains(Session, "after_flush", _track_flush):
+            event.listen(Session, "after_flush", _track_flush)
+            event.listen(Session, "do_orm_execute", _track_orm_writes)
+
+    def generation(self, model_name: str) -> int:
+        return self._generations.get(model_name, 0)
+
+    def put(self, key: Hashable, identity: Tuple[Any, ...], values: Dict[str, Any], generation: int) -> bool:
+        """
+        Сохранить строку, прочитанную при поколении generation.
+        :return: bool - False, если модель сбрасывалась после начала чтения
+        """
+        if self._generations.get(key[0], 0) != generation:
+            return False
+        self.set(key, (identity, values))
+        self._keys_by_entity.setdefault((key[0], identity), set()).add(key)
+        return True
+
+    def invalidate(self, model_name: str, identity: Tuple[Any, ...]) -> None:
+        self._generations[model_name] = self._generations.get(model_name, 0) + 1
+        for key in self._keys_by_entity.pop((model_name, identity), ()):
+            self.pop(key)
+
+    def invalidate_model(self, model_name: str) -> None:
+        self._generations[model_name] = self._generations.get(model_name, 0) + 1
+        for entity in [entity for entity in self._keys_by_entity if entity[0] == model_name]:
+            self.invalidate(*entity)
+
+    def invalidate_entities(self, entities: Iterable[EntityKey]) -> None:
+        """
+        Сброс сущностей, записанных flush закоммиченной транзакции (Session.info[CHANGES]).
+        """
+        for model_name, identity in entities:
+            self.invalidate(model_name, identity)
+
+    def _on_remove(self, key: Hashable, value: CachedRow) -> None:
+        entity = (key[0], value[0])
+        keys = self._keys_by_entity.get(entity)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_entity[entity]
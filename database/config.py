@@ -0,0 +1,56 @@
+"""
+Модели настройки подключений к базам данных.
+"""
+
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class SQLiteTuning(BaseModel):
+    """
+    Производственный режим SQLite: WAL, PRAGMA на каждом соединении,
+    одно соединение для записи и небольшой пул соединений для чтения.
+    """
+    journal_mode: str = Field(default="WAL", title="Режим журнала")
+    synchronous: str = Field(default="NORMAL", title="Уровень fsync", examples=["NORMAL", "FULL"])
+    mmap_size: int = Field(default=256 * 1024 * 1024, ge=0, title="Размер memory-mapped I/O, байт")
+    cache_size: int = Field(default=-64_000, title="Кэш страниц: > 0 - страниц, < 0 - КиБ")
+    busy_timeout: int = Field(default=5000, ge=0, title="Ожидание блокировки, мс")
+    temp_store: str = Field(default="MEMORY", title="Хранение временных таблиц", examples=["MEMORY", "FILE"])
+    read_pool_size: int = Field(default=4, ge=1, title="Соединений для чтения")
+
+    def pragmas(self) -> dict:
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+            "busy_timeout": self.busy_timeout,
+            "temp_store": self.temp_store,
+        }
+
+
+class PostgresPoolConfig(BaseModel):
+    """
+    Пул соединений PostgresDatabase.
+    pre_ping: "always" - проверка при каждой выдаче из пула (лишний запрос к серверу),
+    "lazy" - только если соединение простаивало дольше idle_threshold, "never" - без проверки.
+    """
+    pool_size: int = Field(default=20, ge=1, title="Постоянных соединений")
+    max_overflow: int = Field(default=10, ge=0, title="Дополнительных соединений под пиковую нагрузку")
+    pool_recycle: int = Field(default=1800, title="Пересоздавать соединения старше, сек (-1 - никогда)")
+    pool_timeout: float = Field(default=30.0, gt=0, title="Ожидание свободного соединения, сек")
+    pre_ping: Literal["always", "lazy", "never"] = Field(default="lazy", title="Проверка соединения при выдаче")
+    idle_threshold: float = Field(default=30.0, ge=0, title="Простой, после которого lazy-режим проверяет соединение, сек")
+    prepared_statement_cache_size: int = Field(default=100, ge=0, title="Кэш подготовленных запросов asyncpg")
+
+
+class ReplicaConfig(BaseModel):
+    """
+    Реплики для чтения (UnitOfWork.read_only()).
+    targets - пути к файлам для SQLite или "host:port" для Postgres.
+    """
+    targets: List[str] = Field(default_factory=list, title="Реплики")
+    cooldown: float = Field(default=30.0, ge=0, title="Сколько не использовать недоступную реплику, сек")
+    read_your_writes: float = Field(default=5.0, ge=0, title="Сколько читать с основной базы после записи пользователя, сек")
@@ -1,17 +1,56 @@
+import time
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List, Optional
 
 from loguru import logger
-from sqlalchemy import text
+from sqlalchemy import text, event, Insert, Update, Delete
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine
 )
+from sqlalchemy.orm import Session
 
+from database.config import PostgresPoolConfig, ReplicaConfig, SQLiteTuning
 from database.models import Base
+from database.pool import InstrumentedPool, enable_lazy_ping
+from database.replicas import ReplicaRouter
+from database.schema import UNCHANGED, drop_schema, lock_schema, schema_unchanged, sync_schema
+
+
+class ReadWriteSession(Session):
+    """
+    Сессия с раздельными соединениями для чтения и записи.
+    Запросы уходят в "reader", пока транзакция ничего не записала; с первой записи
+    (flush, INSERT/UPDATE/DELETE) и до конца транзакции все запросы идут в "writer".
+    """
+    _writes = False
+    _writer_transaction = None
+
+    def execute(self, statement, *args, **kwargs):
+        writes, self._writes = self._writes, isinstance(statement, (Insert, Update, Delete))
+        try:
+            return super().execute(statement, *args, **kwargs)
+        finally:
+            self._writes = writes
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        engines = self.info.get("engines")
+        if not engines:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        transaction = self.get_transaction()
+        if self._flushing or self._writes or isinstance(clause, (Insert, Update, Delete)):
+            if transaction is None:
+                # Запись - первый запрос сессии: транзакция начинается здесь, чтобы закрепить её за writer
+                transaction = self.begin()
+            self._writer_transaction = transaction
+            return engines["writer"]
+        if transaction is not None and self._writer_transaction is transaction:
+            return engines["writer"]
+        return engines["reader"]
 
 
 class _AbstractDatabase(ABC):
@@ -19,6 +58,8 @@ class _AbstractDatabase(ABC):
 
     def __init__(self, *args, **kwargs):
         self.engine = None
+        self.read_engine = None  # отдельный пул соединений для чтения, если есть
+        self.replicas: Optional[ReplicaRouter] = None  # реплики для UnitOfWork.read_only()
         self.async_session_maker = None
         self.create_engine()
 
@@ -44,6 +85,71 @@ class _AbstractDatabase(ABC):
         """
         pass
 
+    async def _prepare_schema(self, conn, is_delete: bool) -> None:
+        """
+        Подготовка базы под блокировкой схемы, до приведения таблиц к моделям
+        """
+        if is_delete:
+            await conn.run_sync(drop_schema)
+
+    async def _sync_schema(self, is_delete: bool = False):
+        """
+        Общая часть build_db: пересоздание (is_delete) или добавление недостающих таблиц и колонок.
+        Если отпечаток схемы в базе совпадает с моделями, схема только читается: без блокировки и DDL.
+        """
+        started = time.perf_counter()
+        result = UNCHANGED
+        if not is_delete:
+            async with self.engine.connect() as conn:
+                unchanged = await conn.run_sync(schema_unchanged)
+        if is_delete or not unchanged:
+            async with self.engine.begin() as conn:
+                await conn.run_sync(lock_schema)
+                await self._prepare_schema(conn, is_delete)
+                result = await conn.run_sync(sync_schema, True)
+        logger.info(f"Схема БД: {result}, {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    def _create_replicas(self, config: Optional[ReplicaConfig], urls: List[str], **engine_kwargs):
+        """
+        Создание движков реплик и маршрутизатора чтения
+        :param config: Optional[ReplicaConfig] - настройки реплик
+        :param urls: List[str] - адреса реплик в порядке config.targets
+        :param engine_kwargs: параметры create_async_engine
+        """
+        if self.replicas is not None or config is None or not urls:
+            return
+        self.replicas = ReplicaRouter(
+            [create_async_engine(url, echo=False, **engine_kwargs) for url in urls],
+            cooldown=config.cooldown,
+            read_your_writes=config.read_your_writes
+        )
+
+    def pool_metrics(self) -> dict:
+        """
+        Состояние пула соединений: занятые, overflow, ожидание выдачи, возраст соединений
+        """
+        if self.engine is None:
+            return {}
+        pool = self.engine.pool
+        if isinstance(pool, InstrumentedPool):
+            return pool.metrics()
+        return {"status": pool.status()}
+
+    def engines(self) -> List[AsyncEngine]:
+        """
+        Все движки базы: основной, пул чтения и реплики
+        """
+        return [engine for engine in (self.engine, self.read_engine, *(self.replicas.engines if self.replicas else ()))
+                if engine is not None]
+
+    async def reset_after_fork(self):
+        """
+        Сброс пулов соединений, унаследованных дочерним процессом после fork.
+        Соединения родителя не закрываются, процесс откроет свои.
+        """
+        for engine in self.engines():
+            await engine.dispose(close=False)
+
     async def shutdown(self):
         """
         Закрытие соединения с БД
@@ -52,6 +158,12 @@ class _AbstractDatabase(ABC):
             logger.info("Закрытие соединения с БД...")
             await self.engine.dispose()
             self.engine = None
+            if self.read_engine:
+                await self.read_engine.dispose()
+                self.read_engine = None
+            if self.replicas:
+                await self.replicas.dispose()
+                self.replicas = None
             logger.info("Соединение с БД закрыто.")
 
 class PostgresDatabase(_AbstractDatabase):
@@ -62,26 +174,52 @@ class PostgresDatabase(_AbstractDatabase):
             host: str,
             port: int,
             database: str,
-
+            pool: Optional[PostgresPoolConfig] = None,
+            replicas: Optional[ReplicaConfig] = None
     ):
+        """
+        :param pool: Optional[PostgresPoolConfig] - настройки пула, по умолчанию PostgresPoolConfig()
+        :param replicas: Optional[ReplicaConfig] - реплики "host:port" с теми же учётными данными
+        """
         self.user = user
         self.password = password
         self.host = host
         self.port = port
         self.database = database
+        self.pool = pool or PostgresPoolConfig()
+        self.replica_config = replicas
         super().__init__()
 
+    def _url(self, host: str, port: int) -> str:
+        return f"postgresql+asyncpg://{self.user}:{self.password}@{host}:{port}/{self.database}"
+
     def create_engine(self):
         if self.engine:
             return
+        pool_kwargs = dict(
+            poolclass=InstrumentedPool,  # Пул с телеметрией, см. pool_metrics()
+            pool_size=self.pool.pool_size,
+            max_overflow=self.pool.max_overflow,
+            pool_recycle=self.pool.pool_recycle,
+            pool_timeout=self.pool.pool_timeout,
+            pool_pre_ping=self.pool.pre_ping == "always",
+            connect_args={"prepared_statement_cache_size": self.pool.prepared_statement_cache_size},
+        )
         self.engine = create_async_engine(
-            url=f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}",
+            url=self._url(self.host, self.port),
             echo=False,  # Уменьшает нагрузку на логгер
-            pool_size=20,  # Увеличиваем пул соединений для высокой нагрузки
-            max_overflow=10,  # Запас соединений, если 20 заняты
-            pool_recycle=1800,  # Закрывает соединения, которые простаивают > 30 минут
-            pool_pre_ping=True,  # Проверяет соединение перед выдачей из пула
+            **pool_kwargs
+            )
+        if self.replica_config is not None:
+            self._create_replicas(
+                self.replica_config,
+                [self._url(host, int(port)) for host, port in
+                 (target.rsplit(":", 1) for target in self.replica_config.targets)],
+                **pool_kwargs
             )
+        for engine in [self.engine, *(self.replicas.engines if self.replicas else ())]:
+            if self.pool.pre_ping == "lazy":
+                enable_lazy_ping(engine.sync_engine, self.pool.idle_threshold)
         self.async_session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
 
     @asynccontextmanager
@@ -92,20 +230,19 @@ class PostgresDatabase(_AbstractDatabase):
         async with self.async_session_maker() as session:
             yield session
 
+    async def _prepare_schema(self, conn, is_delete: bool) -> None:
+        if is_delete:
+            await conn.execute(text("DROP SCHEMA IF EXISTS public CASCADE;"))
+        await conn.execute(text("CREATE SCHEMA IF NOT EXISTS public;"))
+
     async def build_db(self, is_delete: bool = False):
         if not self.engine:
             self.create_engine()
         if Base.metadata.tables:
             try:
-                async with self.engine.begin() as conn:
-                    if is_delete:
-                        await conn.execute(text("DROP SCHEMA IF EXISTS public CASCADE;"))
-                    await conn.execute(text("CREATE SCHEMA IF NOT EXISTS public;"))
-                    await conn.run_sync(Base.metadata.create_all)
-                    logger.info("Таблицы успешно созданы/пересозданы.")
+                await self._sync_schema(is_delete)
             except OperationalError as e:
                 logger.critical(f"Ошибка при создании таблиц: {e}")
-                await conn.rollback()  # <--- Добавление отката в случае ошибки
                 raise SystemExit(1)
         else:
             logger.critical("Вы не добавили таблицы для создания базы данных. Добавьте таблицы в файле models.")
@@ -115,20 +252,74 @@ class AioSQLiteDatabase(_AbstractDatabase):
     def __init__(
             self,
             db_path: str,
+            tuning: Optional[SQLiteTuning] = None,
+            replicas: Optional[ReplicaConfig] = None
     ):
+        """
+        :param db_path: str - путь к файлу базы
+        :param tuning: Optional[SQLiteTuning] - производственный режим (WAL, PRAGMA, пулы чтения/записи)
+        :param replicas: Optional[ReplicaConfig] - файлы-реплики (для локальной проверки маршрутизации чтения)
+        """
         self.db_path = db_path
+        self.tuning = tuning
+        self.replica_config = replicas
         super().__init__()
 
+    def _apply_pragmas(self, dbapi_connection, connection_record, query_only: bool = False):
+        cursor = dbapi_connection.cursor()
+        for name, value in self.tuning.pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only=1")
+        cursor.close()
+
+    @staticmethod
+    def _enable_savepoints(engine: AsyncEngine):
+        """
+        Рецепт SQLAlchemy для SAVEPOINT в SQLite: драйвер не начинает транзакции сам, BEGIN отправляет SQLAlchemy.
+        Иначе транзакция, в которой первой записью был SAVEPOINT, фиксируется при его RELEASE
+        и откат внешнего блока UnitOfWork ничего не отменяет.
+        """
+        def do_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        def do_begin(conn):
+            conn.exec_driver_sql("BEGIN")
 
+        event.listen(engine.sync_engine, "connect", do_connect)
+        event.listen(engine.sync_engine, "begin", do_begin)
 
     def create_engine(self):
         if self.engine:
             return
-        self.engine = create_async_engine(
-            f"sqlite+aiosqlite:///{self.db_path}",
-            echo=False,
+        url = f"sqlite+aiosqlite:///{self.db_path}"
+        if self.replica_config is not None:
+            self._create_replicas(self.replica_config, [f"sqlite+aiosqlite:///{path}" for path in self.replica_config.targets])
+            for engine in (self.replicas.engines if self.replicas else ()):
+                self._enable_savepoints(engine)
+        if self.tuning is None:
+            self.engine = create_async_engine(url, echo=False)
+            self._enable_savepoints(self.engine)
+            self.async_session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+            return
+
+        # Все записи идут через одно соединение, чтения - через пул
+        self.engine = create_async_engine(url, echo=False, pool_size=1, max_overflow=0)
+        self.read_engine = create_async_engine(url, echo=False, pool_size=self.tuning.read_pool_size, max_overflow=0)
+        for engine in (self.engine, self.read_engine):
+            self._enable_savepoints(engine)
+        event.listen(self.engine.sync_engine, "connect", self._apply_pragmas)
+        event.listen(
+            self.read_engine.sync_engine,
+            "connect",
+            lambda dbapi_connection, connection_record: self._apply_pragmas(dbapi_connection, connection_record, True)
+        )
+        self.async_session_maker = async_sessionmaker(
+            class_=AsyncSession,
+            sync_session_class=ReadWriteSession,
+            expire_on_commit=False,
+            info={"engines": {"writer": self.engine.sync_engine, "reader": self.read_engine.sync_engine}}
         )
-        self.async_session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
 
 
     @asynccontextmanager
@@ -144,14 +335,9 @@ class AioSQLiteDatabase(_AbstractDatabase):
             self.create_engine()
         if Base.metadata.tables:
             try:
-                async with self.engine.begin() as conn:
-                    if is_delete:
-                        await conn.run_sync(Base.metadata.drop_all)
-                    await conn.run_sync(Base.metadata.create_all)
-                    logger.info("Таблицы успешно созданы.")
+                await self._sync_schema(is_delete)
             except OperationalError:
                 logger.critical("Ошибка при создании таблиц.")
-                await conn.rollback()  # <--- Добавление отката в случае ошибки
                 raise SystemExit(1)
         else:
             logger.critical("Вы не добавили таблицы для создания базы данных. Добавьте таблицы в файле models.")
@@ -0,0 +1,244 @@
+"""
+Хранилище FSM aiogram в базе данных проекта.
+"""
+
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from loguru import logger
+
+from database.databases import _AbstractDatabase
+from database.uow.uow import UnitOfWork
+from utils.cache import TTLCache
+
+
+class _Record:
+    __slots__ = ("state", "data", "updated_at")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], updated_at: float = 0.0):
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_states (SQLite или Postgres).
+    Чтения обслуживает ограниченный кэш процесса; записи сразу попадают в кэш,
+    а в базу уходят пачкой раз в flush_interval секунд. Состояния, не менявшиеся
+    дольше ttl секунд, считаются брошенными и периодически удаляются.
+
+    В одном процессе кэш всегда верен, и состояние живёт в нём до вытеснения по размеру.
+    При работе в нескольких процессах (processes > 1) одно и то же состояние может быть закэшировано
+    в разных процессах: тогда cache_ttl ограничивает, как долго процесс может не видеть чужую запись.
+    Чем он меньше, тем чаще состояние читается из базы.
+
+    Данные должны сериализоваться в JSON: set_data проверяет это сразу, а не при записи пачки.
+    Если пачка не записалась, строки пишутся по одной: те, что не записались, хотя остальные
+    записались, отбрасываются, чтобы одна строка не задерживала все остальные.
+    """
+
+    def __init__(
+            self,
+            database: _AbstractDatabase,
+            cache_size: int = 10_000,
+            cache_ttl: float = 5.0,
+            flush_interval: float = 1.0,
+            ttl: float = 7 * 24 * 3600,
+            cleanup_interval: float = 3600.0,
+            key_builder: Optional[KeyBuilder] = None,
+            processes: int = 1
+    ):
+        """
+        :param database: _AbstractDatabase - база проекта
+        :param cache_size: int - сколько состояний держать в памяти
+        :param cache_ttl: float - сколько секунд состояние живёт в кэше при processes > 1 (задержка видимости чужих записей)
+        :param flush_interval: float - как часто сбрасывать изменения в базу, сек
+        :param ttl: float - через сколько секунд без изменений состояние удаляется
+        :param cleanup_interval: float - как часто удалять брошенные состояния, сек
+        :param key_builder: KeyBuilder - построение ключа из StorageKey
+        :param processes: int - процессов, работающих с одной базой
+        """
+        self.database = database
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self.cache_ttl = cache_ttl
+        self.processes = processes
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: TTLCache[str, _Record] = TTLCache(max_size=cache_size, ttl=math.inf)
+        self._dirty: Dict[str, _Record] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._cleanup: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.flushes = 0
+        self.written = 0
+        self.expired = 0
+        self.dropped = 0
+
+    async def _record(self, key: StorageKey) -> _Record:
+        name = self.key_builder.build(key)
+        record = self._dirty.get(name) or self._cache.get(name)
+        if record is not None:
+            return record
+        self.loads += 1
+        async with UnitOfWork(self.database.async_session_maker) as uow:
+            row = await uow.fsm_states.get_by_id(name)
+        if row is not None and row.updated_at >= time.time() - self.ttl:
+            loaded = _Record(row.state, dict(row.data or {}), row.updated_at)
+        else:
+            loaded = _Record(None, {})
+        # Пока шёл запрос, состояние могли изменить: запись в памяти новее базы
+        record = self._dirty.get(name) or self._cache.get(name)
+        if record is not None:
+            return record
+        self._cache.set(name, loaded, ttl=self._cache_ttl())
+        return loaded
+
+    def _cache_ttl(self) -> float:
+        return self.cache_ttl if self.processes > 1 else math.inf
+
+    def _mark_dirty(self, key: StorageKey, record: _Record) -> None:
+        name = self.key_builder.build(key)
+        record.updated_at = time.time()
+        self._dirty[name] = record
+        self._cache.set(name, record, ttl=self._cache_ttl())
+        loop = asyncio.get_running_loop()
+        if self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._start_flush)
+        if self._cleanup is None and self.cleanup_interval > 0:
+            self._cleanup = asyncio.create_task(self._run_cleanup())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        try:
+            # Копия в том виде, в каком данные вернёт база
+            data = json.loads(json.dumps(data))
+        except (TypeError, ValueError) as e:
+            raise TypeError(f"Данные FSM должны сериализоваться в JSON: {e}") from e
+        record = await self._record(key)
+        record.data = data
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    def _start_flush(self) -> None:
+        self._timer = None
+        if not self._dirty:
+            return
+        if self._flushes:
+            # Пачки пишутся по очереди, иначе старая пачка может перезаписать более новую
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+            return
+        batch, self._dirty = self._dirty, {}
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: Dict[str, _Record]) -> None:
+        rows: List[dict] = []
+        empty: List[str] = []
+        for name, record in batch.items():
+            if record.state is None and not record.data:
+                empty.append(name)
+            else:
+                rows.append(dict(key=name, state=record.state, data=record.data, updated_at=record.updated_at))
+        async with UnitOfWork(self.database.async_session_maker) as uow:
+            await uow.fsm_states.upsert(rows, index_elements=["key"])
+            await uow.fsm_states.delete_keys(empty)
+
+    async def _flush(self, batch: Dict[str, _Record]) -> None:
+        try:
+            await self._write(batch)
+        except Exception as e:
+            logger.error(f"Ошибка записи состояний FSM ({len(batch)} шт.): {e}")
+            failed = await self._write_each(batch) if len(batch) > 1 else batch
+            if len(failed) < len(batch):
+                # База доступна, эти строки не запишутся и при повторе
+                self.written += len(batch) - len(failed)
+                self.dropped += len(failed)
+                for name, record in failed.items():
+                    logger.error(f"Состояние FSM {name} не записано и отброшено")
+                    if self._cache.get(name) is record:
+                        self._cache.pop(name)
+                return
+            # Вернуть несохранённое, если его ещё не перезаписали более свежим
+            for name, record in batch.items():
+                self._dirty.setdefault(name, record)
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+            return
+        self.flushes += 1
+        self.written += len(batch)
+
+    async def _write_each(self, batch: Dict[str, _Record]) -> Dict[str, _Record]:
+        """
+        Запись по одной строке после ошибки пачки.
+        :return: Dict[str, _Record] - незаписанные строки
+        """
+        failed = {}
+        for name, record in batch.items():
+            try:
+                await self._write({name: record})
+            except Exception:
+                failed[name] = record
+        return failed
+
+    async def _run_cleanup(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                async with UnitOfWork(self.database.async_session_maker) as uow:
+                    removed = await uow.fsm_states.delete_expired(time.time() - self.ttl)
+                self.expired += removed
+                if removed:
+                    logger.info(f"Удалено брошенных состояний FSM: {removed}")
+            except Exception as e:
+                logger.error(f"Ошибка очистки состояний FSM: {e}")
+
+    async def flush(self) -> None:
+        """
+        Немедленно записать все изменения в базу.
+        """
+        while self._dirty or self._flushes:
+            if self._flushes:
+                await asyncio.gather(*self._flushes, return_exceptions=True)
+                continue
+            if self._timer is not None:
+                self._timer.cancel()
+            self._start_flush()
+            if self._flushes:
+                await asyncio.gather(*self._flushes, return_exceptions=True)
+            if self._dirty and self._timer is not None:
+                break  # запись не удалась, повтор по таймеру
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._cleanup is not None:
+            self._cleanup.cancel()
+            self._cleanup = None
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "dirty": len(self._dirty),
+            "loads": self.loads,
+            "flushes": self.flushes,
+            "written": self.written,
+            "expired": self.expired,
+            "dropped": self.dropped,
+        }
@@ -2,16 +2,20 @@
 Модуль для добавления таблиц в базу данных.
 """
 
-from typing import Optional
+from typing import Any, Dict, Optional
 
-from sqlalchemy import BigInteger, String, Integer, Float
+from sqlalchemy import BigInteger, String, Integer, Float, Boolean, JSON, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeMeta, declarative_base
 
 Base: DeclarativeMeta = declarative_base()
 
 __all__ = [
     "Base",
-    "UserModel"
+    "UserModel",
+    "MediaFileModel",
+    "BroadcastModel",
+    "BroadcastDeliveryModel",
+    "FSMStateModel"
 ]
 
 
@@ -22,7 +26,63 @@ class UserModel(Base):
     user_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     username: Mapped[str] = mapped_column(String, default="___")
     balance: Mapped[float] = mapped_column(Float, default=0.0)
+    is_blocked: Mapped[bool] = mapped_column(Boolean, default=False)  # пользователь заблокировал бота
 
     def __init__(self, user_id: int, username: Optional[str] = "___"):
         self.user_id = user_id
-        self.username = username
\ No newline at end of file
+        self.username = username
+
+
+class MediaFileModel(Base):
+    """
+    Telegram file_id загруженных с диска файлов. Файл считается тем же, пока не изменились mtime и размер.
+    """
+    __tablename__ = "media_files"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    path: Mapped[str] = mapped_column(String, unique=True)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger)
+    size: Mapped[int] = mapped_column(BigInteger)
+    file_id: Mapped[str] = mapped_column(String)
+    content_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # sha256 содержимого
+
+
+class BroadcastModel(Base):
+    """
+    Рассылка и её контрольная точка: id последнего обработанного пользователя.
+    """
+    __tablename__ = "broadcasts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String, unique=True)
+    status: Mapped[str] = mapped_column(String, default="running")
+    last_user_pk: Mapped[int] = mapped_column(Integer, default=0)
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    blocked: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class BroadcastDeliveryModel(Base):
+    """
+    Состояние доставки рассылки конкретному пользователю.
+    """
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (UniqueConstraint("broadcast_id", "user_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    broadcast_id: Mapped[int] = mapped_column(Integer, index=True)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    status: Mapped[str] = mapped_column(String)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+
+class FSMStateModel(Base):
+    """
+    Состояние FSM (aiogram) по ключу StorageKey.
+    """
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    data: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    updated_at: Mapped[float] = mapped_column(Float, index=True)  # unix time последней записи
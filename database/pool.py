@@ -0,0 +1,96 @@
+"""
+Пул соединений с телеметрией и ленивой проверкой соединений.
+"""
+
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который считает время ожидания свободного соединения
+    и возраст открытых соединений.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._created: Dict[int, float] = {}
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "close", self._on_close)
+        event.listen(self, "close_detached", self._on_close)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.total_wait, pool.max_wait = self.total_wait, self.max_wait
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        now = time.monotonic()
+        connection_record.info["last_used"] = now
+        self._created[id(dbapi_connection)] = now
+
+    def _on_close(self, dbapi_connection, *args) -> None:
+        self._created.pop(id(dbapi_connection), None)
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        ages = [now - created for created in self._created.values()]
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait": self.max_wait,
+            "connections": len(ages),
+            "avg_age": sum(ages) / len(ages) if ages else 0.0,
+            "max_age": max(ages, default=0.0),
+        }
+
+
+def enable_lazy_ping(engine: Engine, idle_threshold: float) -> None:
+    """
+    Проверка соединения при выдаче из пула, только если оно простаивало дольше idle_threshold секунд.
+    Мёртвое соединение отбрасывается (DisconnectionError), и пул выдаёт новое.
+    :param engine: Engine - синхронный движок (AsyncEngine.sync_engine)
+    :param idle_threshold: float - простой в секундах
+    """
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["last_used"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_used = connection_record.info.get("last_used")
+        if last_used is None or time.monotonic() - last_used < idle_threshold:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise DisconnectionError(f"Соединение простаивало и не отвечает: {e}") from e
@@ -0,0 +1,92 @@
+"""
+Маршрутизация чтения на реплики.
+"""
+
+import itertools
+import time
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from utils.cache import TTLCache
+
+WROTE = "wrote"  # ключ в Session.info: в сессии были INSERT/UPDATE/DELETE
+
+
+def _track_orm_writes(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[WROTE] = True
+
+
+def _track_flush(session: Session, flush_context) -> None:
+    session.info[WROTE] = True
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для UnitOfWork.read_only().
+    Реплики перебираются по кругу; реплика, к которой не удалось подключиться, исключается
+    на cooldown секунд. Пользователь, который недавно что-то записал, читает с основной базы
+    в течение read_your_writes секунд, чтобы не увидеть отставшую реплику.
+    """
+
+    def __init__(
+            self,
+            engines: Sequence[AsyncEngine],
+            cooldown: float = 30.0,
+            read_your_writes: float = 5.0,
+            max_tracked_users: int = 100_000
+    ):
+        self.engines = list(engines)
+        self.session_makers = [
+            async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False) for engine in self.engines
+        ]
+        self.cooldown = cooldown
+        self._unhealthy_until = [0.0] * len(self.engines)
+        self._round_robin = itertools.count()
+        self._recent_writers: TTLCache[int, bool] = TTLCache(max_size=max_tracked_users, ttl=read_your_writes)
+        if not event.contains(Session, "do_orm_execute", _track_orm_writes):
+            event.listen(Session, "do_orm_execute", _track_orm_writes)
+            event.listen(Session, "after_flush", _track_flush)
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failures = 0
+
+    def candidates(self, user_id: Optional[int] = None) -> List[int]:
+        """
+        Индексы реплик в порядке попыток; пустой список - читать с основной базы.
+        """
+        if not self.engines or (user_id is not None and self._recent_writers.get(user_id)):
+            return []
+        now = time.monotonic()
+        start = next(self._round_robin) % len(self.engines)
+        order = list(range(start, len(self.engines))) + list(range(start))
+        return [index for index in order if self._unhealthy_until[index] <= now]
+
+    def mark_failed(self, index: int) -> None:
+        self.failures += 1
+        self._unhealthy_until[index] = time.monotonic() + self.cooldown
+
+    def note_write(self, user_id: int) -> None:
+        self._recent_writers.set(user_id, True)
+
+    def note_writes(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._recent_writers.set(user_id, True)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.engines),
+            "healthy": sum(1 for until in self._unhealthy_until if until <= now),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failures": self.failures,
+            "recent_writers": len(self._recent_writers),
+        }
@@ -7,9 +7,16 @@
 class UserRepository(SQLAlchemyRepository):
     model = UserModel
 """
-from user_repository import UserRepository
+from .broadcast_repository import BroadcastRepository, BroadcastDeliveryRepository
+from .fsm_repository import FSMStateRepository
+from .media_repository import MediaRepository
+from .user_repository import UserRepository
 
 
 __all__ = [
+    "BroadcastRepository",
+    "BroadcastDeliveryRepository",
+    "FSMStateRepository",
+    "MediaRepository",
     "UserRepository"
 ]
\ No newline at end of file
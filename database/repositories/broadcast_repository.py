@@ -0,0 +1,42 @@
+from typing import Iterable, Set
+
+from sqlalchemy import select, update
+
+from database.models import BroadcastModel, BroadcastDeliveryModel
+from database.repository import SQLAlchemyRepository
+
+
+class BroadcastRepository(SQLAlchemyRepository):
+    model = BroadcastModel
+
+    async def get_or_create(self, name: str) -> BroadcastModel:
+        await self.add_many_or_ignore([dict(name=name)], index_elements=["name"])
+        return await self.get_by_filter(dict(name=name))
+
+    async def save_progress(self, id: int, last_user_pk: int, sent: int, failed: int, blocked: int) -> None:
+        stmt = (
+            update(self.model)
+            .filter_by(id=id)
+            .values(
+                last_user_pk=last_user_pk,
+                sent=self.model.sent + sent,
+                failed=self.model.failed + failed,
+                blocked=self.model.blocked + blocked
+            )
+        )
+        await self.session.execute(stmt)
+
+
+class BroadcastDeliveryRepository(SQLAlchemyRepository):
+    model = BroadcastDeliveryModel
+
+    async def get_delivered(self, broadcast_id: int, user_ids: Iterable[int]) -> Set[int]:
+        """
+        Пользователи, по которым в рассылке уже есть результат.
+        """
+        stmt = select(self.model.user_id).where(
+            self.model.broadcast_id == broadcast_id,
+            self.model.user_id.in_(list(user_ids))
+        )
+        result = await self.session.scalars(stmt)
+        return set(result.all())
@@ -0,0 +1,23 @@
+from typing import Iterable
+
+from sqlalchemy import delete
+
+from database.models import FSMStateModel
+from database.repository import SQLAlchemyRepository
+
+
+class FSMStateRepository(SQLAlchemyRepository):
+    model = FSMStateModel
+
+    async def delete_keys(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        for start in range(0, len(keys), 1000):
+            await self.session.execute(delete(self.model).where(self.model.key.in_(keys[start:start + 1000])))
+
+    async def delete_expired(self, before: float) -> int:
+        """
+        Удалить состояния, не изменявшиеся с момента before (unix time).
+        :return: int - сколько строк удалено
+        """
+        result = await self.session.execute(delete(self.model).where(self.model.updated_at < before))
+        return result.rowcount
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from database.models import MediaFileModel
+from database.repository import SQLAlchemyRepository
+
+
+class MediaRepository(SQLAlchemyRepository):
+    model = MediaFileModel
+
+    async def save_file_id(
+            self,
+            path: str,
+            mtime_ns: int,
+            size: int,
+            file_id: str,
+            content_hash: Optional[str] = None
+    ) -> None:
+        """
+        Сохранить file_id для файла, перезаписав старую запись по тому же пути.
+        """
+        values = dict(mtime_ns=mtime_ns, size=size, file_id=file_id, content_hash=content_hash)
+        stmt = (
+            self._insert()
+            .values(path=path, **values)
+            .on_conflict_do_update(index_elements=["path"], set_=values)
+        )
+        await self.session.execute(stmt)
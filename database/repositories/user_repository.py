@@ -1,6 +1,77 @@
+from typing import Dict, Iterable, Set
+
+from sqlalchemy import case, update
+
 from database.models import UserModel
 from database.repository import SQLAlchemyRepository
 
 
 class UserRepository(SQLAlchemyRepository):
-    model = UserModel
\ No newline at end of file
+    model = UserModel
+
+    async def mark_blocked(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        stmt = update(self.model).where(self.model.user_id.in_(user_ids)).values(is_blocked=True)
+        await self.session.execute(stmt)
+        if self.cache is not None:
+            self._edited_unknown = True
+
+    async def unblock(self, user_ids: Iterable[int]) -> Set[int]:
+        """
+        Снятие отметки is_blocked: пользователь снова пишет боту, значит разблокировал его.
+        :return: Set[int] - user_id, у которых отметка была снята
+        """
+        user_ids = list(user_ids)
+        unblocked: Set[int] = set()
+        for start in range(0, len(user_ids), 1000):
+            stmt = (
+                update(self.model)
+                .where(self.model.user_id.in_(user_ids[start:start + 1000]), self.model.is_blocked.is_(True))
+                .values(is_blocked=False)
+                .returning(self.model.user_id)
+                .execution_options(synchronize_session=False)
+            )
+            result = await self.session.execute(stmt)
+            unblocked.update(result.scalars().all())
+        if unblocked and self.cache is not None:
+            self._edited_unknown = True
+        return unblocked
+
+    async def add_balance(self, user_id: int, delta: float) -> bool:
+        """
+        Атомарное изменение баланса в SQL (balance = balance + delta), без чтения строки.
+        :return: bool - найден ли пользователь
+        """
+        updated = await self.apply_balance_deltas({user_id: delta})
+        return user_id in updated
+
+    def _balance_deltas_stmt(self, deltas: Dict[int, float]):
+        # Без ELSE: WHERE user_id IN выбирает только пользователей из CASE, лишний параметр не нужен
+        return (
+            update(self.model)
+            .where(self.model.user_id.in_(deltas))
+            .values(balance=self.model.balance + case(deltas, value=self.model.user_id))
+            .returning(self.model.user_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def apply_balance_deltas(self, deltas: Dict[int, float]) -> Set[int]:
+        """
+        Применение изменений баланса для многих пользователей одним UPDATE ... CASE на пачку.
+        :param deltas: user_id -> изменение баланса
+        :return: Set[int] - user_id, строки которых обновлены
+        """
+        updated: Set[int] = set()
+        items = [dict(user_id=user_id, delta=delta) for user_id, delta in deltas.items()]
+        if not items:
+            return updated
+        # На пользователя три параметра: WHEN user_id THEN delta и user_id в IN
+        for chunk in self._chunks(items, parameters_per_row=3):
+            stmt = self._balance_deltas_stmt({item["user_id"]: item["delta"] for item in chunk})
+            result = await self.session.execute(stmt)
+            updated.update(result.scalars().all())
+        if self.cache is not None:
+            self._edited_unknown = True
+        return updated
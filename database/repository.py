@@ -1,13 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import TypeVar, Type, Optional, Sequence
+from typing import TypeVar, Type, Optional, Sequence, List, Iterable, Any, Hashable, Set, AsyncIterator
 
-from sqlalchemy import select, update
+from sqlalchemy import inspect, select, update, insert, Row
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
+from database.cache import CHANGES, RepositoryCache, copy_values
 from database.models import Base, UserModel
 
 T = TypeVar('T', bound=Base)
 
+# Максимум параметров в одном запросе по диалектам
+_MAX_PARAMETERS = {"postgresql": 32767, "sqlite": 32766}
+
 
 class AbstractRepository(ABC):
     """
@@ -42,20 +49,281 @@ class AbstractRepository(ABC):
 class SQLAlchemyRepository(AbstractRepository):
     model = Type[T]
 
+    def __init__(
+            self,
+            session: AsyncSession,
+            cache: Optional[RepositoryCache] = None
+    ):
+        super().__init__(session)
+        self.cache = cache  # опциональный кэш get_by_id/get_by_filter
+        self._edited: Set[int] = set()
+        self._edited_unknown = False  # были изменения, для которых неизвестен id строки
+
+    async def _from_cache(self, key: Hashable) -> Optional[T]:
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        identity, values = cached
+        session = self.session.sync_session
+        obj = session.identity_map.get(session.identity_key(self.model, identity))
+        if obj is not None:
+            return obj
+        # Новый экземпляр из копии значений, присоединённый к сессии без запроса в БД
+        obj = self.model.__mapper__.class_manager.new_instance()
+        for name, value in copy_values(values).items():
+            set_committed_value(obj, name, value)
+        make_transient_to_detached(obj)
+        self.session.add(obj)
+        return obj
+
+    def _to_cache(self, key: Hashable, obj: Optional[T], generation: int) -> None:
+        """
+        Кэшируются только закоммиченные значения: не после записи в этой транзакции
+        и не для объекта с несохранёнными изменениями.
+        """
+        if obj is None or CHANGES in self.session.info:
+            return
+        state = inspect(obj)
+        if state.modified:
+            return
+        names = [attr.key for attr in state.mapper.column_attrs]
+        if any(name not in state.dict for name in names):
+            return  # часть колонок не загружена (expired/deferred)
+        values = copy_values({name: state.dict[name] for name in names})
+        self.cache.put(key, state.identity, values, generation)
+
+    async def _cached(self, key: Hashable, load) -> Optional[T]:
+        obj = await self._from_cache(key)
+        if obj is None:
+            generation = self.cache.generation(self.model.__name__)
+            obj = await load()
+            self._to_cache(key, obj, generation)
+        return obj
+
     async def get_by_id(self, id: int) -> Optional[T]:
-        return await self.session.get(self.model, id)
+        if self.cache is None:
+            return await self.session.get(self.model, id)
+        return await self._cached((self.model.__name__, "id", id), lambda: self.session.get(self.model, id))
 
     async def edit_one(self, id: int, data: dict) -> None:
         stmt = update(self.model).filter_by(id=id).values(**data)
         await self.session.execute(stmt)
+        if self.cache is not None:
+            self._edited.add(id)
 
     async def add_one(self, obj: T):
+        # Новые и изменённые через атрибуты объекты сбрасываются из кэша по Session.info[CHANGES]
         self.session.add(obj)
 
+    def apply_invalidations(self) -> None:
+        """
+        Сброс кэша для строк, изменённых запросами репозитория (edit_one, edit_many, upsert...).
+        Вызывается UnitOfWork после commit.
+        """
+        if self.cache is not None:
+            for id in self._edited:
+                self.cache.invalidate(self.model.__name__, (id,))
+            if self._edited_unknown:
+                self.cache.invalidate_model(self.model.__name__)
+        self._edited.clear()
+        self._edited_unknown = False
+
+    def discard_cached(self, keep_edits: bool = False) -> None:
+        """
+        Откат транзакции: изменения не сохранены, сбрасывать из кэша нечего.
+        В кэш попадают только закоммиченные значения, поэтому его записи остаются верными.
+        :param keep_edits: откат только точки сохранения - изменения внешней транзакции ещё будут сброшены после commit
+        """
+        if keep_edits:
+            return
+        self._edited.clear()
+        self._edited_unknown = False
+
+    def _insert(self):
+        """
+        Конструктор INSERT под диалект текущей сессии (нужен для ON CONFLICT).
+        """
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(self.model)
+        if dialect == "sqlite":
+            return sqlite.insert(self.model)
+        raise NotImplementedError(f"ON CONFLICT не поддерживается для диалекта {dialect}")
+
+    def _chunks(self, rows: List[dict], parameters_per_row: Optional[int] = None) -> Iterable[List[dict]]:
+        """
+        Деление строк на пачки, чтобы число параметров в запросе не превышало лимит диалекта.
+        :param parameters_per_row: Optional[int] - параметров запроса на строку, по умолчанию число ключей строки
+        """
+        limit = _MAX_PARAMETERS.get(self.session.get_bind().dialect.name, 999)
+        size = max(1, limit // (parameters_per_row or max(len(row) for row in rows)))
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    async def add_many(self, rows: List[dict]) -> None:
+        """
+        Пакетная вставка (executemany) без создания ORM-объектов.
+        :param rows: список словарей со значениями колонок
+        """
+        if not rows:
+            return
+        for chunk in self._chunks(rows):
+            await self.session.execute(insert(self.model), chunk)
+
+    async def add_many_or_ignore(self, rows: List[dict], index_elements: Iterable[str]) -> List[Any]:
+        """
+        Пакетная вставка INSERT ... ON CONFLICT DO NOTHING.
+        :param rows: список словарей со значениями колонок
+        :param index_elements: колонки уникального ключа
+        :return: значения первой колонки ключа для реально вставленных строк
+        """
+        if not rows:
+            return []
+        index_elements = list(index_elements)
+        inserted = []
+        for chunk in self._chunks(rows):
+            stmt = (
+                self._insert()
+                .values(chunk)
+                .on_conflict_do_nothing(index_elements=index_elements)
+                .returning(getattr(self.model, index_elements[0]))
+            )
+            result = await self.session.execute(stmt)
+            inserted.extend(result.scalars().all())
+        return inserted
+
+    async def upsert(
+            self,
+            rows: List[dict],
+            index_elements: Iterable[str],
+            update_columns: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        Пакетная вставка INSERT ... ON CONFLICT DO UPDATE.
+        :param rows: список словарей со значениями колонок
+        :param index_elements: колонки уникального ключа
+        :param update_columns: колонки, обновляемые при конфликте (по умолчанию все переданные, кроме ключа)
+        """
+        if not rows:
+            return
+        index_elements = list(index_elements)
+        if update_columns is None:
+            update_columns = [column for column in rows[0] if column not in index_elements]
+        update_columns = list(update_columns)
+        for chunk in self._chunks(rows):
+            stmt = self._insert().values(chunk)
+            if update_columns:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={column: stmt.excluded[column] for column in update_columns}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            await self.session.execute(stmt)
+        if self.cache is not None:
+            self._edited_unknown = True
+
+    async def edit_many(self, rows: List[dict]) -> None:
+        """
+        Пакетное обновление по первичному ключу (executemany UPDATE ... WHERE id = ?).
+        :param rows: список словарей, в каждом обязателен id
+        """
+        if not rows:
+            return
+        for chunk in self._chunks(rows):
+            await self.session.execute(update(self.model), chunk)
+        if self.cache is not None:
+            self._edited.update(row["id"] for row in rows)
+
     async def get_by_filter(self, filters: dict):
         stmt = select(self.model).filter_by(**filters)
-        return await self.session.scalar(stmt)
+        if self.cache is None:
+            return await self.session.scalar(stmt)
+        try:
+            key = (self.model.__name__, "filter", tuple(sorted(filters.items())))
+            hash(key)
+        except TypeError:
+            return await self.session.scalar(stmt)
+        return await self._cached(key, lambda: self.session.scalar(stmt))
+
+
+    def _page_stmt(self, stmt, after_id: int, limit: int, filters: Optional[dict]):
+        return (
+            stmt
+            .filter_by(**(filters or {}))
+            .where(self.model.id > after_id)
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+
+    async def get_page(self, after_id: int = 0, limit: int = 1000, filters: Optional[dict] = None) -> Sequence[T]:
+        """
+        Keyset-пагинация по первичному ключу: следующие limit строк с id больше after_id.
+        """
+        result = await self.session.scalars(self._page_stmt(select(self.model), after_id, limit, filters))
+        return result.all()
+
+    async def get_rows_page(
+            self,
+            columns: Sequence[str],
+            after_id: int = 0,
+            limit: int = 1000,
+            filters: Optional[dict] = None
+    ) -> Sequence[Row]:
+        """
+        Как get_page, но только указанные колонки, без создания ORM-объектов.
+        В выборку всегда входит id - по нему строится следующая страница.
+        """
+        stmt = select(self.model.id, *(getattr(self.model, column) for column in columns if column != "id"))
+        result = await self.session.execute(self._page_stmt(stmt, after_id, limit, filters))
+        return result.all()
 
+    async def iter_pages(self, filters: Optional[dict] = None, page_size: int = 1000) -> AsyncIterator[Sequence[T]]:
+        """
+        Обход всей таблицы страницами по первичному ключу.
+        """
+        after_id = 0
+        while True:
+            page = await self.get_page(after_id, page_size, filters)
+            if not page:
+                return
+            yield page
+            after_id = page[-1].id
+
+    async def stream(self, filters: Optional[dict] = None, chunk_size: int = 1000) -> AsyncIterator[T]:
+        """
+        Потоковое чтение через серверный курсор: в памяти не больше chunk_size строк.
+        """
+        stmt = select(self.model).filter_by(**(filters or {})).execution_options(yield_per=chunk_size)
+        result = await self.session.stream_scalars(stmt)
+        try:
+            async for partition in result.partitions():
+                for obj in partition:
+                    yield obj
+        finally:
+            await result.close()
+
+    async def stream_rows(
+            self,
+            columns: Sequence[str],
+            filters: Optional[dict] = None,
+            chunk_size: int = 1000
+    ) -> AsyncIterator[Row]:
+        """
+        Потоковое чтение отдельных колонок (Row вместо ORM-объектов).
+        """
+        stmt = (
+            select(*(getattr(self.model, column) for column in columns))
+            .filter_by(**(filters or {}))
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.session.stream(stmt)
+        try:
+            async for partition in result.partitions():
+                for row in partition:
+                    yield row
+        finally:
+            await result.close()
 
     async def get_all(self, data: dict) -> Sequence[T]:
         stmt = select(self.model).filter_by(**data)
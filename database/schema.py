@@ -0,0 +1,162 @@
+"""
+Отпечаток схемы: пропуск DDL при запуске, если модели не менялись.
+"""
+
+from hashlib import sha256
+from typing import List
+
+from loguru import logger
+from sqlalchemy import (
+    Column, Connection, Integer, MetaData, String, Table, UniqueConstraint, false, func, inspect, literal, select, text
+)
+from sqlalchemy.engine import Dialect
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from database.models import Base
+
+UNCHANGED = "unchanged"
+CREATED = "created"
+MIGRATED = "migrated"
+
+# Служебная таблица живёт вне Base.metadata и не влияет на отпечаток
+_service_metadata = MetaData()
+schema_fingerprint = Table(
+    "schema_fingerprint",
+    _service_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+)
+
+SCHEMA_LOCK_KEY = 0x5C4E3A  # ключ pg_advisory_xact_lock для синхронизации схемы
+
+
+def metadata_fingerprint(dialect: Dialect) -> str:
+    """
+    sha256 от DDL всех таблиц и индексов Base.metadata в диалекте базы.
+    """
+    digest = sha256(dialect.name.encode())
+    for table in sorted(Base.metadata.tables.values(), key=lambda table: table.name):
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
+
+
+def _add_missing_columns(connection: Connection) -> bool:
+    """
+    ALTER TABLE ... ADD COLUMN для колонок моделей, которых нет в существующих таблицах.
+    :return: bool - False, если какую-то колонку нельзя добавить автоматически
+    """
+    dialect = connection.dialect
+    preparer = dialect.identifier_preparer
+    inspector = inspect(connection)
+    complete = True
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        added: List[Column] = []
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = str(CreateColumn(column).compile(dialect=dialect))
+            if column.server_default is None and not column.nullable:
+                if column.default is None or not column.default.is_scalar:
+                    logger.warning(f"Колонку {table.name}.{column.name} NOT NULL без значения по умолчанию нужно добавить вручную")
+                    complete = False
+                    continue
+                default = literal(column.default.arg, column.type).compile(
+                    dialect=dialect, compile_kwargs={"literal_binds": True}
+                )
+                ddl += f" DEFAULT {default}"
+            connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+            added.append(column)
+            logger.info(f"Добавлена колонка {table.name}.{column.name}")
+        for index in table.indexes:
+            if any(column in added for column in index.columns):
+                index.create(connection, checkfirst=True)
+        # Проверяются все ограничения, а не только новых колонок: индекс мог не создаться при прошлом запуске
+        unique = {frozenset(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table.name)}
+        unique.update(frozenset(index["column_names"]) for index in inspector.get_indexes(table.name) if index["unique"])
+        present = existing | {column.name for column in added}
+        for constraint in table.constraints:
+            if not isinstance(constraint, UniqueConstraint):
+                continue
+            names = frozenset(column.name for column in constraint.columns)
+            if names <= present and names not in unique:
+                complete = _create_unique_index(connection, table, constraint) and complete
+    return complete
+
+
+def _create_unique_index(connection: Connection, table: Table, constraint: UniqueConstraint) -> bool:
+    """
+    UNIQUE добавленных колонок: ADD COLUMN его не переносит, а SQLite не умеет ADD CONSTRAINT,
+    поэтому создаётся уникальный индекс.
+    :return: bool - False, если существующие строки нарушают уникальность
+    """
+    preparer = connection.dialect.identifier_preparer
+    names = [column.name for column in constraint.columns]
+    name = constraint.name if isinstance(constraint.name, str) else "_".join(["uq", table.name, *names])
+    columns = ", ".join(preparer.quote(column) for column in names)
+    try:
+        with connection.begin_nested():
+            connection.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {preparer.quote(name)} ON {preparer.format_table(table)} ({columns})"
+            ))
+    except DBAPIError as e:
+        logger.warning(f"Уникальный индекс {name} не создан, нужно исправить данные вручную: {e.orig}")
+        return False
+    logger.info(f"Создан уникальный индекс {name}")
+    return True
+
+
+def lock_schema(connection: Connection) -> None:
+    """
+    Блокировка до конца транзакции: одновременно запущенные процессы меняют схему по очереди
+    и не добавляют одну колонку дважды. Вызывается первой в транзакции, до любых чтений.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(select(func.pg_advisory_xact_lock(SCHEMA_LOCK_KEY)))
+    elif connection.dialect.name == "sqlite":
+        # Пустой DELETE берёт блокировку записи SQLite, второй процесс ждёт её busy_timeout
+        connection.execute(CreateTable(schema_fingerprint, if_not_exists=True))
+        connection.execute(schema_fingerprint.delete().where(false()))
+
+
+def schema_unchanged(connection: Connection) -> bool:
+    """
+    Совпадает ли сохранённый отпечаток с моделями. Только чтение: без блокировки и DDL.
+    """
+    if not inspect(connection).has_table(schema_fingerprint.name):
+        return False
+    stored = connection.execute(select(schema_fingerprint.c.fingerprint)).scalar()
+    return stored == metadata_fingerprint(connection.dialect)
+
+
+def sync_schema(connection: Connection, locked: bool = False) -> str:
+    """
+    Приведение схемы к моделям, только добавлением таблиц, колонок и индексов.
+    DDL не выполняется, если сохранённый отпечаток совпадает с текущим. Если схему не удалось
+    привести к моделям полностью, отпечаток не сохраняется: проверка повторится при следующем запуске.
+    :param locked: bool - lock_schema уже вызван в этой транзакции
+    :return: UNCHANGED, CREATED или MIGRATED
+    """
+    if not locked:
+        lock_schema(connection)
+    # Пока ждали блокировку, схему мог привести другой процесс
+    if schema_unchanged(connection):
+        return UNCHANGED
+
+    fingerprint = metadata_fingerprint(connection.dialect)
+    existing = set(inspect(connection).get_table_names()) & set(Base.metadata.tables)
+    Base.metadata.create_all(connection)
+    _service_metadata.create_all(connection)
+    complete = _add_missing_columns(connection) if existing else True
+    if complete:
+        connection.execute(schema_fingerprint.delete())
+        connection.execute(schema_fingerprint.insert().values(id=1, fingerprint=fingerprint))
+    return MIGRATED if existing else CREATED
+
+
+def drop_schema(connection: Connection) -> None:
+    Base.metadata.drop_all(connection)
+    _service_metadata.drop_all(connection)
@@ -2,11 +2,22 @@
 Модуль для создания и управления транзакциями
 """
 
-from typing import final
+from typing import final, List, Optional
 
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction, async_sessionmaker
 
-from database.repositories import UserRepository
+from database.cache import CHANGES, RepositoryCache
+from database.replicas import WROTE, ReplicaRouter
+from database.repositories import (
+    BroadcastDeliveryRepository,
+    BroadcastRepository,
+    FSMStateRepository,
+    MediaRepository,
+    UserRepository
+)
+from utils.metrics import uow_total
+from utils.tracing import SpanContext, finish_span, start_span
 
 @final
 class UnitOfWork:
@@ -15,36 +26,167 @@ class UnitOfWork:
     """
     def __init__(
             self,
-            async_session_maker: async_sessionmaker
+            async_session_maker: async_sessionmaker,
+            cache: Optional[RepositoryCache] = None,
+            replicas: Optional[ReplicaRouter] = None,
+            user_id: Optional[int] = None,
+            read_only: bool = False,
+            keep_open: bool = False
     ):
+        """
+        :param replicas: read replicas used by read_only() units
+        :param user_id: user the unit works for; keeps their reads on the primary right after their writes
+        :param read_only: never commit; read from a replica when one is available
+        :param keep_open: keep the session between top-level blocks until close() is called
+        """
         self.async_session_maker = async_session_maker
+        self.cache = cache
+        self.replicas = replicas
+        self.user_id = user_id
+        self.is_read_only = read_only
+        self.keep_open = keep_open
+        self.session: Optional[AsyncSession] = None
+        self._depth = 0
+        self._savepoints: List[AsyncSessionTransaction] = []
+        self._span: Optional[SpanContext] = None
+
+    def read_only(self) -> "UnitOfWork":
+        """
+        A sibling unit for read-only work, routed to a replica when possible.
+
+        async with uow.read_only() as reader:
+            user = await reader.users.get_by_filter(dict(user_id=user_id))
+        """
+        return UnitOfWork(self.async_session_maker, self.cache, self.replicas, self.user_id, read_only=True)
 
     async def __aenter__(self):
         """
-        Create a new session and start a new transaction.
+        Start a new transaction, or a savepoint when a block of this unit is already active.
+        The session is created on first use; it checks out a connection only on the first query.
+        """
+        if not self._depth:
+            self._span = start_span("uow", read_only=self.is_read_only)
+        if self.session is None:
+            await self._open()
+        elif self._depth:
+            self._savepoints.append(await self.session.begin_nested())
+        self._depth += 1
+        return self
+
+    async def _open(self):
+        cache = self.cache
+        if self.is_read_only and self.replicas is not None:
+            self.session = await self._replica_session()
+            if self.session is not None:
+                # Реплика может отставать: её данные не кладём в общий кэш
+                cache = None
+            else:
+                self.session = self.async_session_maker()
+        else:
+            self.session = self.async_session_maker()
+        self.users = UserRepository(self.session, cache) # добавлен репозиторий для работы
+        self.media = MediaRepository(self.session, cache)
+        self.broadcasts = BroadcastRepository(self.session, cache)
+        self.deliveries = BroadcastDeliveryRepository(self.session, cache)
+        self.fsm_states = FSMStateRepository(self.session, cache)
+        self._repositories = (self.users, self.media, self.broadcasts, self.deliveries, self.fsm_states)
+
+    async def _replica_session(self) -> Optional[AsyncSession]:
+        """
+        Open a session on the first healthy replica, failing over to the next one.
+        Returns None when the primary has to be used.
         """
-        self.session = self.async_session_maker()
-        self.users = UserRepository(self.session) # добавлен репозиторий для работы
-        ...
+        for index in self.replicas.candidates(self.user_id):
+            session = self.replicas.session_makers[index]()
+            try:
+                await session.connection()
+            except (DBAPIError, OSError):
+                await session.close()
+                self.replicas.mark_failed(index)
+                continue
+            self.replicas.replica_reads += 1
+            return session
+        self.replicas.primary_reads += 1
+        return None
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """
-        Commit or rollback the transaction based on the provided exception.
+        Commit or rollback the transaction (or the inner savepoint) based on the provided exception.
         """
-        if exc_type is None:
-            await self.commit()
-        else:
-            await self.rollback()
-        await self.session.close()
+        self._depth -= 1
+        if self._depth:
+            savepoint = self._savepoints.pop()
+            if exc_type is None:
+                await savepoint.commit()
+            else:
+                await savepoint.rollback()
+                for repository in self._repositories:
+                    repository.discard_cached(keep_edits=True)
+            return
+        try:
+            if self.is_read_only:
+                # Nothing was written, so objects cached by this unit stay valid
+                await self.session.rollback()
+                self._forget_changes()
+                for repository in self._repositories:
+                    repository.apply_invalidations()
+            elif exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            if not self.keep_open:
+                await self.close()
+            finish_span(self._span, exc_val)
+            self._span = None
 
     async def commit(self):
         """
-        Commit the current transaction.
+        Commit the current transaction. Inside an inner block only flushes:
+        the savepoint is released when the block exits.
         """
+        if self.is_read_only:
+            raise RuntimeError("Read-only UnitOfWork cannot commit")
+        if self._depth > 1:
+            await self.session.flush()
+            return
         await self.session.commit()
+        uow_total.inc("commit")
+        if self.session.info.pop(WROTE, False) and self.replicas is not None and self.user_id is not None:
+            self.replicas.note_write(self.user_id)
+        changes = self.session.info.pop(CHANGES, ())
+        if self.cache is not None:
+            self.cache.invalidate_entities(changes)
+        for repository in self._repositories:
+            repository.apply_invalidations()
 
     async def rollback(self):
         """
         Rollback the current transaction.
         """
-        await self.session.rollback()
\ No newline at end of file
+        await self.session.rollback()
+        uow_total.inc("rollback")
+        self._forget_changes()
+        for repository in self._repositories:
+            repository.discard_cached()
+
+    def _forget_changes(self):
+        self.session.info.pop(WROTE, None)
+        self.session.info.pop(CHANGES, None)
+
+    async def close(self):
+        """
+        Release the session. Safe to call when the session was never opened.
+        """
+        if self.session is None:
+            return
+        session, self.session = self.session, None
+        if session.in_transaction():
+            await session.rollback()
+            session.info.pop(WROTE, None)
+            session.info.pop(CHANGES, None)
+            for repository in self._repositories:
+                repository.discard_cached()
+        await session.close()
+        self._depth = 0
+        self._savepoints.clear()
@@ -1,34 +1,144 @@
 import asyncio
+import time
 
 from aiogram_sender.middleware import WindowMiddleware
+from aiogram_sender.prewarm import collect_window_photos, prewarm_media
 from bot_setting import BotDefault
+from database.cache import RepositoryCache
 from database.databases import AioSQLiteDatabase
+from database.fsm_storage import DatabaseStorage
 from handlers.start import start
 
 from log_settings import logger
+from middlewares.metrics_middleware import ApiMetricsMiddleware, MetricsMiddleware
+from middlewares.request_scheduler import RequestScheduler
 from middlewares.session_middleware import SessionMiddleware
+from middlewares.tracing_middleware import TracingMiddleware, TracingRequestMiddleware
+from services.balance_service import BalanceDeltaEngine
+from services.media_service import DatabaseFileIdStore
+from services.user_service import UserRegistrationBatcher
 from settings import settings
+from utils.memory_storage import BoundedMemoryStorage
+from utils.metrics import instrument_engine, registry
+from utils.tracing import Tracer, trace_engine
 
-database = AioSQLiteDatabase(db_path=settings.NAME_DATABASE)
+database = AioSQLiteDatabase(
+    db_path=settings.NAME_DATABASE,
+    tuning=settings.sqlite_tuning,
+    replicas=settings.replicas
+)
 
-bot = BotDefault(settings.BOT_TOKEN)
+repository_cache = RepositoryCache(
+    max_size=settings.REPOSITORY_CACHE_SIZE,
+    ttl=settings.REPOSITORY_CACHE_TTL
+) if settings.REPOSITORY_CACHE_SIZE else None
 
-bot.add_middleware(SessionMiddleware(database))
-bot.add_middleware(WindowMiddleware())
+registration = UserRegistrationBatcher(
+    database.async_session_maker,
+    batch_size=settings.REGISTRATION_BATCH_SIZE,
+    max_delay=settings.REGISTRATION_BATCH_DELAY,
+    replicas=database.replicas,
+    cache=repository_cache
+)
+
+balances = BalanceDeltaEngine(
+    database.async_session_maker,
+    batch_size=settings.BALANCE_BATCH_SIZE,
+    max_delay=settings.BALANCE_BATCH_DELAY,
+    replicas=database.replicas,
+    cache=repository_cache
+)
+
+file_id_store = DatabaseFileIdStore(database.async_session_maker)
+
+fsm_storage = None
+if settings.FSM_STORAGE == "database":
+    fsm_storage = DatabaseStorage(
+        database,
+        cache_size=settings.FSM_CACHE_SIZE,
+        cache_ttl=settings.FSM_CACHE_TTL,
+        flush_interval=settings.FSM_FLUSH_INTERVAL,
+        ttl=settings.FSM_TTL
+    )
+elif settings.FSM_STORAGE == "bounded":
+    fsm_storage = BoundedMemoryStorage(max_size=settings.FSM_MEMORY_MAX_SIZE, ttl=settings.FSM_TTL)
+
+bot = BotDefault(settings.BOT_TOKEN, storage=fsm_storage)
+
+request_scheduler = RequestScheduler(
+    global_rate=settings.RATE_LIMIT_GLOBAL,
+    private_rate=settings.RATE_LIMIT_PRIVATE,
+    group_rate=settings.RATE_LIMIT_GROUP
+)
+
+tracer = Tracer(
+    slow_threshold=settings.TRACING_SLOW_THRESHOLD,
+    buffer_size=settings.TRACING_BUFFER_SIZE,
+    path=settings.TRACING_FILE,
+    profile_rate=settings.PROFILE_SAMPLE_RATE,
+    profile_dir=settings.PROFILE_DIR
+) if settings.TRACING_ENABLED else None
+
+if tracer is not None:
+    bot.add_request_middleware(TracingRequestMiddleware())  # до планировщика: спан включает ожидание лимитов
+bot.add_request_middleware(request_scheduler)
+if settings.METRICS_ENABLED:
+    metrics = MetricsMiddleware()
+    bot.add_request_middleware(ApiMetricsMiddleware())  # после планировщика: без ожидания лимитов
+    bot.add_middleware(metrics, outer=True)
+    bot.add_middleware(metrics.inner)
+    for engine in database.engines():
+        instrument_engine(engine.sync_engine)
+    registry.gauge(
+        "bot_request_queue_depth",
+        "Запросы к Bot API в очереди планировщика",
+        lambda: request_scheduler.stats()["queue_depth"]
+    )
+    bot.enable_metrics(registry, port=settings.METRICS_PORT, host=settings.METRICS_HOST)
+bot.add_middleware(SessionMiddleware(database, registration, repository_cache, balances))
+bot.add_middleware(WindowMiddleware(file_id_store=file_id_store))
+if tracer is not None:
+    tracing = TracingMiddleware(tracer)
+    bot.add_middleware(tracing, outer=True)
+    bot.add_middleware(tracing.inner)  # последним: спан хэндлера без middlewares
+    for engine in database.engines():
+        trace_engine(engine.sync_engine)
 bot.add_router(start)
+bot.add_worker_start_hook(database.reset_after_fork)  # для webhook в нескольких процессах
+
+
+async def prewarm(bot_instance):
+    await prewarm_media(
+        bot_instance,
+        file_id_store,
+        settings.MEDIA_SERVICE_CHAT_ID,
+        collect_window_photos(settings.MEDIA_DIR),
+        concurrency=settings.MEDIA_PREWARM_CONCURRENCY
+    )
+
+if settings.MEDIA_SERVICE_CHAT_ID:
+    bot.add_startup_stage(prewarm)
 
-async def main(create_database: bool):
-    if create_database:
-        await database.build_db(is_delete=True)
+async def main():
+    started = time.perf_counter()
+    await database.build_db()
+    await file_id_store.load()
+    logger.info(f"Подготовка к запуску: {(time.perf_counter() - started) * 1000:.1f} мс")
     try:
-        await bot.start()
+        await bot.start(polling=settings.polling)
     finally:
+        await registration.close()
+        await balances.close()
+        if fsm_storage is not None:
+            await fsm_storage.close()
+        if tracer is not None:
+            await tracer.close()
         await database.shutdown()
 
 
 if __name__ == '__main__':
     try:
         logger.info("Бот запущен успешно!")
-        asyncio.run(main(True))
+        asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Бот остановлен!")
@@ -0,0 +1,103 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from utils.metrics import (
+    UpdateScope,
+    api_errors_total,
+    api_seconds,
+    current_update,
+    db_update_queries,
+    db_update_seconds,
+    handler_seconds,
+    updates_total
+)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer middleware: время обработки события, результат и SQL-запросы за событие.
+    Имя роутера и хэндлера записывает inner middleware из атрибута inner:
+
+    bot.add_middleware(metrics, outer=True)
+    bot.add_middleware(metrics.inner)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.inner = HandlerNameMiddleware()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        scope = UpdateScope()
+        token = current_update.set(scope)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            result = await handler(event, data)
+            if result is UNHANDLED:
+                status = "unhandled"
+            return result
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            current_update.reset(token)
+            handler_seconds.observe(time.perf_counter() - started, scope.router, scope.handler)
+            updates_total.inc(scope.router, scope.handler, status)
+            db_update_queries.observe(scope.queries)
+            db_update_seconds.observe(scope.query_seconds)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """
+    Inner middleware: запоминает в метриках события, какой роутер и хэндлер его обработали.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        scope = current_update.get()
+        if scope is not None:
+            router = data.get("event_router")
+            handler_object = data.get("handler")
+            scope.router = router.name if router is not None else "unknown"
+            callback = getattr(handler_object, "callback", None)
+            scope.handler = getattr(callback, "__qualname__", None) or repr(callback)
+        return await handler(event, data)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Request middleware для Bot.session: время и ошибки запросов к Bot API по методам.
+    Регистрируется после RequestScheduler, чтобы не учитывать ожидание лимитов.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            api_errors_total.inc(name, type(e).__name__)
+            raise
+        finally:
+            api_seconds.observe(time.perf_counter() - started, name)
@@ -0,0 +1,245 @@
+"""
+Планировщик исходящих запросов к Bot API с учётом лимитов Telegram.
+"""
+
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from loguru import logger
+
+INTERACTIVE = 0  # ответы пользователям
+BROADCAST = 10  # рассылки
+
+_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+# Лимиты Telegram распространяются на отправку и изменение сообщений; SendChatAction и
+# изменение ссылок/тем (EditChatInviteLink, EditForumTopic) токены не расходуют
+LIMITED_METHODS = frozenset({
+    "SendMessage", "SendPhoto", "SendAudio", "SendDocument", "SendVideo", "SendAnimation", "SendVoice",
+    "SendVideoNote", "SendPaidMedia", "SendMediaGroup", "SendLocation", "SendVenue", "SendContact", "SendPoll",
+    "SendDice", "SendSticker", "SendGame", "SendInvoice", "SendGift",
+    "CopyMessage", "CopyMessages", "ForwardMessage", "ForwardMessages",
+    "EditMessageText", "EditMessageCaption", "EditMessageMedia", "EditMessageReplyMarkup",
+    "EditMessageLiveLocation", "StopMessageLiveLocation", "StopPoll",
+})
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """
+    Приоритет запросов, отправленных внутри блока (меньше - важнее).
+
+    with request_priority(BROADCAST):
+        await bot.send_message(...)
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Забрать токен (в долг, если их нет). Возвращает, сколько секунд ждать до его появления.
+        """
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        self.tokens -= 1
+        return max(0.0, self.updated - now) + max(0.0, -self.tokens) / self.rate
+
+    def refund(self) -> None:
+        self.tokens += 1
+
+    def pause(self, until: float) -> None:
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, until)
+
+    def is_idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RequestScheduler(BaseRequestMiddleware):
+    """
+    Request middleware для Bot.session: общий лимит на бота, лимиты на чат и приоритеты.
+    Запросы сначала ждут токен своего чата, затем становятся в общую очередь,
+    из которой первыми выходят запросы с меньшим приоритетом. TelegramRetryAfter
+    приостанавливает чат и запрос повторяется. Если flood control пришёл в нескольких
+    разных чатах подряд, превышен общий лимит бота - приостанавливается вся отправка.
+    Состояние хранится в процессе: при webhook в нескольких процессах общий лимит делится
+    между ними (processes), а лимиты чатов действуют в каждом процессе отдельно - их превышение
+    остановит TelegramRetryAfter.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = 30.0,
+            private_rate: float = 1.0,
+            private_burst: float = 3.0,
+            group_rate: float = 20 / 60,
+            group_burst: float = 5.0,
+            max_retries: int = 3,
+            max_idle_chats: int = 10_000,
+            global_flood_chats: int = 3,
+            global_flood_window: float = 1.0,
+            processes: int = 1
+    ):
+        """
+        :param global_rate: float - сообщений в секунду на бота
+        :param private_rate: float - сообщений в секунду в личный чат
+        :param private_burst: float - сколько сообщений в личный чат можно отправить сразу
+        :param group_rate: float - сообщений в секунду в группу
+        :param group_burst: float - сколько сообщений в группу можно отправить сразу
+        :param max_retries: int - повторов после TelegramRetryAfter
+        :param max_idle_chats: int - после скольких чатов чистить неиспользуемые лимиты
+        :param global_flood_chats: int - в скольких разных чатах flood control означает общий лимит бота
+        :param global_flood_window: float - за сколько секунд считаются эти чаты
+        :param processes: int - процессов, отправляющих от имени бота: каждому достаётся global_rate / processes
+        """
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.max_idle_chats = max_idle_chats
+        self.global_flood_chats = global_flood_chats
+        self.global_flood_window = global_flood_window
+        self.processes = processes
+
+        self._global: Optional[TokenBucket] = None
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+        self._floods: Deque[Tuple[float, Union[int, str]]] = deque()  # (время, чат) недавних flood control
+
+        self.waiting = 0
+        self.requests = 0
+        self.retries = 0
+        self.global_pauses = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or type(method).__name__ not in LIMITED_METHODS:
+            return await make_request(bot, method)
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, _priority.get())
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                self._on_flood(chat_id, e.retry_after)
+
+    def _on_flood(self, chat_id: Union[int, str], retry_after: float) -> None:
+        now = asyncio.get_running_loop().time()
+        self._chat_bucket(chat_id).pause(now + retry_after)
+        self._floods.append((now, chat_id))
+        while self._floods[0][0] < now - self.global_flood_window:
+            self._floods.popleft()
+        if len({chat for _, chat in self._floods}) >= self.global_flood_chats:
+            self.global_pauses += 1
+            self._floods.clear()
+            self._global_bucket().pause(now + retry_after)
+            logger.warning(f"Flood control бота: общая пауза {retry_after} с")
+        else:
+            logger.warning(f"Flood control в чате {chat_id}: пауза {retry_after} с")
+
+    def _global_bucket(self) -> TokenBucket:
+        if self._global is None:
+            rate = self.global_rate / self.processes
+            self._global = TokenBucket(rate, rate, asyncio.get_running_loop().time())
+        return self._global
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            now = asyncio.get_running_loop().time()
+            if len(self._chats) >= self.max_idle_chats:
+                self._chats = {key: value for key, value in self._chats.items() if not value.is_idle(now)}
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.private_rate, self.private_burst, now)
+            else:
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _acquire(self, chat_id: Union[int, str], priority: int) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.waiting += 1
+        try:
+            delay = self._chat_bucket(chat_id).reserve(started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            future = loop.create_future()
+            heapq.heappush(self._queue, (priority, next(self._sequence), future))
+            if self._pump is None or self._pump.done():
+                self._pump = asyncio.create_task(self._run_pump())
+            await future
+        finally:
+            self.waiting -= 1
+        waited = loop.time() - started
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    async def _run_pump(self) -> None:
+        """
+        Выдаёт общие токены очереди в порядке приоритета.
+        """
+        loop = asyncio.get_running_loop()
+        bucket = self._global_bucket()
+        while self._queue:
+            delay = bucket.reserve(loop.time())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            while self._queue:
+                _, _, future = heapq.heappop(self._queue)
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                bucket.refund()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._queue),
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "retries": self.retries,
+            "global_pauses": self.global_pauses,
+            "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait": self.max_wait,
+            "chats": len(self._chats),
+        }
@@ -1,22 +1,34 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
+from database.cache import RepositoryCache
 from database.databases import _AbstractDatabase
 from database.uow.uow import UnitOfWork
+from services.balance_service import BalanceDeltaEngine
+from services.user_service import UserRegistrationBatcher
 
 
 class SessionMiddleware(BaseMiddleware):
     """
     Класс для проброса UnitOfWork.
+    UnitOfWork один на апдейт: сессия создаётся при первом "async with uow",
+    переиспользуется следующими блоками (вложенные блоки - через SAVEPOINT)
+    и закрывается после хэндлера.
     """
     def __init__(
             self,
-            database: _AbstractDatabase
+            database: _AbstractDatabase,
+            registration: Optional[UserRegistrationBatcher] = None,
+            cache: Optional[RepositoryCache] = None,
+            balances: Optional[BalanceDeltaEngine] = None
     ) -> None:
         super().__init__()
         self.database = database
+        self.registration = registration
+        self.cache = cache
+        self.balances = balances
 
     async def __call__(
             self,
@@ -32,6 +44,18 @@ class SessionMiddleware(BaseMiddleware):
         :return: Any
         """
 
-        uow = UnitOfWork(self.database.async_session_maker)
+        user = data.get("event_from_user")
+        uow = UnitOfWork(
+            self.database.async_session_maker,
+            self.cache,
+            replicas=self.database.replicas,
+            user_id=user.id if user else None,
+            keep_open=True
+        )
         data["uow"] = uow
-        return await handler(event, data)  # Обрабатываем хэндлер с сессией
+        data["registration"] = self.registration
+        data["balances"] = self.balances
+        try:
+            return await handler(event, data)  # Обрабатываем хэндлер с сессией
+        finally:
+            await uow.close()  # Сессия общая для всех блоков "async with uow" хэндлера
@@ -0,0 +1,85 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from utils.tracing import Span, Tracer, current_span, span
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer middleware: корневой спан события, журнал медленных событий и выборочный cProfile.
+    Спан хэндлера создаёт inner middleware из атрибута inner, его регистрируют последним:
+
+    bot.add_middleware(tracing, outer=True)
+    bot.add_middleware(tracing.inner)
+    """
+
+    def __init__(self, tracer: Tracer):
+        super().__init__()
+        self.tracer = tracer
+        self.inner = HandlerSpanMiddleware()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        update = data.get("event_update")
+        update_id = update.update_id if update is not None else None
+        root = Span("update", {"update_id": update_id, "event": type(event).__name__})
+        token = current_span.set(root)
+        profile = self.tracer.start_profile()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            root.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            root.end = time.perf_counter()
+            current_span.reset(token)
+            if profile is not None:
+                self.tracer.finish_profile(profile, f"update-{update_id}-{root.duration * 1000:.0f}ms")
+            self.tracer.record(root)
+
+
+class HandlerSpanMiddleware(BaseMiddleware):
+    """
+    Inner middleware: спан хэндлера с именем роутера и функции.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        router = data.get("event_router")
+        callback = getattr(data.get("handler"), "callback", None)
+        with span(
+                "handler",
+                router=router.name if router is not None else "unknown",
+                handler=getattr(callback, "__qualname__", None) or repr(callback)
+        ):
+            return await handler(event, data)
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """
+    Request middleware для Bot.session: спаны запросов к Bot API.
+    Регистрируется до RequestScheduler, чтобы спан включал ожидание лимитов.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with span("api", method=type(method).__name__):
+            return await make_request(bot, method)
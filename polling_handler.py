@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from loguru import logger
+
+from polling_settings import Polling
+
+
+def update_chat_id(update: Update) -> int:
+    """
+    Ключ шардирования: чат события, иначе пользователь, иначе 0.
+    """
+    try:
+        event = update.event
+    except Exception:
+        return 0
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    return user.id if user is not None else 0
+
+
+class _Shard:
+    __slots__ = ("queue", "processed", "dropped", "failed", "lag", "max_lag")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue[Tuple[Update, float]] = asyncio.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.lag = 0.0  # сколько последний update ждал в очереди, сек
+        self.max_lag = 0.0
+
+
+class ShardedPolling:
+    """
+    Long polling с параллельной обработкой по чатам.
+    Updates раскладываются по шардам по chat_id: у каждого шарда своя очередь и свой воркер,
+    поэтому события одного чата обрабатываются строго по порядку, а разные чаты - параллельно.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, polling: Polling):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.polling = polling
+        self._shards: List[_Shard] = [_Shard(polling.queue_size) for _ in range(polling.workers)]
+        self._workers: List[asyncio.Task] = []
+        self._workflow_data: Dict[str, Any] = {}
+        self.received = 0
+
+    def _shard(self, update: Update) -> _Shard:
+        return self._shards[abs(update_chat_id(update)) % len(self._shards)]
+
+    async def run(self) -> None:
+        """
+        Получение и обработка updates до отмены задачи.
+        """
+        self._workflow_data = {"dispatcher": self.dispatcher, "bots": [self.bot], **self.dispatcher.workflow_data}
+        self._workflow_data.pop("bot", None)
+        await self.dispatcher.emit_startup(bot=self.bot, **self._workflow_data)
+        self._workers = [asyncio.create_task(self._worker(shard)) for shard in self._shards]
+        try:
+            await self._poll()
+        finally:
+            await self._drain()
+            await self.dispatcher.emit_shutdown(bot=self.bot, **self._workflow_data)
+
+    async def _poll(self) -> None:
+        backoff = Backoff(config=BackoffConfig(min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1))
+        get_updates = GetUpdates(
+            timeout=self.polling.timeout,
+            limit=self.polling.limit,
+            allowed_updates=self.dispatcher.resolve_used_update_types()
+        )
+        kwargs = {}
+        if self.bot.session.timeout:
+            kwargs["request_timeout"] = int(self.bot.session.timeout + self.polling.timeout)
+        while True:
+            try:
+                updates = await self.bot(get_updates, **kwargs)
+            except Exception as e:
+                logger.error(f"Ошибка getUpdates: {type(e).__name__}: {e}, повтор через {backoff.next_delay:.1f} с")
+                await backoff.asleep()
+                continue
+            backoff.reset()
+            for update in updates:
+                await self._enqueue(update)
+                get_updates.offset = update.update_id + 1
+            self.received += len(updates)
+
+    async def _enqueue(self, update: Update) -> None:
+        shard = self._shard(update)
+        item = (update, time.monotonic())
+        if self.polling.overflow == "wait":
+            await shard.queue.put(item)
+            return
+        if shard.queue.full():
+            shard.dropped += 1
+            if self.polling.overflow == "drop_newest":
+                logger.warning(f"Очередь шарда заполнена, update {update.update_id} отброшен")
+                return
+            dropped, _ = shard.queue.get_nowait()
+            shard.queue.task_done()
+            logger.warning(f"Очередь шарда заполнена, update {dropped.update_id} отброшен")
+        shard.queue.put_nowait(item)
+
+    async def _worker(self, shard: _Shard) -> None:
+        while True:
+            update, enqueued = await shard.queue.get()
+            shard.lag = time.monotonic() - enqueued
+            shard.max_lag = max(shard.max_lag, shard.lag)
+            try:
+                result = await self.dispatcher.feed_update(self.bot, update, **self._workflow_data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+            except Exception as e:
+                shard.failed += 1
+                logger.exception(f"Ошибка обработки update {update.update_id}: {e}")
+            finally:
+                shard.processed += 1
+                shard.queue.task_done()
+
+    async def _drain(self) -> None:
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(shard.queue.join() for shard in self._shards)),
+                timeout=self.polling.drain_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Очереди не доработаны за {self.polling.drain_timeout} с")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "shards": [
+                {
+                    "queue_depth": shard.queue.qsize(),
+                    "processed": shard.processed,
+                    "dropped": shard.dropped,
+                    "failed": shard.failed,
+                    "lag": shard.lag,
+                    "max_lag": shard.max_lag,
+                }
+                for shard in self._shards
+            ],
+        }
@@ -0,0 +1,46 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+class Polling(BaseModel):
+    """
+    Модель описывающая настройку long polling с параллельной обработкой по чатам.
+    """
+    workers: int = Field(
+        default=8,
+        ge=1,
+        title="Количество воркеров (шардов).",
+        description="Updates одного чата всегда попадают в один шард и обрабатываются по порядку.",
+        examples=[8, 32]
+    )
+    queue_size: int = Field(
+        default=100,
+        ge=1,
+        title="Размер очереди одного шарда.",
+        examples=[100]
+    )
+    overflow: Literal["wait", "drop_oldest", "drop_newest"] = Field(
+        default="wait",
+        title="Что делать, если очередь шарда заполнена.",
+        description="wait - приостановить получение updates, drop_oldest/drop_newest - отбросить update.",
+        examples=["wait"]
+    )
+    timeout: int = Field(
+        default=10,
+        ge=0,
+        title="Таймаут getUpdates, сек.",
+        examples=[10, 30]
+    )
+    limit: int = Field(
+        default=100,
+        ge=1,
+        le=100,
+        title="Максимум updates за один getUpdates.",
+        examples=[100]
+    )
+    drain_timeout: float = Field(
+        default=30.0,
+        ge=0,
+        title="Сколько секунд дорабатывать очереди при остановке.",
+        examples=[30.0]
+    )
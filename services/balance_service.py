@@ -0,0 +1,43 @@
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.cache import RepositoryCache
+from database.replicas import ReplicaRouter
+from database.uow.uow import UnitOfWork
+from utils.batching import WriteBehindBatcher
+
+
+class BalanceDeltaEngine(WriteBehindBatcher[int, float, bool]):
+    """
+    Изменение балансов пользователей без read-modify-write.
+    Изменения одного пользователя за окно сброса суммируются и записываются одним
+    атомарным UPDATE balance = balance + delta. Вызывающий получает результат только
+    после commit: True - баланс изменён, False - пользователь не найден.
+    """
+
+    def __init__(
+            self,
+            async_session_maker: async_sessionmaker,
+            batch_size: int = 1000,
+            max_delay: float = 0.05,
+            replicas: Optional[ReplicaRouter] = None,
+            cache: Optional[RepositoryCache] = None
+    ):
+        super().__init__(batch_size=batch_size, max_delay=max_delay)
+        self.async_session_maker = async_session_maker
+        self.replicas = replicas  # записанные пользователи какое-то время читают с основной базы
+        self.cache = cache  # общий кэш репозиториев: после записи закэшированные пользователи сбрасываются
+
+    async def add(self, user_id: int, delta: float) -> bool:
+        return await self.submit(user_id, delta)
+
+    def _merge(self, current: float, new: float) -> float:
+        return current + new
+
+    async def _flush(self, batch: Dict[int, float]) -> Dict[int, bool]:
+        async with UnitOfWork(self.async_session_maker, self.cache) as uow:
+            updated = await uow.users.apply_balance_deltas(batch)
+        if self.replicas is not None:
+            self.replicas.note_writes(updated)
+        return {user_id: user_id in updated for user_id in batch}
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.uow.uow import UnitOfWork
+from middlewares.request_scheduler import BROADCAST, request_priority
+
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+FINISHED = "finished"
+
+# Отправка одному пользователю: корутина-функция (bot, user_id)
+SendFunction = Callable[[Bot, int], Awaitable[Any]]
+Delivery = Tuple[int, str, Optional[str]]  # (user_id, статус, ошибка)
+
+
+class BroadcastService:
+    """
+    Рассылка по таблице пользователей.
+    Пользователи читаются страницами по первичному ключу, отправка идёт с ограниченной
+    параллельностью и низким приоритетом в RequestScheduler. После каждой страницы в БД
+    сохраняются результаты доставки и контрольная точка, поэтому после падения рассылка
+    продолжается с последней сохранённой страницы; повторно может уйти только страница,
+    которая отправлялась в момент падения.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            async_session_maker: async_sessionmaker,
+            concurrency: int = 25,
+            page_size: int = 200
+    ):
+        self.bot = bot
+        self.async_session_maker = async_session_maker
+        self.concurrency = concurrency
+        self.page_size = page_size
+
+    async def run(self, name: str, send: SendFunction) -> dict:
+        """
+        Запуск или продолжение рассылки.
+        :param name: str - уникальное имя рассылки
+        :param send: SendFunction - отправка сообщения одному пользователю
+        :return: dict - итоговая статистика запуска
+        """
+        async with UnitOfWork(self.async_session_maker) as uow:
+            broadcast = await uow.broadcasts.get_or_create(name)
+        if broadcast.status == FINISHED:
+            logger.info(f"Рассылка {name} уже завершена")
+            return {"sent": broadcast.sent, "failed": broadcast.failed, "blocked": broadcast.blocked}
+        if broadcast.last_user_pk:
+            logger.info(f"Рассылка {name} продолжается с пользователя id > {broadcast.last_user_pk}")
+
+        last_pk = broadcast.last_user_pk
+        totals = {SENT: 0, FAILED: 0, BLOCKED: 0}
+        started = time.monotonic()
+        with request_priority(BROADCAST):
+            while True:
+                async with UnitOfWork(self.async_session_maker) as uow:
+                    users = await uow.users.get_rows_page(["user_id"], last_pk, self.page_size, dict(is_blocked=False))
+                    if not users:
+                        break
+                    done = await uow.deliveries.get_delivered(broadcast.id, [user.user_id for user in users])
+
+                deliveries = await self._send_page([user.user_id for user in users if user.user_id not in done], send)
+                last_pk = users[-1].id
+                counts = {SENT: 0, FAILED: 0, BLOCKED: 0}
+                for _, status, _ in deliveries:
+                    counts[status] += 1
+                    totals[status] += 1
+
+                async with UnitOfWork(self.async_session_maker) as uow:
+                    await uow.deliveries.add_many_or_ignore(
+                        [dict(broadcast_id=broadcast.id, user_id=user_id, status=status, error=error)
+                         for user_id, status, error in deliveries],
+                        index_elements=["broadcast_id", "user_id"]
+                    )
+                    await uow.users.mark_blocked(user_id for user_id, status, _ in deliveries if status == BLOCKED)
+                    await uow.broadcasts.save_progress(broadcast.id, last_pk, counts[SENT], counts[FAILED], counts[BLOCKED])
+
+                elapsed = time.monotonic() - started
+                processed = sum(totals.values())
+                logger.info(
+                    f"Рассылка {name}: отправлено {totals[SENT]}, ошибок {totals[FAILED]}, "
+                    f"заблокировали {totals[BLOCKED]}, {processed / elapsed if elapsed else 0:.1f} сообщ./с"
+                )
+
+        async with UnitOfWork(self.async_session_maker) as uow:
+            await uow.broadcasts.edit_one(broadcast.id, dict(status=FINISHED))
+        logger.info(f"Рассылка {name} завершена за {time.monotonic() - started:.1f} с")
+        return totals
+
+    async def _send_page(self, user_ids: Sequence[int], send: SendFunction) -> List[Delivery]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(user_id: int) -> Delivery:
+            async with semaphore:
+                return await self._deliver(user_id, send)
+
+        return list(await asyncio.gather(*(deliver(user_id) for user_id in user_ids)))
+
+    async def _deliver(self, user_id: int, send: SendFunction) -> Delivery:
+        for _ in range(2):
+            try:
+                await send(self.bot, user_id)
+                return user_id, SENT, None
+            except TelegramForbiddenError:
+                return user_id, BLOCKED, None
+            except TelegramRetryAfter as e:
+                # Без RequestScheduler лимит обрабатывается здесь: ждём и пробуем ещё раз
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                return user_id, FAILED, str(e)
+        return user_id, FAILED, "retry after"
@@ -0,0 +1,24 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from aiogram_sender.file_id_store import FileIdStore, StoredFile
+from database.uow.uow import UnitOfWork
+
+
+class DatabaseFileIdStore(FileIdStore):
+    """
+    Хранилище file_id, сохраняемое в таблицу media_files, чтобы после перезапуска
+    не загружать все картинки в Telegram заново.
+    """
+
+    def __init__(self, async_session_maker: async_sessionmaker):
+        super().__init__()
+        self.async_session_maker = async_session_maker
+
+    async def load(self) -> None:
+        async with UnitOfWork(self.async_session_maker) as uow:
+            for media in await uow.media.get_all({}):
+                self._items[media.path] = StoredFile(media.mtime_ns, media.size, media.file_id, media.content_hash)
+
+    async def _persist(self, path: str, item: StoredFile) -> None:
+        async with UnitOfWork(self.async_session_maker) as uow:
+            await uow.media.save_file_id(path, *item)
@@ -1,13 +1,63 @@
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.cache import RepositoryCache
 from database.models import UserModel
+from database.replicas import ReplicaRouter
 from database.uow.uow import UnitOfWork
+from utils.batching import WriteBehindBatcher
+
+
+class UserRegistrationBatcher(WriteBehindBatcher[int, Optional[str], bool]):
+    """
+    Пакетная регистрация пользователей.
+    Заявки копятся в памяти и записываются одним INSERT ... ON CONFLICT (user_id) DO NOTHING.
+    Повторная регистрация снимает отметку is_blocked: пользователь разблокировал бота.
+    Результат для вызывающего: True - пользователь создан, False - уже существовал.
+    """
+
+    def __init__(
+            self,
+            async_session_maker: async_sessionmaker,
+            batch_size: int = 500,
+            max_delay: float = 0.05,
+            replicas: Optional[ReplicaRouter] = None,
+            cache: Optional[RepositoryCache] = None
+    ):
+        super().__init__(batch_size=batch_size, max_delay=max_delay)
+        self.async_session_maker = async_session_maker
+        self.replicas = replicas  # записанные пользователи какое-то время читают с основной базы
+        self.cache = cache  # общий кэш репозиториев: после записи закэшированные пользователи сбрасываются
+
+    async def register(self, user: UserModel) -> bool:
+        return await self.submit(user.user_id, user.username)
+
+    async def _flush(self, batch: Dict[int, Optional[str]]) -> Dict[int, bool]:
+        rows = [dict(user_id=user_id, username=username) for user_id, username in batch.items()]
+        async with UnitOfWork(self.async_session_maker, self.cache) as uow:
+            unblocked = await uow.users.unblock(batch)
+            inserted = set(await uow.users.add_many_or_ignore(rows, index_elements=["user_id"]))
+        if self.replicas is not None:
+            self.replicas.note_writes(inserted | unblocked)
+        return {user_id: user_id in inserted for user_id in batch}
 
 
 class UserService:
     @staticmethod
-    async def add_user(uow: UnitOfWork, user: UserModel):
+    async def add_user(
+            uow: UnitOfWork,
+            user: UserModel,
+            batcher: Optional[UserRegistrationBatcher] = None
+    ):
+        if batcher is not None:
+            return await batcher.register(user)
         async with uow:
             existing_user = await uow.users.get_by_filter(dict(user_id=user.user_id))
             if existing_user:
+                if existing_user.is_blocked:
+                    existing_user.is_blocked = False
+                    await uow.commit()
                 return
             await uow.users.add_one(user)
-            await uow.commit()
\ No newline at end of file
+            await uow.commit()
@@ -1,10 +1,77 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from database.config import PostgresPoolConfig, ReplicaConfig, SQLiteTuning
+from polling_settings import Polling
+
 class Settings(BaseSettings):
     BOT_TOKEN: str
 
     NAME_DATABASE: str
 
+    SQLITE_TUNED: bool = False  # производственный режим SQLite
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64_000
+    SQLITE_BUSY_TIMEOUT: int = 5000
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_READ_POOL_SIZE: int = 4
+
+    POSTGRES_POOL_SIZE: int = 20
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_RECYCLE: int = 1800  # пересоздавать соединения старше, сек
+    POSTGRES_POOL_TIMEOUT: float = 30.0  # ожидание свободного соединения, сек
+    POSTGRES_PRE_PING: str = "lazy"  # always / lazy / never
+    POSTGRES_IDLE_THRESHOLD: float = 30.0  # после какого простоя проверять соединение в режиме lazy, сек
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 100  # кэш подготовленных запросов asyncpg
+
+    DATABASE_REPLICAS: List[str] = []  # реплики для чтения: пути SQLite или "host:port" Postgres
+    REPLICA_COOLDOWN: float = 30.0  # сколько не использовать недоступную реплику, сек
+    READ_YOUR_WRITES_WINDOW: float = 5.0  # сколько пользователь читает с основной базы после записи, сек
+
+    REGISTRATION_BATCH_SIZE: int = 500  # максимум пользователей в одном INSERT
+    REGISTRATION_BATCH_DELAY: float = 0.05  # максимальная задержка сброса пачки, сек
+
+    BALANCE_BATCH_SIZE: int = 1000  # максимум пользователей в одном сбросе балансов
+    BALANCE_BATCH_DELAY: float = 0.05  # окно суммирования изменений баланса, сек
+
+    REPOSITORY_CACHE_SIZE: int = 0  # 0 - кэш репозиториев выключен
+    REPOSITORY_CACHE_TTL: float = 30.0
+
+    MEDIA_SERVICE_CHAT_ID: Optional[int] = None  # служебный чат для прогрева картинок, None - без прогрева
+    MEDIA_DIR: Optional[str] = None  # каталог с картинками для прогрева
+    MEDIA_PREWARM_CONCURRENCY: int = 4
+
+    RATE_LIMIT_GLOBAL: float = 30.0  # сообщений в секунду на бота
+    RATE_LIMIT_PRIVATE: float = 1.0  # сообщений в секунду в личный чат
+    RATE_LIMIT_GROUP: float = 20 / 60  # сообщений в секунду в группу
+
+    FSM_STORAGE: str = "memory"  # memory - MemoryStorage aiogram, bounded - с лимитом и TTL, database - таблица fsm_states
+    FSM_CACHE_SIZE: int = 10_000  # состояний FSM в памяти процесса (кэш database)
+    # Только для webhook в нескольких процессах: сколько секунд состояние живёт в кэше database.
+    # Дольше этого процесс может не видеть чужую запись, меньшее значение - больше чтений из базы.
+    # В одном процессе кэш не устаревает
+    FSM_CACHE_TTL: float = 5.0
+    FSM_MEMORY_MAX_SIZE: int = 100_000  # максимум состояний в режиме bounded
+    FSM_FLUSH_INTERVAL: float = 1.0  # как часто сбрасывать состояния FSM в базу, сек
+    FSM_TTL: float = 7 * 24 * 3600  # через сколько секунд без изменений состояние удаляется
+
+    METRICS_ENABLED: bool = False  # метрики Prometheus: /metrics в webhook или отдельный порт в long polling
+    METRICS_PORT: int = 9100  # воркеры webhook в нескольких процессах: METRICS_PORT + номер воркера
+    METRICS_HOST: str = "127.0.0.1"  # адрес отдельного сервера метрик, 0.0.0.0 - доступен извне
+
+    TRACING_ENABLED: bool = False  # дерево спанов для каждого события
+    TRACING_SLOW_THRESHOLD: float = 0.5  # событие дольше стольких секунд попадает в журнал медленных
+    TRACING_BUFFER_SIZE: int = 100  # медленных событий в памяти
+    TRACING_FILE: Optional[str] = None  # файл JSON Lines для медленных событий
+    PROFILE_SAMPLE_RATE: float = 0.0  # доля событий под cProfile при TRACING_ENABLED, 0.01 - 1%
+    PROFILE_DIR: str = "profiles"
+
+    POLLING_WORKERS: int = 0  # шардов long polling по chat_id, 0 - стандартный start_polling
+    POLLING_QUEUE_SIZE: int = 100  # очередь одного шарда
+    POLLING_OVERFLOW: str = "wait"  # wait / drop_oldest / drop_newest
+
     @property
     def params(self):
         return {
@@ -12,6 +79,51 @@ class Settings(BaseSettings):
             "NAME_DATABASE": self.NAME_DATABASE,
         }
 
+    @property
+    def sqlite_tuning(self) -> Optional[SQLiteTuning]:
+        if not self.SQLITE_TUNED:
+            return None
+        return SQLiteTuning(
+            synchronous=self.SQLITE_SYNCHRONOUS,
+            mmap_size=self.SQLITE_MMAP_SIZE,
+            cache_size=self.SQLITE_CACHE_SIZE,
+            busy_timeout=self.SQLITE_BUSY_TIMEOUT,
+            temp_store=self.SQLITE_TEMP_STORE,
+            read_pool_size=self.SQLITE_READ_POOL_SIZE
+        )
+
+    @property
+    def postgres_pool(self) -> PostgresPoolConfig:
+        return PostgresPoolConfig(
+            pool_size=self.POSTGRES_POOL_SIZE,
+            max_overflow=self.POSTGRES_MAX_OVERFLOW,
+            pool_recycle=self.POSTGRES_POOL_RECYCLE,
+            pool_timeout=self.POSTGRES_POOL_TIMEOUT,
+            pre_ping=self.POSTGRES_PRE_PING,
+            idle_threshold=self.POSTGRES_IDLE_THRESHOLD,
+            prepared_statement_cache_size=self.POSTGRES_STATEMENT_CACHE_SIZE
+        )
+
+    @property
+    def replicas(self) -> Optional[ReplicaConfig]:
+        if not self.DATABASE_REPLICAS:
+            return None
+        return ReplicaConfig(
+            targets=self.DATABASE_REPLICAS,
+            cooldown=self.REPLICA_COOLDOWN,
+            read_your_writes=self.READ_YOUR_WRITES_WINDOW
+        )
+
+    @property
+    def polling(self) -> Optional[Polling]:
+        if not self.POLLING_WORKERS:
+            return None
+        return Polling(
+            workers=self.POLLING_WORKERS,
+            queue_size=self.POLLING_QUEUE_SIZE,
+            overflow=self.POLLING_OVERFLOW
+        )
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 settings = Settings()
\ No newline at end of file
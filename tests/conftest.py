@@ -0,0 +1,20 @@
+import pytest
+
+from database.databases import AioSQLiteDatabase
+from database.config import SQLiteTuning
+
+
+@pytest.fixture
+async def database(tmp_path):
+    db = AioSQLiteDatabase(str(tmp_path / "test.db"))
+    await db.build_db()
+    yield db
+    await db.shutdown()
+
+
+@pytest.fixture
+async def tuned_database(tmp_path):
+    db = AioSQLiteDatabase(str(tmp_path / "tuned.db"), tuning=SQLiteTuning(read_pool_size=2))
+    await db.build_db()
+    yield db
+    await db.shutdown()
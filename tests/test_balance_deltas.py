@@ -0,0 +1,47 @@
+import asyncio
+
+from database.cache import RepositoryCache
+from database.models import UserModel
+from database.uow.uow import UnitOfWork
+from services.balance_service import BalanceDeltaEngine
+
+
+async def test_deltas_are_summed_per_user_and_applied(database):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.add_many([dict(user_id=user_id) for user_id in range(10)])
+    engine = BalanceDeltaEngine(database.async_session_maker, max_delay=0.01)
+
+    results = await asyncio.gather(*(engine.add(user_id % 10, 1.0) for user_id in range(100)), engine.add(999, 1.0))
+    await engine.close()
+
+    assert all(results[:100]) and results[100] is False
+    async with UnitOfWork(database.async_session_maker) as uow:
+        assert {user.balance for user in await uow.users.get_all({})} == {10.0}
+
+
+async def test_balance_chunks_stay_under_parameter_limit(database):
+    deltas = {user_id: 1.0 for user_id in range(20_000)}
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.add_many([dict(user_id=user_id) for user_id in deltas])
+    async with UnitOfWork(database.async_session_maker) as uow:
+        items = [dict(user_id=user_id, delta=delta) for user_id, delta in deltas.items()]
+        for chunk in uow.users._chunks(items, parameters_per_row=3):
+            stmt = uow.users._balance_deltas_stmt({item["user_id"]: item["delta"] for item in chunk})
+            compiled = stmt.compile(dialect=uow.session.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+            assert len(compiled.positiontup) <= 32766
+        assert len(await uow.users.apply_balance_deltas(deltas)) == 20_000
+
+
+async def test_flush_invalidates_cached_users(database):
+    cache = RepositoryCache()
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        await uow.users.add_one(UserModel(1, "a"))
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).balance == 0
+    engine = BalanceDeltaEngine(database.async_session_maker, max_delay=0.01, cache=cache)
+
+    assert await engine.add(1, 5.0) is True
+    await engine.close()
+
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).balance == 5.0
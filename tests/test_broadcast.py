@@ -0,0 +1,94 @@
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from database.uow.uow import UnitOfWork
+from services.broadcast_service import FINISHED, BroadcastService
+
+
+class Crash(BaseException):
+    """
+    Падение процесса посреди рассылки: не перехватывается как ошибка отправки.
+    """
+
+
+async def _add_users(database, count: int):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.add_many([dict(user_id=user_id) for user_id in range(1, count + 1)])
+
+
+def _service(database) -> BroadcastService:
+    return BroadcastService(Bot("42:TEST"), database.async_session_maker, concurrency=2, page_size=5)
+
+
+async def test_resumes_from_checkpoint_after_crash(database):
+    await _add_users(database, 12)
+    sent = []
+
+    async def crashing(bot, user_id):
+        if user_id == 8:
+            raise Crash
+        sent.append(user_id)
+
+    with pytest.raises(Crash):
+        await _service(database).run("news", crashing)
+    assert sorted(sent)[:5] == [1, 2, 3, 4, 5]
+
+    resumed = []
+
+    async def send(bot, user_id):
+        resumed.append(user_id)
+
+    totals = await _service(database).run("news", send)
+
+    # первая страница сохранена до падения, повторно уходит только страница, на которой упали
+    assert sorted(resumed) == list(range(6, 13))
+    assert totals == {"sent": 7, "failed": 0, "blocked": 0}
+    async with UnitOfWork(database.async_session_maker) as uow:
+        broadcast = await uow.broadcasts.get_by_filter(dict(name="news"))
+    assert broadcast.status == FINISHED and broadcast.sent == 12
+
+
+async def test_skips_users_already_delivered(database):
+    await _add_users(database, 6)
+    async with UnitOfWork(database.async_session_maker) as uow:
+        broadcast = await uow.broadcasts.get_or_create("news")
+        await uow.deliveries.add_many([dict(broadcast_id=broadcast.id, user_id=user_id, status="sent")
+                                       for user_id in (2, 3)])
+    sent = []
+
+    async def send(bot, user_id):
+        sent.append(user_id)
+
+    await _service(database).run("news", send)
+
+    assert sorted(sent) == [1, 4, 5, 6]
+
+
+async def test_forbidden_marks_user_blocked(database):
+    await _add_users(database, 3)
+
+    async def send(bot, user_id):
+        if user_id == 2:
+            raise TelegramForbiddenError(SendMessage(chat_id=user_id, text="hi"), "bot was blocked by the user")
+
+    totals = await _service(database).run("news", send)
+
+    assert totals == {"sent": 2, "failed": 0, "blocked": 1}
+    async with UnitOfWork(database.async_session_maker) as uow:
+        assert [user.user_id for user in await uow.users.get_all(dict(is_blocked=True))] == [2]
+
+
+async def test_finished_broadcast_is_not_sent_again(database):
+    await _add_users(database, 3)
+
+    async def send(bot, user_id):
+        pass
+
+    await _service(database).run("news", send)
+
+    async def must_not_send(bot, user_id):
+        raise AssertionError(user_id)
+
+    assert await _service(database).run("news", must_not_send) == {"sent": 3, "failed": 0, "blocked": 0}
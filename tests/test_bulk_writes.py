@@ -0,0 +1,34 @@
+from database.uow.uow import UnitOfWork
+
+
+async def test_add_many_edit_many_and_upsert(database):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.add_many([dict(user_id=user_id, username="new") for user_id in range(100)])
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.edit_many([dict(id=id, balance=5.0) for id in range(1, 51)])
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.upsert([dict(user_id=user_id, username="upsert") for user_id in range(90, 110)], ["user_id"])
+
+    async with UnitOfWork(database.async_session_maker) as uow:
+        users = {user.user_id: user for user in await uow.users.get_all({})}
+    assert len(users) == 110
+    assert users[0].balance == 5.0 and users[60].balance == 0.0
+    assert users[0].username == "new" and users[95].username == "upsert" and users[105].username == "upsert"
+
+
+async def test_add_many_or_ignore_returns_only_inserted(database):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        first = await uow.users.add_many_or_ignore([dict(user_id=1), dict(user_id=2)], ["user_id"])
+    async with UnitOfWork(database.async_session_maker) as uow:
+        second = await uow.users.add_many_or_ignore([dict(user_id=2), dict(user_id=3)], ["user_id"])
+    assert sorted(first) == [1, 2]
+    assert second == [3]
+
+
+async def test_statements_are_split_by_parameter_limit(database):
+    rows = [dict(user_id=user_id, username="u") for user_id in range(20_000)]  # 40 000 параметров
+    async with UnitOfWork(database.async_session_maker) as uow:
+        chunks = list(uow.users._chunks(rows))
+        inserted = await uow.users.add_many_or_ignore(rows, ["user_id"])
+    assert len(chunks) == 2 and all(len(chunk) * 2 <= 32766 for chunk in chunks)
+    assert len(inserted) == 20_000
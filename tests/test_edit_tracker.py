@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+
+from aiogram_sender.edit_tracker import EditTracker
+
+KEY = (1, 10)
+
+
+def _bad_request(message: str) -> TelegramBadRequest:
+    return TelegramBadRequest(method=EditMessageText(text="x"), message=message)
+
+
+def test_digest_covers_caption_and_photo():
+    base = {"text": "t", "caption": "c", "photo": "file-1", "reply_markup": None}
+    digest = EditTracker.digest(base)
+    assert EditTracker.digest({**base, "caption": "other"}) != digest
+    assert EditTracker.digest({**base, "photo": "file-2"}) != digest
+    assert EditTracker.digest({**base, "photo": b"upload"}) is None
+
+
+async def test_identical_edit_is_skipped_and_uncomparable_is_sent():
+    tracker = EditTracker()
+    sent = []
+
+    async def send():
+        sent.append(1)
+
+    assert await tracker.edit(KEY, b"a", send) is True
+    assert await tracker.edit(KEY, b"a", send) is False
+    assert await tracker.edit(KEY, None, send) is True
+    assert await tracker.edit(KEY, None, send) is True
+    assert len(sent) == 3
+
+
+async def test_digest_expires_after_ttl():
+    tracker = EditTracker(ttl=0.01)
+
+    async def send():
+        pass
+
+    await tracker.edit(KEY, b"a", send)
+    await asyncio.sleep(0.02)
+    assert await tracker.edit(KEY, b"a", send) is True
+
+
+async def test_burst_is_coalesced_to_latest():
+    tracker = EditTracker()
+    sent = []
+    gate = asyncio.Event()
+
+    def sender(name):
+        async def send():
+            if name == "first":
+                await gate.wait()
+            sent.append(name)
+        return send
+
+    first = asyncio.create_task(tracker.edit(KEY, b"1", sender("first")))
+    await asyncio.sleep(0)
+    middle = asyncio.create_task(tracker.edit(KEY, b"2", sender("middle")))
+    last = asyncio.create_task(tracker.edit(KEY, b"3", sender("last")))
+    await asyncio.sleep(0)
+    gate.set()
+
+    assert await asyncio.gather(first, middle, last) == [True, False, True]
+    assert sent == ["first", "last"]
+
+
+async def test_coalesced_error_reaches_its_own_caller():
+    tracker = EditTracker()
+    gate = asyncio.Event()
+
+    async def slow():
+        await gate.wait()
+
+    async def failing():
+        raise _bad_request("message to edit not found")
+
+    first = asyncio.create_task(tracker.edit(KEY, b"1", slow))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(tracker.edit(KEY, b"2", failing))
+    await asyncio.sleep(0)
+    gate.set()
+
+    assert await first is True
+    with pytest.raises(TelegramBadRequest):
+        await second
+    assert tracker.stats()["in_flight"] == 0
+
+
+async def test_not_modified_counts_as_current():
+    tracker = EditTracker()
+
+    async def not_modified():
+        raise _bad_request("Bad Request: message is not modified")
+
+    assert await tracker.edit(KEY, b"1", not_modified) is True
+    assert await tracker.edit(KEY, b"1", not_modified) is False
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from database.fsm_storage import DatabaseStorage
+from database.uow.uow import UnitOfWork
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def _stored_keys(database):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        return {row.key.split(":")[2] for row in await uow.fsm_states.get_all({})}
+
+
+async def test_unserializable_data_is_rejected_in_set_data(database):
+    storage = DatabaseStorage(database, flush_interval=60)
+    with pytest.raises(TypeError):
+        await storage.set_data(_key(1), {"value": object()})
+    await storage.set_data(_key(2), {"value": (1, 2)})
+
+    assert await storage.get_data(_key(2)) == {"value": [1, 2]}
+    await storage.close()
+    assert await _stored_keys(database) == {"2"}
+
+
+async def test_failing_row_does_not_block_the_batch(database):
+    storage = DatabaseStorage(database, flush_interval=60)
+    for user_id in range(1, 4):
+        await storage.set_data(_key(user_id), {"n": user_id})
+    # Строка, которую база не примет, в обход проверки set_data
+    storage._dirty[storage.key_builder.build(_key(2))].data = {"n": object()}
+
+    await storage.close()
+
+    assert await _stored_keys(database) == {"1", "3"}
+    assert storage.stats()["dirty"] == 0
+    assert storage.stats()["dropped"] == 1
+    assert storage.stats()["written"] == 2
+
+
+async def test_batch_is_kept_while_database_is_unavailable(database):
+    storage = DatabaseStorage(database, flush_interval=60)
+    for user_id in range(1, 3):
+        await storage.set_data(_key(user_id), {"n": user_id})
+    async with database.engine.begin() as conn:
+        await conn.exec_driver_sql("ALTER TABLE fsm_states RENAME TO fsm_states_moved")
+
+    await storage.flush()
+    assert storage.stats()["dirty"] == 2 and storage.stats()["dropped"] == 0
+
+    async with database.engine.begin() as conn:
+        await conn.exec_driver_sql("ALTER TABLE fsm_states_moved RENAME TO fsm_states")
+    storage._timer.cancel()
+    storage._timer = None
+    await storage.close()
+    assert await _stored_keys(database) == {"1", "2"}
+
+
+# Первая загрузка из базы - в set_data, вторая - только если запись в кэше устарела
+@pytest.mark.parametrize("processes, loads", [(1, 1), (2, 2)])
+async def test_cache_expires_only_with_several_processes(database, processes, loads):
+    storage = DatabaseStorage(database, cache_ttl=0.01, flush_interval=60, processes=processes)
+    await storage.set_data(_key(1), {"n": 1})
+    await storage.flush()
+    await asyncio.sleep(0.02)
+
+    assert await storage.get_data(_key(1)) == {"n": 1}
+    assert storage.stats()["loads"] == loads
+    await storage.close()
@@ -0,0 +1,55 @@
+from aiogram.fsm.storage.base import StorageKey
+
+from utils import memory_storage
+from utils.memory_storage import BoundedMemoryStorage
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def test_least_recently_used_entry_is_evicted():
+    storage = BoundedMemoryStorage(max_size=2)
+    await storage.set_state(_key(1), "a")
+    await storage.set_state(_key(2), "b")
+    await storage.get_state(_key(1))
+    await storage.set_state(_key(3), "c")
+
+    assert [await storage.get_state(_key(user_id)) for user_id in (1, 2, 3)] == ["a", None, "c"]
+    assert storage.stats()["evictions"] == 1
+
+
+async def test_entry_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory_storage.time, "monotonic", lambda: now[0])
+    storage = BoundedMemoryStorage(ttl=10)
+    await storage.set_data(_key(1), {"page": 1})
+
+    now[0] += 5
+    assert await storage.get_data(_key(1)) == {"page": 1}  # обращение продлевает запись
+    now[0] += 9
+    assert await storage.get_data(_key(1)) == {"page": 1}
+    now[0] += 11
+    assert await storage.get_data(_key(1)) == {}
+    assert storage.stats()["expirations"] == 1
+
+
+async def test_reads_and_cleared_entries_take_no_memory():
+    storage = BoundedMemoryStorage()
+    assert await storage.get_state(_key(1)) is None
+    await storage.set_state(_key(2), "a")
+    await storage.set_data(_key(2), {"x": 1})
+    await storage.set_state(_key(2), None)
+    await storage.set_data(_key(2), {})
+
+    assert storage.stats()["size"] == 0
+
+
+async def test_data_is_copied():
+    storage = BoundedMemoryStorage()
+    data = {"x": 1}
+    await storage.set_data(_key(1), data)
+    data["x"] = 2
+    (await storage.get_data(_key(1)))["x"] = 3
+
+    assert await storage.get_data(_key(1)) == {"x": 1}
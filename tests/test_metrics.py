@@ -0,0 +1,20 @@
+from bot_setting import BotDefault
+from utils.metrics import MetricsRegistry
+
+
+async def test_disabled_registry_counts_nothing_until_enabled():
+    registry = MetricsRegistry(enabled=False)
+    counter = registry.counter("test_total", "Тест")
+    histogram = registry.histogram("test_seconds", "Тест")
+    counter.inc()
+    histogram.observe(0.1)
+    assert "test_total 1" not in registry.render() and "test_seconds_count" not in registry.render()
+
+    bot = BotDefault("42:TEST", logging=False)
+    bot.enable_metrics(registry)
+    counter.inc()
+    histogram.observe(0.1)
+
+    assert "test_total 1" in registry.render()
+    assert "test_seconds_count 1" in registry.render()
+    await bot.bot.session.close()
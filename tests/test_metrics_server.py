@@ -0,0 +1,30 @@
+import socket
+
+from aiohttp import ClientSession
+
+from bot_setting import BotDefault
+from utils.metrics import MetricsRegistry
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def test_worker_serves_metrics_on_its_own_port():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Тест").inc()
+    bot = BotDefault("42:TEST", logging=False)
+    port = _free_port()
+    bot.enable_metrics(registry, port=port - 2, host="127.0.0.1")
+
+    runner = await bot._start_metrics_server(index=2)
+    try:
+        async with ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.status == 200
+                assert "test_total 1" in await response.text()
+        assert runner.addresses[0][:2] == ("127.0.0.1", port)
+    finally:
+        await runner.cleanup()
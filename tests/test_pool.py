@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.pool import InstrumentedPool, enable_lazy_ping
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1
+    )
+    yield engine
+    await engine.dispose()
+
+
+async def test_pool_metrics_count_checkouts_and_timeouts(engine):
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        with pytest.raises(TimeoutError):
+            async with engine.connect():
+                pass
+
+    metrics = engine.pool.metrics()
+    assert metrics["checkouts"] == 2
+    assert metrics["timeouts"] == 1
+    assert metrics["max_wait"] >= 0.1
+    assert metrics["connections"] == 1 and metrics["checked_in"] == 1
+
+
+async def test_lazy_ping_replaces_dead_idle_connection(engine):
+    enable_lazy_ping(engine.sync_engine, idle_threshold=0.05)
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        raw = await conn.get_raw_connection()
+        dead = raw.driver_connection
+    await asyncio.sleep(0.1)
+    await dead.close()  # соединение умерло, пока лежало в пуле
+
+    async with engine.connect() as conn:
+        assert await conn.scalar(text("SELECT 1")) == 1
+        assert (await conn.get_raw_connection()).driver_connection is not dead
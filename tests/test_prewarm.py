@@ -0,0 +1,42 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+from aiogram_sender.file_id_store import FileIdStore
+from aiogram_sender.prewarm import prewarm_media
+
+
+class FakeBot:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent = 0
+
+    async def send_photo(self, chat_id, photo, disable_notification):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.sent += 1
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"id-{photo.filename}")])
+
+
+async def test_prewarm_uploads_with_bounded_concurrency_and_skips_known(tmp_path):
+    paths = []
+    for index in range(10):
+        path = tmp_path / f"{index}.png"
+        path.write_bytes(b"image" * (index + 1))
+        paths.append(str(path))
+    store = FileIdStore()
+    # Тот же файл с другим mtime: совпадает по хэшу, повторно не загружается
+    await store.set(paths[0], 0, 0, "known", hashlib.sha256(b"image").hexdigest())
+    bot = FakeBot()
+
+    stats = await prewarm_media(bot, store, chat_id=1, paths=paths, concurrency=3)
+
+    assert stats["uploaded"] == 9 and stats["skipped"] == 1 and stats["failed"] == 0
+    assert bot.max_in_flight <= 3
+    assert store.get_by_hash(paths[0], hashlib.sha256(b"image").hexdigest()) == "known"
+
+    again = await prewarm_media(bot, store, chat_id=1, paths=paths, concurrency=3)
+    assert again["skipped"] == 10 and bot.sent == 9
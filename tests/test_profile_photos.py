@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aiogram_sender.profile_photos import ProfilePhotoCache
+
+
+class FakeBot:
+    def __init__(self, photos=None, error=None):
+        self.photos = photos or {}
+        self.error = error
+        self.calls = 0
+
+    async def get_user_profile_photos(self, user_id: int, limit: int):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        file_id = self.photos.get(user_id)
+        if file_id is None:
+            return SimpleNamespace(total_count=0, photos=[])
+        return SimpleNamespace(total_count=1, photos=[[SimpleNamespace(file_id=file_id)]])
+
+
+async def test_concurrent_requests_share_one_fetch():
+    bot = FakeBot({1: "photo-1"})
+    cache = ProfilePhotoCache()
+
+    results = await asyncio.gather(*(cache.get(bot, 1) for _ in range(10)))
+
+    assert results == ["photo-1"] * 10
+    assert await cache.get(bot, 1) == "photo-1"
+    assert bot.calls == 1
+    assert cache.stats()["shared_fetches"] == 9
+
+
+async def test_missing_photo_is_cached_for_negative_ttl():
+    bot = FakeBot()
+    cache = ProfilePhotoCache(negative_ttl=0.05)
+
+    assert await cache.get(bot, 1) is None
+    assert await cache.get(bot, 1) is None
+    assert bot.calls == 1
+    await asyncio.sleep(0.06)
+    assert await cache.get(bot, 1) is None
+    assert bot.calls == 2
+
+
+async def test_fetch_error_reaches_every_caller_and_is_not_cached():
+    bot = FakeBot(error=ConnectionError("api is down"))
+    cache = ProfilePhotoCache()
+
+    results = await asyncio.gather(cache.get(bot, 1), cache.get(bot, 1), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    bot.error = None
+    bot.photos[1] = "photo-1"
+    assert await cache.get(bot, 1) == "photo-1"
+    assert cache.stats()["in_flight"] == 0
+
+
+async def test_cancelled_caller_does_not_cancel_shared_fetch():
+    bot = FakeBot({1: "photo-1"})
+    cache = ProfilePhotoCache()
+    first = asyncio.create_task(cache.get(bot, 1))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get(bot, 1))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == "photo-1"
+    assert bot.calls == 1
@@ -0,0 +1,26 @@
+from sqlalchemy import insert, select, update
+
+from database.models import UserModel
+from database.uow.uow import UnitOfWork
+
+
+async def test_first_statement_write_goes_to_writer(tuned_database):
+    async with tuned_database.async_session_maker() as session:
+        await session.execute(insert(UserModel).values(user_id=1, username="a"))
+        assert await session.scalar(select(UserModel.username).filter_by(user_id=1)) == "a"
+        await session.commit()
+
+    async with UnitOfWork(tuned_database.async_session_maker) as uow:
+        await uow.session.execute(update(UserModel).filter_by(user_id=1).values(username="b"))
+        await uow.commit()
+
+    async with UnitOfWork(tuned_database.async_session_maker) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).username == "b"
+
+
+async def test_reads_go_to_reader_in_next_transaction(tuned_database):
+    engines = tuned_database.async_session_maker.kw["info"]["engines"]
+    async with tuned_database.async_session_maker() as session:
+        await session.execute(insert(UserModel).values(user_id=1))
+        await session.commit()
+        assert session.sync_session.get_bind(clause=select(UserModel)) is engines["reader"]
@@ -0,0 +1,56 @@
+import pytest
+
+from database.config import ReplicaConfig
+from database.databases import AioSQLiteDatabase
+from database.models import UserModel
+from database.uow.uow import UnitOfWork
+
+
+@pytest.fixture
+async def replicated(tmp_path):
+    """
+    Основная база и файл-реплика с другим содержимым: по данным видно, откуда было чтение.
+    """
+    replica = AioSQLiteDatabase(str(tmp_path / "replica.db"))
+    await replica.build_db()
+    async with UnitOfWork(replica.async_session_maker) as uow:
+        await uow.users.add_one(UserModel(1, "replica"))
+    await replica.shutdown()
+
+    db = AioSQLiteDatabase(
+        str(tmp_path / "primary.db"),
+        replicas=ReplicaConfig(targets=[str(tmp_path / "replica.db"), str(tmp_path / "missing" / "down.db")])
+    )
+    await db.build_db()
+    async with UnitOfWork(db.async_session_maker) as uow:
+        await uow.users.add_one(UserModel(1, "primary"))
+    yield db
+    await db.shutdown()
+
+
+async def _username(uow: UnitOfWork) -> str:
+    async with uow.read_only() as reader:
+        return (await reader.users.get_by_filter(dict(user_id=1))).username
+
+
+async def test_read_only_units_use_healthy_replica(replicated):
+    uow = UnitOfWork(replicated.async_session_maker, replicas=replicated.replicas)
+
+    assert [await _username(uow) for _ in range(4)] == ["replica"] * 4
+    assert replicated.replicas.failures == 1  # недоступная реплика исключена на cooldown
+    assert replicated.replicas.replica_reads == 4
+
+
+async def test_user_reads_primary_after_own_write(replicated):
+    uow = UnitOfWork(replicated.async_session_maker, replicas=replicated.replicas, user_id=1)
+    async with uow:
+        await uow.users.edit_one(1, dict(username="primary"))
+
+    assert await _username(uow) == "primary"
+    assert await _username(UnitOfWork(replicated.async_session_maker, replicas=replicated.replicas)) == "replica"
+
+
+async def test_writing_unit_never_uses_replica(replicated):
+    uow = UnitOfWork(replicated.async_session_maker, replicas=replicated.replicas)
+    async with uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).username == "primary"
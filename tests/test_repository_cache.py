@@ -0,0 +1,69 @@
+from database.cache import RepositoryCache
+from database.models import UserModel
+from database.uow.uow import UnitOfWork
+
+
+async def _add_user(database, user_id=1):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.add_one(UserModel(user_id, "user"))
+
+
+async def test_sessions_get_separate_instances(database):
+    await _add_user(database)
+    cache = RepositoryCache()
+    async with UnitOfWork(database.async_session_maker, cache) as first:
+        user = await first.users.get_by_id(1)
+    async with UnitOfWork(database.async_session_maker, cache) as second:
+        cached = await second.users.get_by_id(1)
+        assert cache.hits == 1
+        assert cached is not user
+        cached.username = "changed in memory"
+        await second.rollback()
+    async with UnitOfWork(database.async_session_maker, cache) as third:
+        assert (await third.users.get_by_id(1)).username == "user"
+
+
+async def test_attribute_change_invalidates_on_commit(database):
+    await _add_user(database)
+    cache = RepositoryCache()
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        user = await uow.users.get_by_filter(dict(user_id=1))
+        user.username = "renamed"
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).username == "renamed"
+        assert (await uow.users.get_by_id(1)).username == "renamed"
+
+
+async def test_uncommitted_writes_are_not_cached(database):
+    await _add_user(database)
+    cache = RepositoryCache()
+    uow = UnitOfWork(database.async_session_maker, cache)
+    async with uow:
+        await uow.users.edit_one(1, dict(username="uncommitted"))
+        assert (await uow.users.get_by_id(1)).username == "uncommitted"
+        await uow.rollback()
+    assert len(cache) == 0
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_id(1)).username == "user"
+
+
+async def test_read_overlapping_invalidation_is_not_stored(database):
+    await _add_user(database)
+    cache = RepositoryCache()
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        generation = cache.generation("UserModel")
+        user = await uow.users.session.get(UserModel, 1)
+        cache.invalidate("UserModel", (1,))  # параллельный commit сбросил строку во время чтения
+        uow.users._to_cache(("UserModel", "id", 1), user, generation)
+    assert len(cache) == 0
+
+
+async def test_core_update_of_blocked_flag_invalidates(database):
+    await _add_user(database)
+    cache = RepositoryCache()
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        await uow.users.get_by_filter(dict(user_id=1))
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        await uow.users.mark_blocked([1])
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).is_blocked is True
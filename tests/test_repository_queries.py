@@ -0,0 +1,35 @@
+from database.uow.uow import UnitOfWork
+
+
+async def _add_users(database, count: int):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.add_many([dict(user_id=user_id, is_blocked=user_id % 3 == 0) for user_id in range(1, count + 1)])
+
+
+async def test_keyset_pages_cover_table_in_id_order(database):
+    await _add_users(database, 25)
+    async with UnitOfWork(database.async_session_maker) as uow:
+        pages = [page async for page in uow.users.iter_pages(page_size=10)]
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [user.user_id for page in pages for user in page] == list(range(1, 26))
+
+
+async def test_page_filters_and_projection(database):
+    await _add_users(database, 25)
+    async with UnitOfWork(database.async_session_maker) as uow:
+        first = await uow.users.get_rows_page(["user_id"], limit=3, filters=dict(is_blocked=False))
+        second = await uow.users.get_rows_page(["user_id"], after_id=first[-1].id, limit=3, filters=dict(is_blocked=False))
+
+    assert [row.user_id for row in first + second] == [1, 2, 4, 5, 7, 8]
+    assert first[0]._fields == ("id", "user_id")
+
+
+async def test_stream_yields_every_row(database):
+    await _add_users(database, 25)
+    async with UnitOfWork(database.async_session_maker) as uow:
+        users = [user.user_id async for user in uow.users.stream(chunk_size=4)]
+        rows = [row async for row in uow.users.stream_rows(["user_id"], filters=dict(is_blocked=True), chunk_size=4)]
+
+    assert sorted(users) == list(range(1, 26))
+    assert sorted(row.user_id for row in rows) == list(range(3, 26, 3))
@@ -0,0 +1,61 @@
+import asyncio
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendChatAction, SendMessage
+
+from middlewares.request_scheduler import RequestScheduler
+
+
+def _request(flood_chats=(), retry_after=1):
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(method.chat_id)
+        if method.chat_id in flood_chats and calls.count(method.chat_id) == 1:
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=retry_after)
+        return True
+
+    return make_request, calls
+
+
+async def test_chat_action_does_not_use_message_tokens():
+    scheduler = RequestScheduler(private_rate=1.0, private_burst=1.0)
+    make_request, _ = _request()
+    for _ in range(5):
+        await scheduler(make_request, None, SendChatAction(chat_id=1, action="typing"))
+    assert scheduler.stats()["requests"] == 0
+    await scheduler(make_request, None, SendMessage(chat_id=1, text="x"))
+    assert scheduler.stats()["requests"] == 1
+
+
+async def test_flood_in_one_chat_pauses_only_that_chat():
+    scheduler = RequestScheduler(max_retries=1)
+    make_request, _ = _request(flood_chats={1}, retry_after=0)
+    await scheduler(make_request, None, SendMessage(chat_id=1, text="x"))
+    assert scheduler.stats()["retries"] == 1
+    assert scheduler.stats()["global_pauses"] == 0
+
+
+async def test_flood_in_several_chats_pauses_whole_bot():
+    scheduler = RequestScheduler(global_rate=1000, global_flood_chats=3)
+    make_request, calls = _request(flood_chats={1, 2, 3}, retry_after=0.2)
+    loop = asyncio.get_running_loop()
+    sent_at = {}
+
+    async def timed_request(bot, method):
+        result = await make_request(bot, method)
+        sent_at[method.chat_id] = loop.time()
+        return result
+
+    async def other_chat():
+        await asyncio.sleep(0.01)  # после flood control в трёх чатах
+        await scheduler(timed_request, None, SendMessage(chat_id=4, text="x"))
+
+    started = loop.time()
+    await asyncio.gather(
+        other_chat(),
+        *(scheduler(timed_request, None, SendMessage(chat_id=chat, text="x")) for chat in (1, 2, 3))
+    )
+    assert scheduler.stats()["global_pauses"] == 1
+    # Чат 4 flood control не получал, но ждал общей паузы
+    assert sent_at[4] - started >= 0.2
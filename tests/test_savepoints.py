@@ -0,0 +1,39 @@
+import pytest
+
+from database.models import UserModel
+from database.uow.uow import UnitOfWork
+
+
+async def _user_ids(database):
+    async with UnitOfWork(database.async_session_maker) as uow:
+        return {user.user_id for user in await uow.users.get_all({})}
+
+
+@pytest.fixture(params=["database", "tuned_database"])
+def any_database(request):
+    return request.getfixturevalue(request.param)
+
+
+async def test_outer_rollback_discards_released_savepoint(any_database):
+    uow = UnitOfWork(any_database.async_session_maker)
+    with pytest.raises(RuntimeError):
+        async with uow:
+            assert await uow.users.get_by_filter(dict(user_id=1)) is None
+            async with uow:
+                await uow.users.add_one(UserModel(user_id=1))
+            raise RuntimeError
+
+    assert await _user_ids(any_database) == set()
+
+
+async def test_inner_rollback_keeps_outer_writes(any_database):
+    uow = UnitOfWork(any_database.async_session_maker)
+    async with uow:
+        await uow.users.add_one(UserModel(user_id=1))
+        with pytest.raises(RuntimeError):
+            async with uow:
+                await uow.users.add_one(UserModel(user_id=2))
+                await uow.session.flush()
+                raise RuntimeError
+
+    assert await _user_ids(any_database) == {1}
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from sqlalchemy import String, event, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, declarative_base, mapped_column
+
+from database import schema
+from database.databases import AioSQLiteDatabase
+
+
+def _models(*columns: str):
+    """
+    Модели с таблицей items: id и указанные колонки из набора ниже.
+    """
+    Base = declarative_base()
+    available = {
+        "code": lambda: mapped_column(String, unique=True, nullable=True),
+        "title": lambda: mapped_column(String, default="-"),
+        "required": lambda: mapped_column(String),
+    }
+    attrs = {
+        "__tablename__": "items",
+        "__annotations__": {"id": Mapped[int], **{name: Mapped[Optional[str]] for name in columns}},
+        "id": mapped_column(primary_key=True),
+    }
+    attrs.update({name: available[name]() for name in columns})
+    if "required" in columns:
+        attrs["__annotations__"]["required"] = Mapped[str]
+    type("Item", (Base,), attrs)
+    return Base
+
+
+async def _create_legacy_table(db, rows: int = 2):
+    async with db.engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        for id in range(1, rows + 1):
+            await conn.execute(text(f"INSERT INTO items (id) VALUES ({id})"))
+
+
+async def _sync(db):
+    async with db.engine.begin() as conn:
+        return await conn.run_sync(schema.sync_schema)
+
+
+@pytest.fixture
+async def legacy_db(tmp_path):
+    db = AioSQLiteDatabase(str(tmp_path / "legacy.db"))
+    await _create_legacy_table(db)
+    yield db
+    await db.shutdown()
+
+
+async def test_second_start_skips_ddl(legacy_db, monkeypatch):
+    monkeypatch.setattr(schema, "Base", _models("title"))
+    assert await _sync(legacy_db) == schema.MIGRATED
+    assert await _sync(legacy_db) == schema.UNCHANGED
+
+
+async def test_added_unique_column_gets_unique_index(legacy_db, monkeypatch):
+    monkeypatch.setattr(schema, "Base", _models("code"))
+    assert await _sync(legacy_db) == schema.MIGRATED
+
+    async with legacy_db.engine.begin() as conn:
+        indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("items"))
+        assert [index["column_names"] for index in indexes if index["unique"]] == [["code"]]
+        await conn.execute(text("UPDATE items SET code = 'a' WHERE id = 1"))
+        with pytest.raises(IntegrityError):
+            await conn.execute(text("UPDATE items SET code = 'a' WHERE id = 2"))
+    assert await _sync(legacy_db) == schema.UNCHANGED
+
+
+async def test_fingerprint_not_stored_when_unique_index_fails(legacy_db, monkeypatch):
+    monkeypatch.setattr(schema, "Base", _models("code"))
+    async with legacy_db.engine.begin() as conn:
+        await conn.execute(text("ALTER TABLE items ADD COLUMN code VARCHAR"))
+        await conn.execute(text("UPDATE items SET code = 'same'"))
+
+    assert await _sync(legacy_db) == schema.MIGRATED
+    async with legacy_db.engine.begin() as conn:
+        assert (await conn.execute(select(schema.schema_fingerprint))).first() is None
+
+    async with legacy_db.engine.begin() as conn:
+        await conn.execute(text("UPDATE items SET code = id"))
+    assert await _sync(legacy_db) == schema.MIGRATED
+    assert await _sync(legacy_db) == schema.UNCHANGED
+
+
+async def test_fingerprint_not_stored_when_column_needs_manual_migration(legacy_db, monkeypatch):
+    monkeypatch.setattr(schema, "Base", _models("title", "required"))
+    assert await _sync(legacy_db) == schema.MIGRATED
+    assert await _sync(legacy_db) == schema.MIGRATED
+
+
+async def test_concurrent_starts_add_column_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema, "Base", _models("title", "code"))
+    databases = [AioSQLiteDatabase(str(tmp_path / "shared.db")) for _ in range(3)]
+    await _create_legacy_table(databases[0])
+    try:
+        results = await asyncio.gather(*(_sync(db) for db in databases))
+    finally:
+        for db in databases:
+            await db.shutdown()
+    assert sorted(results) == [schema.MIGRATED, schema.UNCHANGED, schema.UNCHANGED]
+
+
+
+async def test_unchanged_schema_is_neither_locked_nor_altered(legacy_db, monkeypatch):
+    monkeypatch.setattr(schema, "Base", _models("title"))
+    assert await _sync(legacy_db) == schema.MIGRATED
+    statements = []
+    event.listen(legacy_db.engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper()))
+
+    await legacy_db._sync_schema()
+    assert set(statements) <= {"BEGIN", "SELECT", "PRAGMA"}
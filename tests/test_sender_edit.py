@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from aiogram_sender import send
+from aiogram_sender.send import Sender
+from utils.metrics import MetricsRegistry
+
+
+class FakeMessage(SimpleNamespace):
+    async def edit_text(self, **kwargs):
+        self.calls.append(("edit_text", kwargs))
+
+    async def edit_caption(self, **kwargs):
+        self.calls.append(("edit_caption", kwargs))
+
+    async def delete(self):
+        self.calls.append(("delete", {}))
+
+    async def answer(self, **kwargs):
+        self.calls.append(("answer", kwargs))
+        return SimpleNamespace(chat=self.chat, message_id=self.message_id + 1, photo=None)
+
+    async def answer_photo(self, **kwargs):
+        self.calls.append(("answer_photo", kwargs))
+        return SimpleNamespace(chat=self.chat, message_id=self.message_id + 1, photo=None)
+
+
+class FakeCallback(SimpleNamespace):
+    async def answer(self, *args, **kwargs):
+        self.calls.append(("callback_answer", kwargs))
+
+
+def _sender(message_photo: bool, window_photo: bool):
+    calls = []
+    message = FakeMessage(
+        calls=calls,
+        chat=SimpleNamespace(id=1),
+        message_id=10,
+        photo=[SimpleNamespace(file_id="old")] if message_photo else None,
+        caption="old" if message_photo else None,
+        text=None if message_photo else "old",
+    )
+    sender = Sender(FakeCallback(calls=calls, message=message))
+    sender._message_data = dict(text="new", caption="new", reply_markup=None, photo="file-id" if window_photo else None)
+    return sender, calls
+
+
+@pytest.mark.parametrize("message_photo, window_photo, method", [
+    (True, True, "_edit_caption"),
+    (False, False, "_edit_text"),
+    (False, True, "_resend"),
+    (True, False, "_resend"),
+])
+def test_edit_method_is_chosen_without_trial_requests(message_photo, window_photo, method):
+    sender, calls = _sender(message_photo, window_photo)
+
+    assert sender._choose_edit() == getattr(sender, method)
+    assert calls == []
+
+
+async def test_edit_answers_callback_and_edits_once():
+    sender, calls = _sender(message_photo=False, window_photo=False)
+
+    await sender._edit()
+
+    assert sorted(name for name, _ in calls) == ["callback_answer", "edit_text"]
+
+
+async def test_type_change_resends_message():
+    sender, calls = _sender(message_photo=True, window_photo=False)
+
+    await sender._edit()
+
+    assert [name for name, _ in calls if name != "callback_answer"] == ["delete", "answer"]
+
+
+async def test_failed_send_is_timed(monkeypatch):
+    histogram = MetricsRegistry().histogram("sender_seconds", "Время Sender.send", ("action",))
+    monkeypatch.setattr(send, "sender_seconds", histogram)
+    sender, _ = _sender(message_photo=False, window_photo=False)
+
+    async def check_photo():
+        raise RuntimeError("boom")
+
+    sender._check_photo = check_photo
+    with pytest.raises(RuntimeError):
+        await sender.send()
+
+    assert 'sender_seconds_count{action="edit"} 1' in histogram.render()
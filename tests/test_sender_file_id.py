@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from aiogram_sender.file_id_store import FileIdStore, StoredFile
+from aiogram_sender.send import Sender
+
+
+class FailingStore(FileIdStore):
+    async def _persist(self, path: str, item: StoredFile) -> None:
+        raise ConnectionError("database is down")
+
+
+async def test_persist_error_does_not_fail_delivered_message():
+    store = FailingStore()
+    sender = Sender(SimpleNamespace(), file_id_store=store)
+    sender._uploaded = ("photo.png", 1, 2, "hash")
+    message = SimpleNamespace(photo=[SimpleNamespace(file_id="small"), SimpleNamespace(file_id="big")])
+
+    await sender._remember_file_id(message)
+
+    assert store.get("photo.png", 1, 2) == "big"
+    assert sender._uploaded is None
@@ -0,0 +1,76 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message, Update
+
+from polling_handler import ShardedPolling, update_chat_id
+from polling_settings import Polling
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "chat": {"id": chat_id, "type": "private"}, "text": "hi"},
+    })
+
+
+def _polling(dispatcher: Dispatcher, updates, **kwargs) -> ShardedPolling:
+    """
+    ShardedPolling без сети: вместо getUpdates в очереди кладутся заранее подготовленные updates.
+    """
+    polling = ShardedPolling(dispatcher, Bot("42:TEST"), Polling(**kwargs))
+
+    async def poll():
+        for update in updates:
+            await polling._enqueue(update)
+        polling.received += len(updates)
+
+    polling._poll = poll
+    return polling
+
+
+async def test_chats_run_in_parallel_and_keep_order():
+    dispatcher = Dispatcher()
+    handled = []
+    second_chat_started = asyncio.Event()
+
+    @dispatcher.message()
+    async def handler(message: Message):
+        if message.chat.id == 1:
+            # при последовательной обработке чат 2 не начнется и тест зависнет
+            await asyncio.wait_for(second_chat_started.wait(), timeout=1)
+        else:
+            second_chat_started.set()
+        handled.append((message.chat.id, message.message_id))
+
+    updates = [_update(1, 1), _update(2, 2), _update(3, 1), _update(4, 1), _update(5, 2)]
+    polling = _polling(dispatcher, updates, workers=2)
+    await polling.run()
+
+    assert [message_id for chat_id, message_id in handled if chat_id == 1] == [1, 3, 4]
+    assert [message_id for chat_id, message_id in handled if chat_id == 2] == [2, 5]
+    assert [shard["processed"] for shard in polling.stats()["shards"]] == [2, 3]
+
+
+async def test_drop_oldest_keeps_newest_updates():
+    polling = ShardedPolling(Dispatcher(), Bot("42:TEST"), Polling(workers=1, queue_size=2, overflow="drop_oldest"))
+    for update_id in (1, 2, 3):
+        await polling._enqueue(_update(update_id, 1))
+
+    shard = polling._shards[0]
+    assert shard.dropped == 1
+    assert [shard.queue.get_nowait()[0].update_id for _ in range(2)] == [2, 3]
+
+
+def test_callback_is_sharded_by_message_chat():
+    update = Update.model_validate({
+        "update_id": 1,
+        "callback_query": {
+            "id": "1",
+            "chat_instance": "1",
+            "from": {"id": 7, "is_bot": False, "first_name": "user"},
+            "message": {"message_id": 1, "date": 0, "chat": {"id": -100, "type": "supergroup"}},
+        },
+    })
+
+    assert update_chat_id(update) == -100
@@ -0,0 +1,68 @@
+import builtins
+import json
+import threading
+import time
+
+import pytest
+
+from utils import tracing
+from utils.tracing import Span, Tracer, current_span, span
+
+
+def _slow_root() -> Span:
+    root = Span("update", {"update_id": 1})
+    token = current_span.set(root)
+    with span("handler", router="start"):
+        with span("sql", statement="SELECT 1"):
+            pass
+    current_span.reset(token)
+    root.start -= 1.0
+    root.end = time.perf_counter()
+    return root
+
+
+def test_span_is_noop_outside_traced_event():
+    assert current_span.get() is None
+    with span("handler") as result:
+        assert result is None
+
+
+def test_spans_form_a_tree():
+    root = _slow_root()
+    trace = root.to_dict()
+
+    assert trace["children"][0]["name"] == "handler"
+    assert trace["children"][0]["children"][0]["attrs"] == {"statement": "SELECT 1"}
+
+
+async def test_slow_event_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    def recording_open(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return builtins.open(*args, **kwargs)
+
+    monkeypatch.setattr(tracing, "open", recording_open, raising=False)
+    path = tmp_path / "slow.jsonl"
+    tracer = Tracer(slow_threshold=0.5, path=str(path))
+
+    tracer.record(_slow_root())
+    await tracer.close()
+
+    assert threads and threading.main_thread() not in threads
+    assert json.loads(path.read_text(encoding="utf-8"))["name"] == "update"
+    assert tracer.stats()["slow"] == 1
+
+
+async def test_profile_is_dumped_off_the_event_loop(tmp_path):
+    tracer = Tracer(profile_rate=1.0, profile_dir=str(tmp_path / "profiles"))
+    profile = tracer.start_profile()
+    if profile is None:
+        pytest.skip("профайлер уже включён")
+    sum(range(1000))
+
+    tracer.finish_profile(profile, "update-1")
+    await tracer.close()
+
+    assert (tmp_path / "profiles" / "update-1.prof").exists()
+    assert tracer.stats()["profiled"] == 1
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database.cache import RepositoryCache
+from database.models import UserModel
+from database.uow.uow import UnitOfWork
+from services.user_service import UserRegistrationBatcher, UserService
+
+
+async def test_batcher_creates_each_user_once(database):
+    batcher = UserRegistrationBatcher(database.async_session_maker, batch_size=100, max_delay=0.01)
+    results = await asyncio.gather(*(batcher.register(UserModel(user_id, f"u{user_id}")) for user_id in range(50)))
+    assert all(results)
+
+    again = await asyncio.gather(batcher.register(UserModel(1, "u1")), batcher.register(UserModel(1000, "new")))
+    assert again == [False, True]
+    await batcher.close()
+
+    async with UnitOfWork(database.async_session_maker) as uow:
+        assert len(await uow.users.get_all({})) == 51
+
+
+async def test_duplicate_keys_in_one_batch_share_result(database):
+    batcher = UserRegistrationBatcher(database.async_session_maker, batch_size=100, max_delay=0.01)
+    first, second = await asyncio.gather(batcher.register(UserModel(7, "a")), batcher.register(UserModel(7, "b")))
+    assert first is True and second is True
+    await batcher.close()
+
+
+async def test_flush_error_reaches_callers(database):
+    batcher = UserRegistrationBatcher(database.async_session_maker, max_delay=0.01)
+    async with database.engine.begin() as conn:
+        await conn.execute(text("DROP TABLE users"))
+    with pytest.raises(OperationalError):
+        await batcher.register(UserModel(1, "a"))
+
+
+async def test_registering_again_clears_blocked_flag(database):
+    batcher = UserRegistrationBatcher(database.async_session_maker, max_delay=0.01)
+    await batcher.register(UserModel(1, "a"))
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.mark_blocked([1])
+
+    assert await batcher.register(UserModel(1, "a")) is False
+    await batcher.close()
+
+    async with UnitOfWork(database.async_session_maker) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).is_blocked is False
+
+
+async def test_add_user_without_batcher_clears_blocked_flag(database):
+    await UserService.add_user(UnitOfWork(database.async_session_maker), UserModel(1, "a"))
+    async with UnitOfWork(database.async_session_maker) as uow:
+        await uow.users.mark_blocked([1])
+
+    await UserService.add_user(UnitOfWork(database.async_session_maker), UserModel(1, "a"))
+
+    async with UnitOfWork(database.async_session_maker) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).is_blocked is False
+
+
+async def test_unblock_invalidates_cached_user(database):
+    cache = RepositoryCache()
+    batcher = UserRegistrationBatcher(database.async_session_maker, max_delay=0.01, cache=cache)
+    await batcher.register(UserModel(1, "a"))
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        await uow.users.mark_blocked([1])
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).is_blocked is True
+
+    await batcher.register(UserModel(1, "a"))
+    await batcher.close()
+
+    async with UnitOfWork(database.async_session_maker, cache) as uow:
+        assert (await uow.users.get_by_filter(dict(user_id=1))).is_blocked is False
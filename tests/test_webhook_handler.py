@@ -0,0 +1,66 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from webhook_handler import QueuedRequestHandler
+
+
+def _update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "chat": {"id": 1, "type": "private"}, "text": "hi"},
+    }
+
+
+async def _client(dispatcher: Dispatcher, **kwargs):
+    handler = QueuedRequestHandler(dispatcher, Bot("42:TEST"), **kwargs)
+    app = web.Application()
+    handler.register(app, path="/webhook")
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    return client, handler
+
+
+async def test_full_queue_answers_503_and_close_drains_it():
+    dispatcher = Dispatcher()
+    handled = []
+    release = asyncio.Event()
+
+    @dispatcher.message()
+    async def handler(message: Message):
+        await release.wait()
+        handled.append(message.message_id)
+
+    client, webhook = await _client(dispatcher, workers=2, queue_size=3)
+    statuses = [(await client.post("/webhook", json=_update(update_id))).status for update_id in range(1, 9)]
+
+    # 2 в обработке, 3 в очереди, остальные получают 503 и придут повторно
+    assert statuses.count(200) == 5 and statuses.count(503) == 3
+    assert webhook.stats()["rejected"] == 3
+
+    release.set()
+    await client.close()  # on_shutdown: доработка очереди
+    assert sorted(handled) == [1, 2, 3, 4, 5]
+    assert webhook.stats()["processed"] == 5
+
+
+async def test_handler_error_does_not_stop_worker():
+    dispatcher = Dispatcher()
+    handled = []
+
+    @dispatcher.message()
+    async def handler(message: Message):
+        if message.message_id == 1:
+            raise RuntimeError("boom")
+        handled.append(message.message_id)
+
+    client, webhook = await _client(dispatcher, workers=1, queue_size=10)
+    for update_id in (1, 2):
+        assert (await client.post("/webhook", json=_update(update_id))).status == 200
+    await client.close()
+
+    assert handled == [2]
+    assert webhook.stats()["failed"] == 1
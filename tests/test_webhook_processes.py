@@ -0,0 +1,39 @@
+import pytest
+
+from aiogram_sender.middleware import WindowMiddleware
+from bot_setting import BotDefault
+from database.fsm_storage import DatabaseStorage
+from exceptions import WebhookError
+from middlewares.request_scheduler import RequestScheduler
+
+
+async def test_global_rate_is_split_between_processes():
+    bot = BotDefault("42:TEST", logging=False)
+    scheduler = RequestScheduler(global_rate=30.0)
+    bot.add_request_middleware(scheduler)
+
+    bot._split_process_state(4)
+
+    assert scheduler._global_bucket().rate == 7.5
+    await bot.bot.session.close()
+
+
+async def test_edit_tracker_refuses_several_processes():
+    bot = BotDefault("42:TEST", logging=False)
+    bot.add_middleware(WindowMiddleware())
+    with pytest.raises(WebhookError):
+        bot._split_process_state(2)
+
+    bot = BotDefault("42:TEST", logging=False)
+    bot.add_middleware(WindowMiddleware(edit_tracker_size=None))
+    bot._split_process_state(2)
+    await bot.bot.session.close()
+
+
+async def test_fsm_cache_expires_in_several_processes(database):
+    bot = BotDefault("42:TEST", logging=False, storage=DatabaseStorage(database))
+
+    bot._split_process_state(2)
+
+    assert bot.dispatcher.storage.processes == 2
+    await bot.bot.session.close()
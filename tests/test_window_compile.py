@@ -0,0 +1,38 @@
+from aiogram.types import InlineKeyboardButton
+
+from aiogram_sender import Keyboard, WindowBuilder
+
+
+class MenuKeyboard(Keyboard):
+    first: InlineKeyboardButton = InlineKeyboardButton(text="first", callback_data="first")
+    second: InlineKeyboardButton = InlineKeyboardButton(text="second", callback_data="second")
+
+
+class MenuWindow(WindowBuilder):
+    text: str = "menu"
+    keyboard: MenuKeyboard = MenuKeyboard()
+
+
+def test_compile_matches_render():
+    assert MenuWindow.compile((1,))[1] == MenuWindow().render((1,))
+
+
+def test_changes_to_compiled_window_do_not_leak():
+    window, data = MenuWindow.compile((1,))
+    window.text = "personal"
+    data["text"] = "personal"
+    data["reply_markup"].inline_keyboard[0][0].text = "personal"
+    data["reply_markup"].inline_keyboard.append([InlineKeyboardButton(text="extra", callback_data="extra")])
+
+    other_window, other_data = MenuWindow.compile((1,))
+    assert other_window is not window
+    assert other_window.text == "menu"
+    assert other_data == MenuWindow().render((1,))
+
+
+def test_changes_to_button_list_do_not_leak():
+    buttons = MenuKeyboard.create_list()
+    buttons.append(InlineKeyboardButton(text="extra", callback_data="extra"))
+    buttons.reverse()
+
+    assert [button.text for button in MenuKeyboard.create_list()] == ["first", "second"]
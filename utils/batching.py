@@ -0,0 +1,101 @@
+"""
+Модуль отложенной (write-behind) пакетной записи.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+from loguru import logger
+
+K = TypeVar("K")
+V = TypeVar("V")
+R = TypeVar("R")
+
+
+class WriteBehindBatcher(ABC, Generic[K, V, R]):
+    """
+    Копит запросы в памяти процесса и сбрасывает их одной пачкой:
+    по достижении batch_size ключей или через max_delay секунд после первого запроса.
+    Каждый вызывающий получает awaitable-результат своей записи.
+    """
+
+    def __init__(
+            self,
+            batch_size: int = 500,
+            max_delay: float = 0.05
+    ):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._pending: Dict[K, Tuple[V, List[asyncio.Future]]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    def _merge(self, current: V, new: V) -> V:
+        """
+        Объединение двух значений для одного ключа внутри пачки.
+        По умолчанию остаётся первое значение.
+        """
+        return current
+
+    @abstractmethod
+    async def _flush(self, batch: Dict[K, V]) -> Dict[K, R]:
+        """
+        Запись пачки в хранилище. Возвращает результат для каждого ключа.
+        """
+        raise NotImplementedError
+
+    async def submit(self, key: K, value: V) -> R:
+        """
+        Поставить запись в очередь и дождаться её сброса.
+        :param key: ключ записи (одинаковые ключи объединяются)
+        :param value: значение
+        :return: результат записи для ключа
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = (value, [future])
+        else:
+            self._pending[key] = (self._merge(pending[0], value), pending[1] + [future])
+
+        if len(self._pending) >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._run_flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _run_flush(self, batch: Dict[K, Tuple[V, List[asyncio.Future]]]) -> None:
+        try:
+            results = await self._flush({key: value for key, (value, _) in batch.items()})
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной записи ({len(batch)} шт.): {e}")
+            for _, futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for key, (_, futures) in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(results.get(key))
+
+    async def close(self) -> None:
+        """
+        Сбросить всё накопленное и дождаться завершения записи.
+        """
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
@@ -0,0 +1,89 @@
+"""
+Модуль ограниченного in-memory кэша с TTL и LRU-вытеснением.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    LRU-кэш ограниченного размера, записи которого живут не дольше ttl секунд.
+    Считает попадания, промахи и вытеснения.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 10_000,
+            ttl: float = 60.0
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            self._on_remove(key, value)
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._on_remove(key, old[1])
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        while len(self._data) > self.max_size:
+            old_key, (_, old_value) = self._data.popitem(last=False)
+            self.evictions += 1
+            self._on_remove(old_key, old_value)
+
+    def pop(self, key: K) -> Optional[V]:
+        item = self._data.pop(key, None)
+        if item is None:
+            return None
+        self._on_remove(key, item[1])
+        return item[1]
+
+    def clear(self) -> None:
+        for key, (_, value) in list(self._data.items()):
+            self._on_remove(key, value)
+        self._data.clear()
+
+    def _on_remove(self, key: K, value: V) -> None:
+        """
+        Хук для наследников: запись покинула кэш.
+        """
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
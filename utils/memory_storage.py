@@ -0,0 +1,156 @@
+"""
+Ограниченное in-memory хранилище FSM с TTL и LRU-вытеснением.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, BaseStorage, StateType, StorageKey
+
+
+class _Record:
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self, expires_at: float):
+        self.state: Optional[str] = None
+        self.data: Optional[Dict[str, Any]] = None  # пустые данные не хранятся
+        self.expires_at = expires_at
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    Замена MemoryStorage для одного процесса.
+    Хранит не больше max_size записей: при переполнении вытесняется давно не использованная,
+    запись без обращений дольше ttl секунд считается брошенной и удаляется.
+    Записи компактные: ключ - кортеж вместо StorageKey, запись - объект со __slots__,
+    имена состояний интернируются, пустое состояние не занимает памяти.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 100_000,
+            ttl: float = 24 * 3600,
+            sweep_batch: int = 8
+    ):
+        """
+        :param max_size: int - максимум записей
+        :param ttl: float - сколько секунд живёт запись без обращений
+        :param sweep_batch: int - сколько самых старых записей проверять на истечение при каждой записи
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sweep_batch = sweep_batch
+        self._records: "OrderedDict[Hashable, _Record]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(key: StorageKey) -> Hashable:
+        if key.thread_id is None and key.business_connection_id is None and key.destiny == DEFAULT_DESTINY:
+            return key.bot_id, key.chat_id, key.user_id
+        return key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny
+
+    def _get(self, key: StorageKey) -> Optional[_Record]:
+        name = self._key(key)
+        record = self._records.get(name)
+        if record is None:
+            return None
+        now = time.monotonic()
+        if record.expires_at <= now:
+            del self._records[name]
+            self.expirations += 1
+            return None
+        record.expires_at = now + self.ttl
+        self._records.move_to_end(name)
+        return record
+
+    def _get_or_create(self, key: StorageKey) -> _Record:
+        record = self._get(key)
+        if record is not None:
+            return record
+        self._sweep()
+        record = self._records[self._key(key)] = _Record(time.monotonic() + self.ttl)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+            self.evictions += 1
+        return record
+
+    def _sweep(self) -> None:
+        """
+        Удаление истёкших записей с начала LRU-порядка: там самые давно использованные.
+        """
+        now = time.monotonic()
+        for _ in range(self.sweep_batch):
+            if not self._records:
+                return
+            name, record = next(iter(self._records.items()))
+            if record.expires_at > now:
+                return
+            del self._records[name]
+            self.expirations += 1
+
+    def _drop_if_empty(self, key: StorageKey, record: _Record) -> None:
+        if record.state is None and not record.data:
+            self._records.pop(self._key(key), None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        if state is None:
+            record = self._get(key)
+            if record is None:
+                return
+            record.state = None
+            self._drop_if_empty(key, record)
+            return
+        self._get_or_create(key).state = sys.intern(state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        if not data:
+            record = self._get(key)
+            if record is None:
+                return
+            record.data = None
+            self._drop_if_empty(key, record)
+            return
+        self._get_or_create(key).data = data.copy()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record is not None and record.data else {}
+
+    async def close(self) -> None:
+        pass
+
+    def memory_usage(self, sample_size: int = 1000) -> int:
+        """
+        Оценка памяти записей в байтах: размер словаря и выборка записей, экстраполированная на все.
+        """
+        total = sys.getsizeof(self._records)
+        if not self._records:
+            return total
+        sampled = 0
+        count = 0
+        for name, record in self._records.items():
+            sampled += sys.getsizeof(name) + sys.getsizeof(record)
+            if record.data:
+                sampled += sys.getsizeof(record.data)
+            count += 1
+            if count >= sample_size:
+                break
+        return total + sampled * len(self._records) // count
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._records),
+            "max_size": self.max_size,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "memory_bytes": self.memory_usage(),
+        }
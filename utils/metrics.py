@@ -0,0 +1,233 @@
+"""
+Метрики в формате Prometheus (text exposition format 0.0.4) без внешних зависимостей.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.enabled = True  # выключенная метрика не считает: inc/observe ничего не делают
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not self.enabled:
+            return
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Значение, которое читается функцией в момент выдачи метрик (глубина очереди, размер кэша).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def render(self) -> List[str]:
+        return self._header() + [f"{self.name} {_format_value(self.function())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по корзинам (без +Inf)..., count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.enabled:
+            return
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += 1
+        state[-1] += value
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        names = self.labelnames + ("le",)
+        for labels, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {state[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {state[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Набор метрик. Метрики выключенного реестра ничего не считают, пока не вызван enable().
+    """
+
+    def __init__(self, enabled: bool = True):
+        self._metrics: Dict[str, _Metric] = {}
+        self.enabled = enabled
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        metric.enabled = self.enabled
+        self._metrics[metric.name] = metric
+        return metric
+
+    def enable(self) -> None:
+        self.enabled = True
+        for metric in self._metrics.values():
+            metric.enabled = True
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, function: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, documentation, function))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр включается BotDefault.enable_metrics: без него счётчики UnitOfWork и Sender не тратят время
+registry = MetricsRegistry(enabled=False)
+
+updates_total = registry.counter(
+    "bot_updates_total", "Обработанные события по роутеру, хэндлеру и результату", ("router", "handler", "status")
+)
+handler_seconds = registry.histogram(
+    "bot_handler_seconds", "Время обработки события, включая middlewares", ("router", "handler")
+)
+api_seconds = registry.histogram("bot_api_seconds", "Время запроса к Bot API", ("method",))
+api_errors_total = registry.counter("bot_api_errors_total", "Ошибки запросов к Bot API", ("method", "error"))
+db_queries_total = registry.counter("db_queries_total", "SQL-запросы")
+db_query_seconds = registry.histogram("db_query_seconds", "Время SQL-запроса", buckets=(
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+))
+db_update_queries = registry.histogram("db_update_queries", "SQL-запросов на одно событие", buckets=(
+    0, 1, 2, 3, 5, 10, 20, 50
+))
+db_update_seconds = registry.histogram("db_update_seconds", "Время SQL-запросов на одно событие")
+uow_total = registry.counter("uow_transactions_total", "Транзакции UnitOfWork", ("result",))
+sender_seconds = registry.histogram("sender_seconds", "Время Sender.send", ("action",))
+
+
+class UpdateScope:
+    """
+    Данные одного события, которые заполняются по ходу обработки.
+    """
+    __slots__ = ("router", "handler", "queries", "query_seconds")
+
+    def __init__(self):
+        self.router = "unhandled"
+        self.handler = "unhandled"
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+current_update: ContextVar[Optional[UpdateScope]] = ContextVar("metrics_update", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    db_queries_total.inc()
+    db_query_seconds.observe(elapsed)
+    scope = current_update.get()
+    if scope is not None:
+        scope.queries += 1
+        scope.query_seconds += elapsed
+
+
+def _handle_error(context) -> None:
+    if context.connection is not None:
+        started = context.connection.info.get("metrics_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Подсчёт SQL-запросов движка (AsyncEngine.sync_engine) в общих метриках и в метриках текущего события.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
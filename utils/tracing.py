@@ -0,0 +1,259 @@
+"""
+Трассировка событий: дерево спанов (middlewares, хэндлер, UnitOfWork, SQL, Bot API) для каждого события,
+журнал медленных событий и выборочное профилирование cProfile.
+Пока событие не трассируется, span() возвращает общий пустой контекстный менеджер.
+"""
+
+import asyncio
+import cProfile
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+STATEMENT_LIMIT = 300  # символов SQL в спане
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: Optional[float] = None) -> dict:
+        origin = self.start if origin is None else origin
+        result = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attrs:
+            result["attrs"] = self.attrs
+        if self.children:
+            result["children"] = [child.to_dict(origin) for child in self.children]
+        return result
+
+    def format(self, indent: int = 0) -> str:
+        attrs = " ".join(f"{key}={value}" for key, value in self.attrs.items()) if self.attrs else ""
+        lines = [f"{'  ' * indent}{self.name} {self.duration * 1000:.1f} мс {attrs}".rstrip()]
+        lines.extend(child.format(indent + 1) for child in self.children)
+        return "\n".join(lines)
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("tracing_span", default=None)
+
+
+class SpanContext:
+    """
+    Дочерний спан текущего спана. Используется как контекстный менеджер или через start()/finish(),
+    когда начало и конец спана в разных методах (UnitOfWork.__aenter__/__aexit__).
+    """
+    __slots__ = ("span", "_token")
+
+    def __init__(self, parent: Span, name: str, attrs: Optional[Dict[str, Any]]):
+        self.span = Span(name, attrs)
+        parent.children.append(self.span)
+        self._token: Optional[Token] = None
+
+    def start(self) -> "SpanContext":
+        self._token = current_span.set(self.span)
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.span.end = time.perf_counter()
+        if error is not None:
+            self.span.attrs = {**(self.span.attrs or {}), "error": type(error).__name__}
+        if self._token is not None:
+            current_span.reset(self._token)
+            self._token = None
+
+    def __enter__(self) -> Span:
+        self.start()
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.finish(exc_val)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs: Any):
+    """
+    Спан внутри трассируемого события, иначе пустой контекстный менеджер:
+
+    with span("sender.send", action="answer"):
+        ...
+    :param name: str - имя спана
+    :param attrs: атрибуты спана
+    """
+    parent = current_span.get()
+    if parent is None:
+        return _NOOP
+    return SpanContext(parent, name, attrs or None)
+
+
+def start_span(name: str, **attrs: Any) -> Optional[SpanContext]:
+    """
+    Начало спана без with. None, если событие не трассируется; завершение - finish_span().
+    """
+    parent = current_span.get()
+    if parent is None:
+        return None
+    return SpanContext(parent, name, attrs or None).start()
+
+
+def finish_span(context: Optional[SpanContext], error: Optional[BaseException] = None) -> None:
+    if context is not None:
+        context.finish(error)
+
+
+class Tracer:
+    """
+    Хранит медленные события и решает, какие события профилировать.
+    Файлы (журнал медленных событий и .prof) пишет отдельный поток по очереди,
+    чтобы запись на диск не останавливала цикл событий; close() дожидается записи.
+    """
+
+    def __init__(
+            self,
+            slow_threshold: float = 0.5,
+            buffer_size: int = 100,
+            path: Optional[str] = None,
+            profile_rate: float = 0.0,
+            profile_dir: str = "profiles"
+    ):
+        """
+        :param slow_threshold: float - событие дольше стольких секунд попадает в журнал
+        :param buffer_size: int - сколько последних медленных событий хранить в памяти
+        :param path: Optional[str] - файл JSON Lines для медленных событий
+        :param profile_rate: float - доля событий, которые профилируются cProfile (0.01 - 1%)
+        :param profile_dir: str - каталог для файлов .prof
+        """
+        self.slow_threshold = slow_threshold
+        self.slow: Deque[dict] = deque(maxlen=buffer_size)
+        self.path = path
+        self.profile_rate = profile_rate
+        self.profile_dir = profile_dir
+        self.traced = 0
+        self.profiled = 0
+        self.write_errors = 0
+        self._profiling = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracer")
+
+    def record(self, root: Span) -> None:
+        self.traced += 1
+        if root.duration < self.slow_threshold:
+            return
+        trace = root.to_dict()
+        trace["time"] = time.time()
+        self.slow.append(trace)
+        logger.warning(f"Медленное событие:\n{root.format()}")
+        if self.path is not None:
+            self._writer.submit(self._append_trace, trace)
+
+    def _append_trace(self, trace: dict) -> None:
+        try:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(trace, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"Ошибка записи медленного события в {self.path}: {e}")
+
+    def start_profile(self) -> Optional[cProfile.Profile]:
+        """
+        Профайлер для события с вероятностью profile_rate. Профилируется весь поток, поэтому
+        в профиль попадают и события, обрабатываемые параллельно; одновременно работает один профайлер.
+        """
+        if not self.profile_rate or self._profiling or random.random() >= self.profile_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # профайлер уже включён кем-то другим
+            return None
+        self._profiling = True
+        return profile
+
+    def finish_profile(self, profile: cProfile.Profile, name: str) -> None:
+        profile.disable()
+        self._profiling = False
+        self.profiled += 1
+        self._writer.submit(self._dump_profile, profile, name)
+
+    def _dump_profile(self, profile: cProfile.Profile, name: str) -> None:
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"Ошибка записи профиля {name}: {e}")
+
+    async def close(self) -> None:
+        """
+        Дождаться записи файлов, поставленных в очередь.
+        """
+        await asyncio.to_thread(self._writer.shutdown, wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "traced": self.traced,
+            "slow": len(self.slow),
+            "profiled": self.profiled,
+            "write_errors": self.write_errors,
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    parent = current_span.get()
+    conn.info.setdefault("tracing_spans", []).append(
+        None if parent is None else SpanContext(parent, "sql", {"statement": " ".join(statement.split())[:STATEMENT_LIMIT]})
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    finish_span(conn.info["tracing_spans"].pop())
+
+
+def _handle_error(context) -> None:
+    if context.connection is not None:
+        spans = context.connection.info.get("tracing_spans")
+        if spans:
+            finish_span(spans.pop(), context.original_exception)
+
+
+def trace_engine(engine: Engine) -> None:
+    """
+    Спаны SQL-запросов движка (AsyncEngine.sync_engine) в трассируемых событиях.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from loguru import logger
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook: отвечает Telegram сразу, а updates обрабатывает пул воркеров.
+    Очередь ограничена: когда она заполнена (или идёт остановка), запрос получает 503,
+    и Telegram повторит его позже. При остановке воркеры дорабатывают очередь
+    не дольше drain_timeout секунд.
+    """
+
+    def __init__(
+            self,
+            dispatcher: Dispatcher,
+            bot: Bot,
+            workers: int = 16,
+            queue_size: int = 1000,
+            drain_timeout: float = 30.0,
+            retry_after: int = 1,
+            secret_token: Optional[str] = None,
+            **data: Any
+    ):
+        """
+        :param workers: int - сколько updates обрабатывается одновременно
+        :param queue_size: int - сколько updates может ждать обработки
+        :param drain_timeout: float - сколько секунд дорабатывать очередь при остановке
+        :param retry_after: int - значение заголовка Retry-After в ответе 503
+        """
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.retry_after = retry_after
+        self._queue: asyncio.Queue[Tuple[Dict[str, Any], float]] = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._closing = False
+
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_queue_wait = 0.0
+
+    def start(self) -> None:
+        """
+        Запуск воркеров (вызывается автоматически на первом update).
+        """
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        if self._closing or self._queue.full():
+            self.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": str(self.retry_after)})
+        update = await request.json(loads=bot.session.json_loads)
+        self.start()
+        try:
+            self._queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": str(self.retry_after)})
+        self.accepted += 1
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    __call__ = handle
+
+    async def _worker(self) -> None:
+        while True:
+            update, enqueued = await self._queue.get()
+            started = time.perf_counter()
+            self.in_flight += 1
+            try:
+                result = await self.dispatcher.feed_raw_update(bot=self.bot, update=update, **self.data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"Ошибка обработки update {update.get('update_id')}: {e}")
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+            finished = time.perf_counter()
+            self.processed += 1
+            self.total_queue_wait += started - enqueued
+            self.total_latency += finished - enqueued
+            self.max_latency = max(self.max_latency, finished - enqueued)
+
+    async def close(self) -> None:
+        """
+        Перестать принимать updates, доработать очередь и закрыть сессию бота.
+        """
+        self._closing = True
+        if self._workers:
+            logger.info(f"Остановка webhook: в очереди {self._queue.qsize()}, в обработке {self.in_flight}")
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Очередь не доработана за {self.drain_timeout} с, потеряно updates: {self._queue.qsize()}")
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers.clear()
+        await super().close()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "in_flight": self.in_flight,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_queue_wait": self.total_queue_wait / self.processed if self.processed else 0.0,
+            "avg_latency": self.total_latency / self.processed if self.processed else 0.0,
+            "max_latency": self.max_latency,
+        }
@@ -21,4 +21,38 @@ class Webhook(BaseModel):
         title="Порт для запуска веб-сервера.",
         examples=[3000, 8443]
     )
-
+    workers: int = Field(
+        default=16,
+        ge=1,
+        title="Воркеров, обрабатывающих updates.",
+        examples=[16, 64]
+    )
+    queue_size: int = Field(
+        default=1000,
+        ge=1,
+        title="Размер очереди updates. При заполнении Telegram получает 503.",
+        examples=[1000]
+    )
+    drain_timeout: float = Field(
+        default=30.0,
+        ge=0,
+        title="Сколько секунд дорабатывать очередь при остановке.",
+        examples=[30.0]
+    )
+    processes: int = Field(
+        default=1,
+        ge=1,
+        title="Процессов, слушающих порт через SO_REUSEPORT.",
+        description=(
+            "Больше 1 - главный процесс только управляет webhook и воркерами (Linux/macOS). "
+            "Память у воркеров своя: общий лимит RequestScheduler делится между ними, "
+            "EditTracker несовместим, записи кэша DatabaseStorage устаревают через cache_ttl (FSM_CACHE_TTL), чтобы видеть чужие изменения."
+        ),
+        examples=[1, 4]
+    )
+    worker_min_uptime: float = Field(
+        default=5.0,
+        ge=0,
+        title="Воркер, упавший быстрее, считается упавшим при запуске.",
+        examples=[5.0]
+    )